@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import DoubleArray
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.websocket import websocket_connect
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Slider every simulated analyst keeps moving, and the values it cycles through
+SLIDER_KEY = 'slider_age'
+AGES = [27.0, 29.0, 31.0, 33.0, 30.0, 28.0]
+
+
+class Session:
+    """One simulated browser tab: the page load, its websocket and its reruns
+
+    Like a browser, every rerun sends the current value of each widget the
+    tab has set, and a widget inside a fragment reruns only that fragment.
+    After each rerun, `messages` and `bytes` hold what the server sent for it.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.ws = None
+        self.cookie = ''
+        # Widget key (the label for widgets without one) -> (widget id, id of its fragment)
+        self.widgets = {}
+        # Widget id -> the value this tab set, sent with every rerun
+        self.widget_states = {}
+        self.messages = 0
+        self.bytes = 0
+
+    async def open(self):
+        # Load the page first, as a browser does, so the proxy pins us to a worker
+        response = await AsyncHTTPClient().fetch(self.base_url + '/')
+        self.cookie = response.headers.get('Set-Cookie', '').split(';')[0]
+        url = urlparse(self.base_url)
+        self.ws = await websocket_connect(HTTPRequest(
+            f"ws://{url.netloc}/_stcore/stream", headers={'Cookie': self.cookie}))
+
+    def _record_widget(self, forward):
+        element = forward.delta.new_element
+        widget = getattr(element, element.WhichOneof('type'))
+        if not getattr(widget, 'id', ''):
+            return
+        # Widget ids end in the user key, or "None" for widgets without one
+        key = widget.id.rsplit('-', 1)[-1]
+        if key == 'None':
+            key = getattr(widget, 'label', '')
+        # Most recently rendered last, e.g. a button whose label just changed
+        self.widgets.pop(key, None)
+        self.widgets[key] = (widget.id, forward.delta.fragment_id)
+
+    async def rerun(self, widgets=(), fragment_id=''):
+        """Request a script run (of one fragment, if given) and wait for it to finish; returns seconds
+
+        `widgets` are WidgetStates that changed: new values are kept for later
+        reruns, triggers (button clicks) only fire in this one.
+        """
+        triggers = []
+        for state in widgets:
+            if state.WhichOneof('value') == 'trigger_value':
+                triggers.append(state)
+            else:
+                self.widget_states[state.id] = state
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.widget_states.widgets.extend(list(self.widget_states.values()) + triggers)
+        if fragment_id:
+            msg.rerun_script.fragment_id = fragment_id
+        self.messages = self.bytes = 0
+        start = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        while True:
+            data = await self.ws.read_message()
+            if data is None:
+                raise ConnectionError("Websocket closed during a rerun")
+            self.messages += 1
+            self.bytes += len(data)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                if element.WhichOneof('type') == 'exception':
+                    raise RuntimeError(element.exception.message)
+                self._record_widget(forward)
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("App failed to compile")
+                if forward.script_finished in (ForwardMsg.FINISHED_SUCCESSFULLY,
+                                               ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY):
+                    return time.perf_counter() - start
+
+    async def set_value(self, key, value):
+        """Move a slider to `value`; reruns its fragment only, if it is in one"""
+        widget_id, fragment_id = self.widgets[key]
+        state = WidgetState(id=widget_id, double_array_value=DoubleArray(data=[value]))
+        return await self.rerun([state], fragment_id)
+
+    async def click(self, key):
+        """Click a button by key (or label)"""
+        widget_id, fragment_id = self.widgets[key]
+        return await self.rerun([WidgetState(id=widget_id, trigger_value=True)], fragment_id)
+
+    async def move_slider(self, value):
+        return await self.set_value(SLIDER_KEY, value)
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+
+async def simulate(base_url, sessions, duration, think_time=0.0):
+    """Open `sessions` tabs, then move their sliders back to back until the deadline"""
+    tabs = [Session(base_url) for _ in range(sessions)]
+    # Page loads are warm-up, not measured; each worker runs the app once here
+    for tab in tabs:
+        await tab.open()
+        await tab.rerun()
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+
+    async def analyst(tab, offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            try:
+                latencies.append(await tab.move_slider(AGES[i % len(AGES)]))
+            except (RuntimeError, ConnectionError, OSError) as exc:
+                errors.append(type(exc).__name__)
+            i += 1
+            await asyncio.sleep(think_time)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[analyst(tab, i) for i, tab in enumerate(tabs)])
+    elapsed = time.perf_counter() - start
+    for tab in tabs:
+        tab.close()
+
+    latencies_ms = np.asarray(latencies) * 1e3
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 1) if len(latencies) else None,
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 1) if len(latencies) else None,
+        'reruns_per_s': round(len(latencies) / elapsed, 1),
+    }
+
+
+def process_tree(pid):
+    """pid and the pids of all its descendants"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        tree.append(stack.pop())
+        stack.extend(children.get(tree[-1], []))
+    return tree
+
+
+def memory_mb(pid):
+    """Proportional set size: shared library pages are split between the processes using them"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def command_line(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode()
+    except OSError:
+        return ''
+
+
+async def wait_until_healthy(base_url, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await AsyncHTTPClient().fetch(base_url.rstrip('/') + '/_stcore/health')
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+
+def start_app(app_dir=current_dir, port=8501, env=None):
+    """Run `streamlit run app.py` headless from app_dir; returns the process"""
+    command = [sys.executable, '-m', 'streamlit', 'run', 'app.py', '--server.port', str(port),
+               '--server.address', '127.0.0.1', '--server.headless', 'true',
+               '--browser.gatherUsageStats', 'false']
+    return subprocess.Popen(command, cwd=app_dir, env={**os.environ, **(env or {})},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def deploy_and_simulate(workers, sessions, duration, shared_model=True, port=8601):
+    """Start `python deploy.py`, run the simulation through its proxy and measure its memory"""
+    command = [sys.executable, os.path.join(current_dir, 'deploy.py'), '--workers', str(workers),
+               '--host', '127.0.0.1', '--port', str(port)]
+    if not shared_model:
+        command.append('--no-model-server')
+    base_url = f'http://127.0.0.1:{port}'
+    deployment = subprocess.Popen(command, cwd=current_dir, stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_healthy(base_url))
+        result = asyncio.run(simulate(base_url, sessions, duration))
+        pids = process_tree(deployment.pid)
+        streamlit = [pid for pid in pids if 'streamlit' in command_line(pid)]
+        model_server = [pid for pid in pids if 'model_server.py' in command_line(pid)]
+        return {
+            'mode': 'shared model' if shared_model else 'model per worker',
+            'workers': workers,
+            **result,
+            'total_mb': round(sum(memory_mb(pid) for pid in pids), 1),
+            'worker_mb': round(float(np.mean([memory_mb(pid) for pid in streamlit])), 1),
+            'model_server_mb': round(sum(memory_mb(pid) for pid in model_server), 1),
+        }
+    finally:
+        deployment.send_signal(signal.SIGTERM)
+        deployment.wait()
+
+
+# Simulate analysts on a running deployment, or start deployments of each size:
+#   python app_loadtest.py --url http://127.0.0.1:8501 --sessions 8
+#   python app_loadtest.py --workers 1 2 4 --sessions 8
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load simulation for the Streamlit app")
+    parser.add_argument('--url', help="existing deployment to load instead of starting one")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--sessions', type=int, default=8, help="concurrent browser sessions")
+    parser.add_argument('--duration', type=float, default=20.0, help="seconds per run")
+    parser.add_argument('--per-worker-model', action='store_true',
+                        help="also run every size with the model loaded in each worker")
+    args = parser.parse_args()
+
+    if args.url:
+        print(json.dumps(asyncio.run(simulate(args.url, args.sessions, args.duration))))
+    else:
+        for shared_model in [True, False] if args.per_worker_model else [True]:
+            for workers in args.workers:
+                print(json.dumps(deploy_and_simulate(workers, args.sessions, args.duration, shared_model)),
+                      flush=True)
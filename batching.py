@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from instrumentation import Histogram
+
+# Histogram upper bounds for the rows in one batch
+BATCH_ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class BatchMetrics:
+    """Batch sizes, queue delays and scoring time of one MicroBatcher
+
+    `throughput_gain` compares the scoring time actually spent with what
+    scoring every row in a one-row call would have cost, estimated from the
+    batches that did hold a single row. It is None until one has been seen.
+    """
+
+    def __init__(self, name='batcher', labels=None):
+        self.name = name
+        self.labels = labels or {}
+        self.batch_rows = Histogram(BATCH_ROW_BUCKETS)
+        self.batch_requests = Histogram(BATCH_ROW_BUCKETS)
+        self.queue_delay = Histogram()
+        self.model_seconds = Histogram()
+        self.single_row = Histogram()
+        self._lock = threading.Lock()
+
+    def record(self, rows, queue_delays, seconds):
+        """One scored batch: its rows, each request's wait before scoring and the scoring time"""
+        with self._lock:
+            self.batch_rows.observe(rows)
+            self.batch_requests.observe(len(queue_delays))
+            for delay in queue_delays:
+                self.queue_delay.observe(delay)
+            self.model_seconds.observe(seconds)
+            if rows == 1:
+                self.single_row.observe(seconds)
+
+    def throughput_gain(self):
+        if not self.single_row.count or not self.model_seconds.total:
+            return None
+        one_row_seconds = self.single_row.total / self.single_row.count
+        return self.batch_rows.total * one_row_seconds / self.model_seconds.total
+
+    def summary(self):
+        with self._lock:
+            batches = self.batch_rows.count
+            gain = self.throughput_gain()
+            return {
+                'requests': self.queue_delay.count,
+                'rows': int(self.batch_rows.total),
+                'batches': batches,
+                'mean_batch_rows': round(self.batch_rows.total / batches, 2) if batches else None,
+                'mean_queue_delay_ms': round(self.queue_delay.total / self.queue_delay.count * 1e3, 3)
+                if self.queue_delay.count else None,
+                'throughput_gain': round(gain, 2) if gain is not None else None,
+            }
+
+    def families(self):
+        """{metric name: (Prometheus type, sample lines)}"""
+        labels = ','.join(f'{key}="{value}"' for key, value in self.labels.items())
+        selector = f'{{{labels}}}' if labels else ''
+        families = {}
+        with self._lock:
+            for metric, histogram in [('batch_rows', self.batch_rows),
+                                      ('batch_requests', self.batch_requests),
+                                      ('queue_delay_seconds', self.queue_delay),
+                                      ('model_duration_seconds', self.model_seconds)]:
+                name = f'{self.name}_{metric}'
+                lines = []
+                for bound, count in histogram.cumulative():
+                    bucket_labels = f'{labels},le="{bound}"' if labels else f'le="{bound}"'
+                    lines.append(f'{name}_bucket{{{bucket_labels}}} {count}')
+                lines.append(f'{name}_sum{selector} {histogram.total:.6f}')
+                lines.append(f'{name}_count{selector} {histogram.count}')
+                families[name] = ('histogram', lines)
+            gain = self.throughput_gain()
+        if gain is not None:
+            families[f'{self.name}_throughput_gain'] = ('gauge', [f'{self.name}_throughput_gain{selector} {gain:.3f}'])
+        return families
+
+    def prometheus_text(self):
+        return prometheus_text([self])
+
+
+def prometheus_text(metrics):
+    """Several BatchMetrics (e.g. one per label value) in the Prometheus text exposition format"""
+    families = {}
+    for batch_metrics in metrics:
+        for name, (kind, lines) in batch_metrics.families().items():
+            families.setdefault(name, (kind, []))[1].extend(lines)
+    text = []
+    for name, (kind, lines) in families.items():
+        text.append(f"# TYPE {name} {kind}")
+        text.extend(lines)
+    return '\n'.join(text) + '\n'
+
+
+class MicroBatcher:
+    """Coalesces concurrent scoring requests into one model call
+
+    Callers `await submit(X)` with a few rows each. The first pending
+    request opens a window of `window_ms`; everything submitted until it
+    closes, or until `max_rows` rows are waiting, is concatenated and passed
+    to `score_batch` on a worker thread. Each caller gets back its own rows
+    of the result (anything sliceable by row: an array or a DataFrame). If
+    the call fails, every caller in the batch gets the exception.
+    Must be used from one event loop.
+    """
+
+    def __init__(self, score_batch, window_ms=2.0, max_rows=256, metrics=None, executor=None):
+        self.score_batch = score_batch
+        self.window_ms = window_ms
+        self.max_rows = max_rows
+        self.metrics = metrics or BatchMetrics()
+        self.executor = executor
+        self._pending = []
+        self._pending_rows = 0
+        self._timer = None
+        # Running batches, referenced so they are not garbage collected
+        self._tasks = set()
+
+    async def submit(self, X):
+        """Result rows for the rows of X, scored together with concurrent requests"""
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X[np.newaxis]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((X, future, time.perf_counter()))
+        self._pending_rows += len(X)
+        if self._pending_rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1e3, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_rows = self._pending, [], 0
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        X = batch[0][0] if len(batch) == 1 else np.concatenate([rows for rows, _, _ in batch])
+        try:
+            result = await loop.run_in_executor(self.executor, self.score_batch, X)
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        self.metrics.record(len(X), [started - queued for _, _, queued in batch],
+                            time.perf_counter() - started)
+
+        start = 0
+        for rows, future, _ in batch:
+            # The caller may have gone away (e.g. a dropped connection)
+            if not future.done():
+                future.set_result(result[start:start + len(rows)])
+            start += len(rows)
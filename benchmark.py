@@ -0,0 +1,1120 @@
+import itertools
+import json
+import numbers
+import os
+import subprocess
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+from features import build_feature_matrix, scale_features
+from scoring import (
+    DATA_PATH, FEATURE_NAMES_PATH, MODEL_PATH, SCALER_PATH, load_artifacts
+)
+
+warnings.filterwarnings('ignore')
+
+# name -> function, filled by the @benchmark decorator
+BENCHMARKS = {}
+# Columns identifying a benchmark's result rows; everything else is an outcome
+BENCHMARK_PARAMS = {}
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+
+
+def benchmark(name, params=()):
+    """Register a benchmark under `name`; `params` are the columns that identify its rows"""
+    def register(func):
+        BENCHMARKS[name] = func
+        BENCHMARK_PARAMS[name] = tuple(params)
+        return func
+    return register
+
+
+def time_call(func, min_time=0.5, max_repeat=1000):
+    """Median wall time of func() in seconds, repeated for at least min_time"""
+    func()  # warm-up
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < max_repeat and (len(timings) < 3 or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return float(np.median(timings))
+
+
+def synthetic_players(n, seed=42):
+    """n raw player rows resampled from the bundled dataset with a little jitter"""
+    df = pd.read_csv(DATA_PATH, encoding='ISO-8859-1')
+    rng = np.random.default_rng(seed)
+    sample = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+    stats = sample.select_dtypes('number').columns.drop(
+        [c for c in sample.columns if c.startswith('position_') or c == 'currently_injured']
+    )
+    jitter = rng.uniform(0.9, 1.1, (n, len(stats)))
+    jittered = pd.DataFrame(sample[stats].to_numpy(dtype=np.float64) * jitter, columns=stats)
+    # Counts stay whole numbers, continuous stats keep one decimal
+    for name in stats:
+        decimals = 0 if pd.api.types.is_integer_dtype(sample[name]) else 1
+        sample[name] = jittered[name].round(decimals).astype(sample[name].dtype)
+    return sample
+
+
+def print_table(rows, columns):
+    """Print a list of result dicts as an aligned table"""
+    widths = [max(len(c), *(len(f"{r[c]}") for r in rows)) for c in columns]
+    print("  ".join(c.rjust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(f"{row[c]}".rjust(w) for c, w in zip(columns, widths)))
+
+
+@benchmark('predictor', params=['batch'])
+def bench_predictor():
+    """Current pandas + scaler + predict_proba path vs the compiled predictor"""
+    from predictor import CompiledPredictor
+
+    model, scaler, feature_names = load_artifacts()
+    build_start = time.perf_counter()
+    compiled = CompiledPredictor.from_artifacts(model, scaler)
+    print(f"Compiled {len(compiled.roots)} trees in {time.perf_counter() - build_start:.3f}s")
+
+    players = synthetic_players(max(BATCH_SIZES))
+    X_all = build_feature_matrix(players, feature_names)
+
+    def current_path(input_df):
+        # What app.py did per prediction: reindex, sklearn transform, predict_proba
+        input_df = input_df[feature_names]
+        return model.predict_proba(scaler.transform(input_df))[:, 1]
+
+    rows = []
+    for n in BATCH_SIZES:
+        input_df = pd.DataFrame(X_all[:n], columns=feature_names)
+        X = X_all[:n]
+        max_diff = float(np.abs(current_path(input_df) - compiled.predict_proba(X)).max())
+        current = time_call(lambda: current_path(input_df))
+        fused = time_call(lambda: compiled.predict_proba(X))
+        rows.append({
+            'batch': n,
+            'current_us_per_row': round(current / n * 1e6, 2),
+            'compiled_us_per_row': round(fused / n * 1e6, 2),
+            'current_rows_per_s': int(n / current),
+            'compiled_rows_per_s': int(n / fused),
+            'speedup': round(current / fused, 2),
+            'max_abs_diff': float(f"{max_diff:.1e}"),
+        })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+def cold_start(code, repeat=5):
+    """Median seconds reported by `code` (it prints a float) in fresh interpreters"""
+    script = "import time, warnings; warnings.filterwarnings('ignore')\n" + code
+    timings = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout
+        timings.append(json.loads(out.strip().splitlines()[-1]))
+    return {key: float(np.median([t[key] for t in timings])) for key in timings[0]}
+
+
+@benchmark('artifact_load', params=['loader'])
+def bench_artifact_load():
+    """Cold-start load of the legacy joblib trio vs the model bundle"""
+    from registry import ModelRegistry
+
+    registry = ModelRegistry()
+    bundle_path = registry.path(registry.current_version())
+    loaders = {
+        'joblib trio': f"""
+t0 = time.perf_counter()
+import joblib, xgboost, sklearn.preprocessing
+t1 = time.perf_counter()
+model = joblib.load({MODEL_PATH!r})
+scaler = joblib.load({SCALER_PATH!r})
+feature_names = joblib.load({FEATURE_NAMES_PATH!r})
+t2 = time.perf_counter()
+model.predict_proba(scaler.transform([[0.0] * len(feature_names)]))
+t3 = time.perf_counter()
+""",
+        'bundle': f"""
+t0 = time.perf_counter()
+import joblib, xgboost, sklearn.preprocessing
+from bundle import load_bundle
+t1 = time.perf_counter()
+model, scaler, feature_names = load_bundle({bundle_path!r})
+t2 = time.perf_counter()
+model.predict_proba(scaler.transform([[0.0] * len(feature_names)]))
+t3 = time.perf_counter()
+""",
+    }
+    report = "print(json.dumps({'import_s': t1 - t0, 'load_s': t2 - t1, 'first_predict_s': t3 - t2}))"
+
+    rows = []
+    for name, code in loaders.items():
+        result = cold_start("import json\n" + code + report)
+        rows.append({
+            'loader': name,
+            'import_ms': round(result['import_s'] * 1e3, 1),
+            'load_ms': round(result['load_s'] * 1e3, 1),
+            'first_predict_ms': round(result['first_predict_s'] * 1e3, 1),
+            'total_ms': round(sum(result.values()) * 1e3, 1),
+        })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('ingest', params=['rows', 'loader'])
+def bench_ingest():
+    """Peak memory and time of loading training data: untyped read_csv vs chunked typed ingest"""
+    import tempfile
+
+    loaders = {
+        'read_csv': """
+import pandas as pd
+from features import add_engineered_features
+df = pd.read_csv(path, encoding='ISO-8859-1').drop(columns=["player_name"], errors="ignore")
+df = add_engineered_features(df)
+X = df.drop(columns=["currently_injured"])
+y = df["currently_injured"]
+""",
+        'ingest': """
+from ingest import load_training_data
+X, y = load_training_data(path)
+""",
+    }
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in [1, 10, 100]:
+            path = os.path.join(tmp, f'players-{scale}x.csv')
+            synthetic_players(3610 * scale).to_csv(path, index=False, encoding='ISO-8859-1')
+            for name, code in loaders.items():
+                # tracemalloc sees numpy and pandas buffers but slows parsing down,
+                # so time and peak memory come from separate runs
+                result = {}
+                for trace in [False, True]:
+                    result.update(cold_start(f"""
+import json, tracemalloc, numpy, pandas, features, ingest
+path = {path!r}
+if {trace}:
+    tracemalloc.start()
+t0 = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - t0
+result_mb = (X.memory_usage(index=False).sum() + y.memory_usage(index=False)) / 1e6
+if {trace}:
+    print(json.dumps({{'peak_mb': tracemalloc.get_traced_memory()[1] / 1e6, 'result_mb': result_mb}}))
+else:
+    print(json.dumps({{'seconds': elapsed}}))
+""", repeat=1))
+                rows.append({
+                    'rows': 3610 * scale,
+                    'loader': name,
+                    'csv_mb': round(os.path.getsize(path) / 1e6, 1),
+                    'peak_mb': round(result['peak_mb'], 1),
+                    'result_mb': round(result['result_mb'], 1),
+                    'seconds': round(result['seconds'], 2),
+                })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('feature_store', params=['rows', 'case'])
+def bench_feature_store():
+    """Training loads and filtered queries: typed CSV stream vs partitioned Parquet store"""
+    import tempfile
+    from feature_store import FeatureStore
+    from ingest import iter_chunks, load_training_data
+
+    _, _, feature_names = load_artifacts()
+    seasons = ['2019-20', '2020-21', '2021-22', '2022-23', '2023-24']
+    leagues = ['EPL', 'LaLiga', 'SerieA', 'Bundesliga']
+
+    def csv_filtered(path):
+        # The CSV has no pushdown: parse every column of every row, then filter
+        kept = []
+        for chunk in iter_chunks(path):
+            mask = (chunk['season'] == '2023-24') & (chunk['position_DF'] == 1) & (chunk['age'] > 30)
+            kept.append(chunk[mask])
+        df = pd.concat(kept, ignore_index=True)
+        return build_feature_matrix(df, feature_names)
+
+    filters = [('season', '=', '2023-24'), ('position_DF', '=', 1), ('age', '>', 30)]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in [10, 100]:
+            n = 3610 * scale
+            players = synthetic_players(n)
+            rng = np.random.default_rng(0)
+            players['season'] = rng.choice(seasons, n)
+            players['league'] = rng.choice(leagues, n)
+            csv_path = os.path.join(tmp, f'players-{scale}x.csv')
+            players.to_csv(csv_path, index=False, encoding='ISO-8859-1')
+
+            store = FeatureStore(os.path.join(tmp, f'store-{scale}x'))
+            start = time.perf_counter()
+            store.ingest_csv(csv_path)
+            ingest_s = time.perf_counter() - start
+            store_mb = sum(os.path.getsize(os.path.join(d, f))
+                           for d, _, files in os.walk(store.root) for f in files) / 1e6
+            print(f"{scale}x: CSV {os.path.getsize(csv_path) / 1e6:.1f} MB -> "
+                  f"Parquet {store_mb:.1f} MB, ingested in {ingest_s:.2f}s")
+
+            cases = {
+                'training load': (lambda: load_training_data(csv_path),
+                                  lambda: store.load_training_data(feature_names)),
+                'filtered query': (lambda: csv_filtered(csv_path),
+                                   lambda: store.load_training_data(feature_names, filters)),
+            }
+            for case, (csv_func, store_func) in cases.items():
+                csv_s = time_call(csv_func, min_time=0)
+                store_s = time_call(store_func, min_time=0)
+                rows.append({
+                    'rows': n,
+                    'case': case,
+                    'result_rows': len(store_func()[0]),
+                    'csv_ms': round(csv_s * 1e3, 1),
+                    'store_ms': round(store_s * 1e3, 1),
+                    'speedup': round(csv_s / store_s, 1),
+                })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('out_of_core', params=['rows', 'mode'])
+def bench_out_of_core():
+    """Peak RSS and throughput of in-memory vs external-memory training"""
+    import tempfile
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in [10, 100, 300]:
+            n = 3610 * scale
+            path = os.path.join(tmp, f'players-{scale}x.csv')
+            synthetic_players(n).to_csv(path, index=False, encoding='ISO-8859-1')
+            for mode in ['train_and_save_model', 'train_out_of_core']:
+                registry_path = os.path.join(tmp, f'registry-{scale}-{mode}')
+                # VmHWM, unlike ru_maxrss, is not inherited from this process across exec
+                result = cold_start(f"""
+import json, train_model
+def peak_rss_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+before_kb = peak_rss_kb()
+t0 = time.perf_counter()
+train_model.{mode}(registry_path={registry_path!r}, data_path={path!r})
+elapsed = time.perf_counter() - t0
+print(json.dumps({{'seconds': elapsed, 'import_rss_mb': before_kb / 1024, 'peak_rss_mb': peak_rss_kb() / 1024}}))
+""", repeat=1)
+                from bundle import read_manifest
+                from registry import ModelRegistry
+                registry = ModelRegistry(registry_path)
+                metadata = read_manifest(registry.path(registry.current_version()))['metadata']
+                rows.append({
+                    'rows': n,
+                    'mode': mode,
+                    'import_rss_mb': round(result['import_rss_mb'], 1),
+                    'peak_rss_mb': round(result['peak_rss_mb'], 1),
+                    'seconds': round(result['seconds'], 1),
+                    'rows_per_s': int(n / result['seconds']),
+                    'test_accuracy': round(metadata['test_accuracy'], 4),
+                })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('incremental', params=['rows', 'matchday'])
+def bench_incremental():
+    """Per-matchday incremental updates vs full retrains: wall clock and test accuracy"""
+    import tempfile
+    from sklearn.metrics import accuracy_score, log_loss
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+    from features import add_engineered_features
+    from incremental import update_model
+    from registry import ModelRegistry
+    from train_model import XGB_PARAMS
+
+    _, _, feature_names = load_artifacts()
+    n_matchdays = 5
+    rows = []
+    for scale in [1, 10]:
+        df = synthetic_players(3610 * scale, seed=7) if scale > 1 else pd.read_csv(DATA_PATH, encoding='ISO-8859-1')
+        df = df.sample(frac=1.0, random_state=0).reset_index(drop=True)
+        n_test = len(df) // 5
+        test, history = df.iloc[:n_test], df.iloc[n_test:].reset_index(drop=True)
+        X_test = add_engineered_features(test)[feature_names].to_numpy(dtype=np.float64)
+        y_test = test['currently_injured'].to_numpy()
+        n_base = len(history) * 6 // 10
+        matchdays = np.array_split(np.arange(n_base, len(history)), n_matchdays)
+
+        def full_retrain(upto):
+            data = add_engineered_features(history.iloc[:upto])
+            scaler = StandardScaler().fit(data[feature_names].astype(np.float64))
+            model = XGBClassifier(**XGB_PARAMS).fit(scale_features(data[feature_names], scaler), data['currently_injured'])
+            return model, scaler
+
+        def test_metrics(model, scaler):
+            proba = model.predict_proba(scale_features(X_test, scaler))[:, 1]
+            return round(float(accuracy_score(y_test, proba >= 0.5)), 4), round(float(log_loss(y_test, proba)), 4)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = ModelRegistry(os.path.join(tmp, 'models'))
+            model, scaler = full_retrain(n_base)
+            registry.publish(model, scaler, feature_names)
+
+            for day, idx in enumerate(matchdays, 1):
+                report = update_model(history.iloc[idx], registry)
+                incremental_model, incremental_scaler, _ = registry.load()
+                inc_acc, inc_loss = test_metrics(incremental_model, incremental_scaler)
+
+                start = time.perf_counter()
+                model, scaler = full_retrain(idx[-1] + 1)
+                full_s = time.perf_counter() - start
+                full_acc, full_loss = test_metrics(model, scaler)
+
+                rows.append({
+                    'rows': len(df),
+                    'matchday': day,
+                    'new_rows': len(idx),
+                    'promoted': report['promoted'],
+                    'incremental_s': round(report['fit_seconds'], 2),
+                    'full_s': round(full_s, 2),
+                    'incremental_acc': inc_acc,
+                    'full_acc': full_acc,
+                    'incremental_logloss': inc_loss,
+                    'full_logloss': full_loss,
+                })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+def measure(func):
+    """(seconds, tracemalloc peak MB) of one call; timed without tracing, which slows it"""
+    import tracemalloc
+
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+@benchmark('resampling', params=['rows', 'case', 'impl'])
+def bench_resampling():
+    """imblearn RandomOverSampler/SMOTE vs index-weight oversampling and vectorized SMOTE"""
+    from imblearn.over_sampling import SMOTE, RandomOverSampler
+    from resampling import Resampler
+
+    _, _, feature_names = load_artifacts()
+    rows = []
+    for n in [36100, 361000]:
+        X = pd.DataFrame(build_feature_matrix(synthetic_players(n), feature_names).astype(np.float32),
+                         columns=feature_names)
+        # 10% positives, like a realistic injury label
+        y = pd.Series((np.random.default_rng(0).random(n) < 0.1).astype(np.uint8))
+        X_scaled = ((X - X.mean()) / X.std()).to_numpy(dtype=np.float32)
+        cases = {
+            'random oversampling': {
+                'imblearn': lambda: RandomOverSampler(random_state=42).fit_resample(X, y),
+                'resampling': lambda: Resampler('weights').fit_resample(X, y.to_numpy()),
+            },
+            'SMOTE': {
+                'imblearn': lambda: SMOTE(random_state=42).fit_resample(X_scaled, y),
+                'resampling': lambda: Resampler('smote').fit_resample(X_scaled, y.to_numpy()),
+            },
+        }
+        for case, impls in cases.items():
+            for impl, func in impls.items():
+                seconds, peak_mb = measure(func)
+                rows.append({'rows': n, 'case': case, 'impl': impl,
+                             'seconds': round(seconds, 3), 'peak_mb': round(peak_mb, 1)})
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+def tuning_data():
+    """Scaled train/test split of the bundled (already balanced) data, as in model.py"""
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from features import add_engineered_features
+
+    df = pd.read_csv(DATA_PATH, encoding='ISO-8859-1').drop(columns=["player_name"], errors="ignore")
+    df = add_engineered_features(df)
+    X, y = df.drop(columns=["currently_injured"]), df["currently_injured"]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler().fit(X_train.astype(np.float64))
+    return scale_features(X_train, scaler), scale_features(X_test, scaler), y_train.to_numpy(), y_test.to_numpy()
+
+
+@benchmark('tuning', params=['search', 'trials', 'workers'])
+def bench_tuning():
+    """model.py's RandomizedSearchCV + refit vs tuning.search, wall clock and F1"""
+    import tempfile
+    from sklearn.metrics import f1_score
+    from sklearn.model_selection import RandomizedSearchCV
+    from xgboost import XGBClassifier
+    from tuning import search
+
+    X_train, X_test, y_train, y_test = tuning_data()
+    pos_weight = len(y_train) / np.bincount(y_train)[1]
+    base_params = dict(n_estimators=400, learning_rate=0.03, max_depth=5, min_child_weight=3, gamma=0.3,
+                       subsample=0.8, colsample_bytree=0.8, scale_pos_weight=pos_weight * 2, random_state=42)
+    space = {
+        'n_estimators': [300, 400, 500], 'max_depth': [4, 5, 6], 'learning_rate': [0.02, 0.03, 0.04],
+        'min_child_weight': [2, 3, 4], 'gamma': [0.2, 0.3, 0.4],
+        'scale_pos_weight': [pos_weight * 1.5, pos_weight * 2, pos_weight * 2.5],
+    }
+
+    def test_f1(params):
+        model = XGBClassifier(**params).fit(X_train, y_train)
+        return round(float(f1_score(y_test, model.predict(X_test))), 4)
+
+    rows = []
+    # Baseline: what model.py did, including its second fit of the best model
+    start = time.perf_counter()
+    baseline = RandomizedSearchCV(XGBClassifier(**base_params), param_distributions=space, n_iter=10,
+                                  scoring='f1', cv=5, random_state=42)
+    baseline.fit(X_train, y_train)
+    baseline.best_estimator_.fit(X_train, y_train)
+    rows.append({'search': 'RandomizedSearchCV', 'trials': 10, 'workers': 1,
+                 'wall_s': round(time.perf_counter() - start, 1),
+                 'cv_f1': round(float(baseline.best_score_), 4),
+                 'test_f1': test_f1({**base_params, **baseline.best_params_})})
+
+    n_cpus = os.cpu_count() or 1
+    configs = [(10, 1), (30, 1)] + ([(30, n_cpus)] if n_cpus > 1 else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_trials, n_workers in configs:
+            store_path = os.path.join(tmp, f'trials-{n_trials}-{n_workers}.sqlite')
+            start = time.perf_counter()
+            best_params, ranking = search(X_train, y_train, space, base_params=base_params, n_trials=n_trials,
+                                          n_workers=n_workers, store_path=store_path, log=lambda message: None)
+            model = XGBClassifier(**best_params).fit(X_train, y_train)
+            wall = time.perf_counter() - start
+            rows.append({'search': 'tuning.search', 'trials': n_trials, 'workers': n_workers,
+                         'wall_s': round(wall, 1), 'cv_f1': round(ranking[0]['score'], 4),
+                         'test_f1': round(float(f1_score(y_test, model.predict(X_test))), 4)})
+
+        # Rerunning a finished search only reads the trial store
+        start = time.perf_counter()
+        search(X_train, y_train, space, base_params=base_params, n_trials=n_trials, n_workers=n_workers,
+               store_path=store_path, log=lambda message: None)
+        print(f"Resumed completed search in {time.perf_counter() - start:.2f}s")
+
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('scoring', params=['batch', 'path'])
+def bench_scoring():
+    """Single-row and batched scoring through app.py's path (score_players + live model)"""
+    from registry import LiveModel, ModelRegistry
+    from scoring import COMPILED_BATCH_LIMIT, score_players
+
+    snapshot = LiveModel(ModelRegistry()).get()
+    players = synthetic_players(max(BATCH_SIZES[:-1]))
+    rows = []
+    for n in BATCH_SIZES[:-1]:
+        batch = players.iloc[:n]
+        # Small batches go through the compiled predictor, as in the app and the API
+        predictor = snapshot.predictor if n <= COMPILED_BATCH_LIMIT else None
+        seconds = time_call(lambda: score_players(batch, snapshot.model, snapshot.scaler,
+                                                  snapshot.feature_names, predictor))
+        rows.append({
+            'batch': n,
+            'path': 'compiled' if predictor is not None else 'xgboost',
+            'call_ms': round(seconds * 1e3, 3),
+            'us_per_row': round(seconds / n * 1e6, 2),
+            'rows_per_s': int(n / seconds),
+        })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('feature_engineering', params=['rows', 'impl'])
+def bench_feature_engineering():
+    """Engineered features over the bundled data scaled up 1x-100x"""
+    from features import add_engineered_features
+
+    _, _, feature_names = load_artifacts()
+    rows = []
+    for scale in [1, 10, 100]:
+        players = synthetic_players(3610 * scale)
+        for impl, func in [('add_engineered_features', lambda: add_engineered_features(players)),
+                           ('build_feature_matrix', lambda: build_feature_matrix(players, feature_names))]:
+            seconds = time_call(func, max_repeat=20)
+            rows.append({
+                'rows': len(players),
+                'impl': impl,
+                'call_ms': round(seconds * 1e3, 2),
+                'rows_per_s': int(len(players) / seconds),
+            })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('train', params=['rows'])
+def bench_train():
+    """train_and_save_model wall time on the bundled data, in fresh interpreters"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = cold_start(f"""
+import json, os, tempfile, train_model
+t0 = time.perf_counter()
+train_model.train_and_save_model(registry_path=tempfile.mkdtemp(dir={tmp!r}))
+print(json.dumps({{'seconds': time.perf_counter() - t0}}))
+""", repeat=3)
+    rows = [{'rows': 3610, 'seconds': round(result['seconds'], 2)}]
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('risk_index', params=['players', 'query'])
+def bench_risk_index():
+    """Leaderboard queries from the risk index vs rescoring the league on every rerun"""
+    from registry import LiveModel, ModelRegistry
+    from risk_index import RiskIndex
+    from scoring import score_players
+
+    snapshot = LiveModel(ModelRegistry()).get()
+    rows = []
+    for n in [50_000, 200_000]:
+        players = synthetic_players(n)
+        index = RiskIndex(snapshot.model, snapshot.scaler, snapshot.feature_names, snapshot.predictor)
+        build_start = time.perf_counter()
+        index.sync(players)
+        build = time.perf_counter() - build_start
+
+        def rescore_top(k=10, position=None):
+            # What a leaderboard without an index would do on each rerun
+            scores = score_players(players, snapshot.model, snapshot.scaler, snapshot.feature_names)
+            if position is not None:
+                scores = scores[players[f'position_{position}'].to_numpy() == 1]
+            return scores.iloc[np.argsort(-scores['probability'].to_numpy(), kind='stable')[:k]]
+
+        changed = players.copy()
+        changed.loc[changed.index[:100], 'n_injuries'] += 1
+        rows.append({'players': n, 'query': 'build', 'index_ms': round(build * 1e3, 1), 'rescore_ms': None})
+        for query, indexed, naive in [
+            ('top 10', lambda: index.top(10), lambda: rescore_top(10)),
+            ('top 10 GK', lambda: index.top(10, 'GK'), lambda: rescore_top(10, 'GK')),
+            ('page 100 DF', lambda: index.page(100, 50, 'DF'), None),
+            ('sync 100 changed', lambda: (index.sync(changed), index.sync(players)), None),
+        ]:
+            index_s = time_call(indexed, max_repeat=50)
+            if query == 'sync 100 changed':
+                index_s /= 2
+            rows.append({
+                'players': n,
+                'query': query,
+                'index_ms': round(index_s * 1e3, 3),
+                'rescore_ms': round(time_call(naive, max_repeat=5) * 1e3, 1) if naive else None,
+            })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('player_store', params=['operation'])
+def bench_player_store():
+    """10k-player roster: SQLite player store vs per-session profile dicts"""
+    import tempfile
+    from player_store import PROFILE_COLUMNS, PlayerStore
+
+    players = synthetic_players(10_000)
+    players['name'] = [f"Player {i:05d}" for i in range(len(players))]
+    players['team'] = [f"Team {i % 20:02d}" for i in range(len(players))]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'roster.csv')
+        players.to_csv(path, index=False)
+        store = PlayerStore(os.path.join(tmp, 'players.sqlite'), seed=None)
+        start = time.perf_counter()
+        store.save_many(players)
+        rows.append({'operation': 'import 10k players', 'time_ms': round((time.perf_counter() - start) * 1e3, 1)})
+
+        def session_dicts():
+            # The old approach: every session builds its own name -> profile dicts
+            roster = pd.read_csv(path)
+            return roster.set_index('name')[PROFILE_COLUMNS].to_dict('index')
+
+        profiles = session_dicts()
+        for operation, func in [
+            ('per-session dicts (read + build)', session_dicts),
+            ('store.names()', store.names),
+            ('store.names(position=GK)', lambda: store.names(position='GK')),
+            ('store.names(team=Team 07)', lambda: store.names(team='Team 07')),
+            ('store.get(name)', lambda: store.get('Player 04321')),
+            ('dict lookup', lambda: profiles['Player 04321']),
+        ]:
+            rows.append({'operation': operation, 'time_ms': round(time_call(func, max_repeat=200) * 1e3, 3)})
+        store.close()
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('shared_cache', params=['cache', 'sessions'])
+def bench_shared_cache():
+    """Analysts viewing the same squad: per-session caches vs the shared cache"""
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from cache import PredictionCache, SharedPredictionCache
+    from registry import LiveModel, ModelRegistry
+    from scoring import score_players
+
+    snapshot = LiveModel(ModelRegistry()).get()
+    squad = synthetic_players(25)
+    rows_X = build_feature_matrix(squad, snapshot.feature_names)
+    n_sessions = 20
+
+    calls = []
+
+    def score(i):
+        calls.append(i)
+        return score_players(squad.iloc[[i]], snapshot.model, snapshot.scaler, snapshot.feature_names,
+                             snapshot.predictor).iloc[0].to_dict()
+
+    def view_squad(cache, **kwargs):
+        for i in range(len(squad)):
+            cache.get_or_compute(rows_X[i], lambda i=i: score(i), **kwargs)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        caches = {
+            'per-session': lambda: [PredictionCache() for _ in range(n_sessions)],
+            'shared': lambda: [SharedPredictionCache()] * n_sessions,
+            'shared, 1 KB + disk': lambda: [SharedPredictionCache(
+                max_bytes=1024, spill_path=os.path.join(tmp, 'spill.sqlite'))] * n_sessions,
+        }
+        for name, make in caches.items():
+            sessions = make()
+            calls.clear()
+            kwargs = {} if name == 'per-session' else {'version': snapshot.version}
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(lambda cache: view_squad(cache, **kwargs), sessions))
+            seconds = time.perf_counter() - start
+            rows.append({
+                'cache': name,
+                'sessions': n_sessions,
+                'model_calls': len(calls),
+                'wall_ms': round(seconds * 1e3, 1),
+                'hit_us': round(time_call(lambda: sessions[0].get_or_compute(
+                    rows_X[0], lambda: score(0), **kwargs), max_repeat=200) * 1e6, 1),
+            })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('explain', params=['case', 'rows'])
+def bench_explain():
+    """TreeSHAP explanations for 10k players: batched vs per player, next to scoring"""
+    from explain import contributions
+    from scoring import score_players
+
+    model, scaler, feature_names = load_artifacts()
+    players = synthetic_players(10_000)
+    X = build_feature_matrix(players, feature_names)
+
+    def per_player(n=200):
+        # One pred_contribs call per player, like explaining on each rerun
+        for i in range(n):
+            contributions(X[i:i + 1], model, scaler)
+
+    cases = [
+        ('score only (batch)', len(X), lambda: score_players(players, model, scaler, feature_names)),
+        ('TreeSHAP (batch)', len(X), lambda: contributions(X, model, scaler)),
+        ('approximate contribs (batch)', len(X), lambda: contributions(X, model, scaler, approximate=True)),
+        ('TreeSHAP (per player)', 200, per_player),
+    ]
+    rows = []
+    for name, n, func in cases:
+        seconds = time_call(func, max_repeat=5)
+        rows.append({
+            'case': name,
+            'rows': n,
+            'call_ms': round(seconds * 1e3, 1),
+            'us_per_row': round(seconds / n * 1e6, 1),
+            'rows_per_s': int(n / seconds),
+        })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('sensitivity', params=['features', 'points'])
+def bench_sensitivity():
+    """What-if grids around one player: one batched call vs one scoring call per point"""
+    from scoring import score_players
+    from sensitivity import sensitivity_grid, sweep_values
+
+    model, scaler, feature_names = load_artifacts()
+    player = synthetic_players(1).iloc[0].to_dict()
+
+    def per_point(axes):
+        # One single-row score per what-if point, as moving a slider does
+        for values in itertools.product(*[values for _, values in axes]):
+            score_players(pd.DataFrame([{**player, **dict(zip([f for f, _ in axes], values))}]),
+                          model, scaler, feature_names)
+
+    rows = []
+    for steps in [10, 25]:
+        for axes in [[('minutes', sweep_values('minutes', 2000, steps, step=50))],
+                     [('minutes', sweep_values('minutes', 2000, steps, step=50)),
+                      ('age', sweep_values('age', 28, steps, step=0.5))]]:
+            n_points = int(np.prod([len(values) for _, values in axes]))
+            batch = time_call(lambda: sensitivity_grid(player, axes, model, scaler, feature_names), max_repeat=20)
+            single = time_call(lambda: per_point(axes), max_repeat=1)
+            rows.append({
+                'features': ' x '.join(feature for feature, _ in axes),
+                'points': n_points,
+                'batch_ms': round(batch * 1e3, 2),
+                'per_point_ms': round(single * 1e3, 1),
+                'speedup': round(single / batch, 1),
+            })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+# The last app before the page was split into fragments, measured alongside
+# the current one; set BENCHMARK_APP_BASELINE to another revision, or to '' to skip
+APP_BASELINE = os.environ.get('BENCHMARK_APP_BASELINE', '55c4478')
+
+
+def app_revision(revision):
+    """Directory holding the repository tree at a git revision, None without git"""
+    import io
+    import tarfile
+    import tempfile
+
+    try:
+        archive = subprocess.run(['git', 'archive', revision], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    directory = tempfile.mkdtemp(prefix='app-')
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+    return directory
+
+
+async def app_interactions(url):
+    """(seconds, messages, bytes) per interaction of one browser session, by case"""
+    from app_loadtest import Session
+
+    # Imports and process-wide caches are warmed by a first, unmeasured session
+    warmup = Session(url)
+    await warmup.open()
+    await warmup.rerun()
+    warmup.close()
+
+    results = {'page load': []}
+    for _ in range(3):
+        tab = Session(url)
+        await tab.open()
+        results['page load'].append((await tab.rerun(), tab.messages, tab.bytes))
+
+    async def each(action, n):
+        measured = []
+        for i in range(n):
+            measured.append((await action(i), tab.messages, tab.bytes))
+        return measured
+
+    async def toggle_theme(i):
+        # Themes change rarely: a few slider changes between toggles
+        for age in [29.0, 30.0]:
+            await tab.move_slider(age)
+        return await tab.click([key for key in tab.widgets if 'Toggle Theme' in key][-1])
+
+    ages = [29.0, 30.0, 31.0, 32.0, 33.0, 28.0]
+    results['slider change'] = await each(lambda i: tab.move_slider(ages[i % len(ages)]), 12)
+    await tab.click('tab_1')
+    results['tab switch'] = await each(lambda i: tab.click(['tab_0', 'tab_1'][i % 2]), 12)
+    results['theme toggle'] = await each(toggle_theme, 6)
+    await tab.click('tab_5')
+    results['slider change, What-if open'] = await each(lambda i: tab.move_slider(ages[i % len(ages)]), 12)
+    tab.close()
+    return results
+
+
+@benchmark('app_rerun', params=['app', 'case'])
+def bench_app_rerun():
+    """Per-interaction rerun latency, messages and websocket bytes on a live server, vs the app before fragments"""
+    import asyncio
+    import shutil
+    import socket
+    import tempfile
+    from app_loadtest import start_app, wait_until_healthy
+
+    apps = [('current', os.path.dirname(os.path.abspath(__file__)))]
+    if APP_BASELINE:
+        baseline = app_revision(APP_BASELINE)
+        if baseline is None:
+            print(f"Cannot check out {APP_BASELINE}, measuring the current app only")
+        else:
+            apps.append((APP_BASELINE, baseline))
+
+    rows = []
+    for app, app_dir in apps:
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        store = os.path.join(tempfile.mkdtemp(), 'players.sqlite')
+        server = start_app(app_dir, port, env={'PLAYER_STORE_PATH': store, 'METRICS_PORT': ''})
+        try:
+            url = f'http://127.0.0.1:{port}'
+            asyncio.run(wait_until_healthy(url))
+            results = asyncio.run(app_interactions(url))
+        finally:
+            server.terminate()
+            server.wait()
+            if app_dir != apps[0][1]:
+                shutil.rmtree(app_dir, ignore_errors=True)
+        for case, measured in results.items():
+            rows.append({
+                'app': app,
+                'case': case,
+                'reruns': len(measured),
+                'rerun_ms': round(float(np.median([seconds for seconds, _, _ in measured])) * 1e3, 1),
+                'messages': int(np.median([messages for _, messages, _ in measured])),
+                'kb_per_rerun': round(float(np.median([size for _, _, size in measured])) / 1024, 1),
+            })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('deployment', params=['mode', 'workers', 'sessions'])
+def bench_deployment():
+    """Simulated analysts on `deploy.py` with 1 and 2 workers, shared model server vs a model per worker"""
+    import tempfile
+    from app_loadtest import deploy_and_simulate
+
+    os.environ['PLAYER_STORE_PATH'] = os.path.join(tempfile.mkdtemp(), 'players.sqlite')
+    rows = []
+    for shared_model in [True, False]:
+        for workers in [1, 2]:
+            result = deploy_and_simulate(workers, sessions=4, duration=10.0, shared_model=shared_model)
+            rows.append({name: result[name] for name in
+                         ['mode', 'workers', 'sessions', 'p50_ms', 'p99_ms', 'reruns_per_s', 'total_mb', 'worker_mb']})
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+@benchmark('micro_batching', params=['scorer', 'clients', 'mode'])
+def bench_micro_batching():
+    """Concurrent one-player requests: one model call each vs coalesced by batching.MicroBatcher"""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from batching import MicroBatcher
+    from features import input_columns
+    from registry import LiveModel, ModelRegistry
+    from scoring import COMPILED_BATCH_LIMIT, score_players
+
+    snapshot = LiveModel(ModelRegistry()).get()
+    X = synthetic_players(1000)[input_columns(snapshot.feature_names)].to_numpy(dtype=np.float64)
+    scorers = {
+        'xgboost': lambda rows: score_players(rows, snapshot.model, snapshot.scaler, snapshot.feature_names),
+        'compiled': lambda rows: score_players(rows, snapshot.model, snapshot.scaler, snapshot.feature_names,
+                                               snapshot.predictor if len(rows) <= COMPILED_BATCH_LIMIT else None),
+    }
+    duration = 3.0
+
+    async def load(submit, clients):
+        latencies = []
+        deadline = time.perf_counter() + duration
+
+        async def client(offset):
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await submit(X[i % len(X)][np.newaxis])
+                latencies.append(time.perf_counter() - start)
+                i += clients
+
+        start = time.perf_counter()
+        await asyncio.gather(*[client(i) for i in range(clients)])
+        return len(latencies) / (time.perf_counter() - start), np.asarray(latencies) * 1e3
+
+    rows = []
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        for scorer, score in scorers.items():
+            for clients in [1, 8, 64]:
+                async def one_row_calls(player):
+                    return await asyncio.get_running_loop().run_in_executor(executor, score, player)
+
+                # A 0 ms window only coalesces requests already waiting on the event loop
+                batchers = {f'{window:g} ms window': MicroBatcher(score, window_ms=window, max_rows=256,
+                                                                  executor=executor) for window in [2.0, 0.0]}
+                modes = [('one-row calls', one_row_calls, None)] + [
+                    (mode, batcher.submit, batcher) for mode, batcher in batchers.items()]
+                baseline = None
+                for mode, submit, batcher in modes:
+                    per_s, latencies_ms = asyncio.run(load(submit, clients))
+                    baseline = baseline or per_s
+                    rows.append({
+                        'scorer': scorer,
+                        'clients': clients,
+                        'mode': mode,
+                        'requests_per_s': round(per_s, 1),
+                        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2),
+                        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 2),
+                        'batch_rows': batcher.metrics.summary()['mean_batch_rows'] if batcher else 1.0,
+                        'speedup': round(per_s / baseline, 2),
+                    })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+def machine_info():
+    """Where and on what a result file was produced"""
+    import platform
+    from importlib.metadata import PackageNotFoundError, version
+
+    packages = {}
+    for name in ['numpy', 'pandas', 'scikit-learn', 'xgboost', 'streamlit']:
+        try:
+            packages[name] = version(name)
+        except PackageNotFoundError:
+            packages[name] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'packages': packages,
+    }
+
+
+def metric_direction(column):
+    """'lower' or 'higher' is better for a result column, 'same' if it must not change, else None"""
+    if column.endswith('per_s') or column in ('speedup', 'recall') or 'acc' in column or 'f1' in column:
+        return 'higher'
+    if column.endswith(('_ms', '_us', '_s', '_mb', '_per_row', 'seconds', 'logloss')):
+        return 'lower'
+    # Model calls a cache could not save, messages and bytes per rerun, prediction error
+    if column in ('model_calls', 'messages', 'kb_per_rerun', 'max_abs_diff'):
+        return 'lower'
+    # Counts that only change if results (or the workload) do
+    if column in ('result_rows', 'new_rows', 'batch_rows', 'reruns'):
+        return 'same'
+    return None
+
+
+def undirected_columns(name, rows):
+    """Numeric result columns of benchmark `name` that metric_direction does not know"""
+    params = BENCHMARK_PARAMS.get(name, ())
+    return sorted({
+        column for row in rows for column, value in row.items()
+        if column not in params and isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_))
+        and metric_direction(column) is None
+    })
+
+
+def row_key(name, row):
+    """Parameter columns identifying a result row of benchmark `name` (batch size, case, loader, ...)"""
+    return tuple((column, row.get(column)) for column in BENCHMARK_PARAMS.get(name, ()))
+
+
+def compare(base, new, threshold=0.1):
+    """Metrics that got worse by more than `threshold` (relative) between two result files"""
+    regressions = []
+    for name, new_rows in new['results'].items():
+        base_rows = {row_key(name, row): row for row in base['results'].get(name, [])}
+        for row in new_rows:
+            old = base_rows.get(row_key(name, row))
+            if old is None:
+                continue
+            for column, value in row.items():
+                direction = metric_direction(column)
+                before = old.get(column)
+                if direction is None or not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                    continue
+                if direction == 'same':
+                    worse, change = value != before, "changed"
+                elif before == 0:
+                    # Only an error-like metric starts at zero; any increase counts
+                    worse, change = direction == 'lower' and value > 0, "from 0"
+                else:
+                    relative = (value - before) / abs(before)
+                    worse, change = (relative if direction == 'lower' else -relative) > threshold, f"{relative:+.1%}"
+                if worse:
+                    regressions.append({
+                        'benchmark': name,
+                        'row': ' '.join(f"{column}={value}" for column, value in row_key(name, row)),
+                        'metric': column,
+                        'base': before,
+                        'new': value,
+                        'change': change,
+                    })
+    return regressions
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Injury predictor benchmarks")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--json', metavar='PATH', help="write results and machine info to PATH")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                        help="compare two result files instead of running benchmarks")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative change counted as a regression (default 0.1)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        regressions = compare(base, new, args.threshold)
+        print(f"Base: {base['machine']['commit']} on {base['machine']['processor']}, "
+              f"new: {new['machine']['commit']} on {new['machine']['processor']}")
+        if not regressions:
+            print(f"No regressions beyond {args.threshold:.0%}")
+            return 0
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        print_table(regressions, list(regressions[0]))
+        return 1
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+        return 1
+
+    results = {}
+    undirected = {}
+    for name in args.names or list(BENCHMARKS):
+        print(f"\n== {name}: {BENCHMARKS[name].__doc__}")
+        results[name] = BENCHMARKS[name]()
+        # A column --compare cannot judge would never be flagged as a regression
+        columns = undirected_columns(name, results[name])
+        if columns:
+            undirected[name] = columns
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'machine': machine_info(), 'results': results}, f, indent=2, default=str)
+        print(f"\nWrote {args.json}")
+    for name, columns in undirected.items():
+        print(f"{name} reports {', '.join(columns)} with no direction; add them to metric_direction")
+    return 1 if undirected else 0
+
+
+# Run all benchmarks, or only the ones named on the command line:
+#   python benchmark.py scoring train --json results.json
+#   python benchmark.py --compare base.json results.json
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
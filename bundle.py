@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+# Bumped whenever the on-disk layout changes; older readers refuse newer bundles
+BUNDLE_FORMAT_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+BOOSTER_FILE = 'booster.ubj'
+SCALER_ARRAYS = ['mean', 'scale', 'var']
+
+
+def _json_safe_params(model):
+    """Constructor params of an XGBClassifier that survive a JSON round trip"""
+    params = {}
+    for name, value in model.get_params().items():
+        if value is None or callable(value):
+            continue
+        try:
+            json.dumps(value)
+        except TypeError:
+            continue
+        params[name] = value
+    return params
+
+
+def save_bundle(path, model, scaler, feature_names, metadata=None):
+    """Write model, scaler and feature schema as one versioned bundle directory
+
+    The bundle is assembled in a temporary directory next to `path` and moved
+    into place at the end, so readers never see a half-written bundle.
+    """
+    import sklearn
+    import xgboost
+
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.bundle-', dir=parent)
+    os.chmod(tmp_dir, 0o755)
+    try:
+        # Booster in XGBoost's native binary JSON, readable by any XGBoost version
+        model.save_model(os.path.join(tmp_dir, BOOSTER_FILE))
+
+        # Scaler parameters as raw .npy files so they can be memory-mapped
+        for name in SCALER_ARRAYS:
+            np.save(os.path.join(tmp_dir, f'scaler_{name}.npy'),
+                    np.ascontiguousarray(getattr(scaler, f'{name}_'), dtype=np.float64))
+
+        manifest = {
+            'format_version': BUNDLE_FORMAT_VERSION,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'feature_names': list(feature_names),
+            'model': {
+                'file': BOOSTER_FILE,
+                'params': _json_safe_params(model),
+            },
+            'scaler': {
+                'arrays': {name: f'scaler_{name}.npy' for name in SCALER_ARRAYS},
+                'n_samples_seen': int(np.max(scaler.n_samples_seen_)),
+            },
+            'metadata': {
+                'xgboost_version': xgboost.__version__,
+                'sklearn_version': sklearn.__version__,
+                **(metadata or {}),
+            },
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the finished bundle into place
+        if os.path.exists(path):
+            old_dir = tempfile.mkdtemp(prefix='.bundle-old-', dir=parent)
+            os.rename(path, os.path.join(old_dir, 'bundle'))
+            os.rename(tmp_dir, path)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.rename(tmp_dir, path)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return path
+
+
+def read_manifest(path):
+    """Parse and validate a bundle's manifest"""
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported bundle format {manifest.get('format_version')} in {path}, "
+            f"expected {BUNDLE_FORMAT_VERSION}"
+        )
+    return manifest
+
+
+def load_bundle(path, mmap=True):
+    """Load (model, scaler, feature_names) from a bundle directory
+
+    Scaler arrays are memory-mapped by default, so they are only paged in
+    when first used.
+    """
+    # Imported here, not at the top: app workers scoring on a model server
+    # import this module but never load a bundle, and skip ~80 MB of libraries
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+
+    manifest = read_manifest(path)
+    feature_names = manifest['feature_names']
+
+    model = XGBClassifier(**manifest['model']['params'])
+    model.load_model(os.path.join(path, manifest['model']['file']))
+
+    arrays = {
+        name: np.load(os.path.join(path, filename), mmap_mode='r' if mmap else None)
+        for name, filename in manifest['scaler']['arrays'].items()
+    }
+    scaler = StandardScaler()
+    scaler.mean_ = arrays['mean']
+    scaler.scale_ = arrays['scale']
+    scaler.var_ = arrays['var']
+    scaler.n_features_in_ = len(feature_names)
+    scaler.feature_names_in_ = np.asarray(feature_names, dtype=object)
+    scaler.n_samples_seen_ = manifest['scaler']['n_samples_seen']
+
+    return model, scaler, feature_names
+
+
+# Convert the legacy model.pkl / scaler.pkl / feature_names.pkl trio into a
+# bundle at the given path, or publish it to the model registry
+if __name__ == '__main__':
+    import joblib
+
+    model = joblib.load('model.pkl')
+    scaler = joblib.load('scaler.pkl')
+    feature_names = joblib.load('feature_names.pkl')
+    metadata = {'source': 'converted from model.pkl, scaler.pkl, feature_names.pkl'}
+
+    if len(sys.argv) > 1:
+        save_bundle(sys.argv[1], model, scaler, feature_names, metadata=metadata)
+        print(f"Wrote {sys.argv[1]}")
+    else:
+        from registry import ModelRegistry
+        version = ModelRegistry().publish(model, scaler, feature_names, metadata=metadata)
+        print(f"Published {version}")
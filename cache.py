@@ -0,0 +1,223 @@
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+class PredictionCache:
+    """Size-bounded LRU cache of scoring results keyed by the feature vector
+
+    Feature vectors are rounded to `decimals` before hashing, so slider
+    states that only differ by float noise share one entry.
+    """
+
+    def __init__(self, maxsize=256, decimals=4):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def key(self, features):
+        """Hashable key for a feature vector"""
+        quantized = np.round(np.asarray(features, dtype=np.float64), self.decimals)
+        # -0.0 and 0.0 must hit the same entry
+        return (quantized + 0.0).tobytes()
+
+    def get(self, key):
+        """Cached value for key (marking it recently used), or None"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entry if full"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, features, compute):
+        """Return the cached result for features, calling compute() on a miss"""
+        key = self.key(features)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop all entries, e.g. after the model changed"""
+        self._entries.clear()
+
+    def stats(self):
+        """Counters for display and logging"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SharedPredictionCache(PredictionCache):
+    """Process-wide scoring cache shared by all sessions, keyed by model version
+
+    Entries are kept pickled, so sessions never share mutable objects and
+    memory is bounded by `max_bytes` rather than an entry count. Least
+    recently used entries are evicted first; with a `spill_path` they move
+    to a SQLite file instead (up to `max_disk_entries`) and are promoted
+    back on their next hit. Concurrent requests for the same key compute it
+    once and share the result. Entries of other model versions are dropped
+    by `retain_version`.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, spill_path=None, max_disk_entries=1_000_000, decimals=4):
+        super().__init__(maxsize=None, decimals=decimals)
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self.nbytes = 0
+        self.disk_hits = 0
+        self.spills = 0
+        self.version = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._disk = None
+        if spill_path is not None:
+            self._disk = sqlite3.connect(spill_path, check_same_thread=False)
+            self._disk.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key BLOB PRIMARY KEY,
+                    model_version TEXT,
+                    value BLOB NOT NULL,
+                    used_at REAL NOT NULL
+                )
+            """)
+            self._disk.execute("CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at)")
+            self._disk.commit()
+
+    def key(self, features, version=None):
+        """Fixed-size digest of (model version, quantized feature vector)"""
+        digest = hashlib.blake2b(str(version).encode() + b'\0', digest_size=16)
+        digest.update(super().key(features))
+        return digest.digest()
+
+    def _entry_size(self, key, blob):
+        # Payloads plus a rough allowance for the dict slot and bytes objects
+        return len(key) + len(blob) + 100
+
+    def get(self, key):
+        """Cached value for key from memory or the spill file, or None"""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pickle.loads(entry[1])
+        if self._disk is not None:
+            row = self._disk.execute("SELECT model_version, value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._disk.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._disk.commit()
+                self.hits += 1
+                self.disk_hits += 1
+                self._store(key, row[0], row[1])
+                return pickle.loads(row[1])
+        self.misses += 1
+        return None
+
+    def put(self, key, value, version=None):
+        with self._lock:
+            self._store(key, version, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _store(self, key, version, blob):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= self._entry_size(key, old[1])
+        self._entries[key] = (version, blob)
+        self.nbytes += self._entry_size(key, blob)
+        spilled = []
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            old_key, (old_version, old_blob) = self._entries.popitem(last=False)
+            self.nbytes -= self._entry_size(old_key, old_blob)
+            self.evictions += 1
+            spilled.append((old_key, old_version, old_blob, time.time()))
+        if spilled and self._disk is not None:
+            self._disk.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", spilled)
+            self.spills += len(spilled)
+            # Trim the spill file back to its bound, oldest first
+            excess = self._disk.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_disk_entries
+            if excess > 0:
+                self._disk.execute("DELETE FROM entries WHERE key IN "
+                                   "(SELECT key FROM entries ORDER BY used_at LIMIT ?)", (excess,))
+            self._disk.commit()
+
+    def get_or_compute(self, features, compute, version=None):
+        """Cached result for (version, features); compute() runs once per key across threads"""
+        key = self.key(features, version)
+        while True:
+            with self._lock:
+                value = self._get(key)
+                if value is not None:
+                    return value
+                pending = self._pending.get(key)
+                if pending is None:
+                    self._pending[key] = threading.Event()
+                    break
+            # Another session is computing this key: wait and read its result
+            pending.wait()
+        try:
+            value = compute()
+            self.put(key, value, version)
+            return value
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+
+    def retain_version(self, version):
+        """Drop every entry that does not belong to model `version`"""
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            for key in [key for key, (entry_version, _) in self._entries.items() if entry_version != version]:
+                self.nbytes -= self._entry_size(key, self._entries.pop(key)[1])
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM entries WHERE model_version IS NOT ?", (version,))
+                self._disk.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM entries")
+                self._disk.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = super().stats()
+            disk_size = (self._disk.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                         if self._disk is not None else 0)
+        stats.update({
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'disk_hits': self.disk_hits,
+            'spills': self.spills,
+            'disk_size': disk_size,
+        })
+        return stats
@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import os
+import re
+import signal
+import subprocess
+import sys
+
+from model_server import SOCKET_PATH, wait_for_server
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Cookie pinning a browser to the worker holding its session
+COOKIE_NAME = 'injury_worker'
+COOKIE_PATTERN = re.compile(rb'^cookie:.*?\b' + COOKIE_NAME.encode() + rb'=(\d+)', re.IGNORECASE | re.MULTILINE)
+# Largest request or response head the proxy reads before giving up
+MAX_HEAD_BYTES = 64 * 1024
+CHUNK_BYTES = 64 * 1024
+
+
+class StickyProxy:
+    """TCP reverse proxy sending every connection of a browser to the same worker
+
+    Streamlit keeps a session's state, uploads and media in the worker
+    process that ran it, so all of a browser's requests (the page, its
+    websocket and any reconnects) must reach that worker. The proxy only
+    reads the head of the first request on each connection: a known cookie
+    picks the worker, otherwise the worker with the fewest open connections
+    is chosen and the cookie is added to the first response. Everything
+    after that is copied through unchanged, so websockets just work.
+    """
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.connections = [0] * len(backends)
+
+    def pinned_worker(self, head):
+        match = COOKIE_PATTERN.search(head)
+        if match is not None and int(match.group(1)) < len(self.backends):
+            return int(match.group(1))
+        return None
+
+    async def open_backend(self, worker):
+        """(worker, reader, writer), trying the others if `worker` is down"""
+        order = sorted(range(len(self.backends)), key=lambda i: (i != worker, self.connections[i]))
+        for i in order:
+            try:
+                return (i,) + await asyncio.open_connection(*self.backends[i])
+            except OSError:
+                continue
+        raise ConnectionError("No worker is accepting connections")
+
+    async def pipe(self, reader, writer):
+        try:
+            while True:
+                data = await reader.read(CHUNK_BYTES)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (ConnectionError, OSError):
+            writer.close()
+
+    async def pipe_with_cookie(self, reader, writer, worker):
+        """Copy the response, adding the worker cookie to its head"""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.LimitOverrunError:
+            head = b''
+        except asyncio.IncompleteReadError as exc:
+            head = exc.partial
+        if head.endswith(b'\r\n\r\n'):
+            cookie = f'Set-Cookie: {COOKIE_NAME}={worker}; Path=/; HttpOnly; SameSite=Lax\r\n'.encode()
+            head = head[:-2] + cookie + b'\r\n'
+        writer.write(head)
+        await self.pipe(reader, writer)
+
+    async def handle(self, client_reader, client_writer):
+        try:
+            head = await client_reader.readuntil(b'\r\n\r\n')
+        except (asyncio.LimitOverrunError, asyncio.IncompleteReadError, ConnectionError):
+            client_writer.close()
+            return
+        pinned = self.pinned_worker(head)
+        try:
+            worker, backend_reader, backend_writer = await self.open_backend(pinned)
+        except ConnectionError:
+            client_writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            client_writer.close()
+            return
+
+        self.connections[worker] += 1
+        try:
+            backend_writer.write(head)
+            response = (self.pipe(backend_reader, client_writer) if worker == pinned
+                        else self.pipe_with_cookie(backend_reader, client_writer, worker))
+            await asyncio.gather(self.pipe(client_reader, backend_writer), response)
+        finally:
+            self.connections[worker] -= 1
+            backend_writer.close()
+            client_writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEAD_BYTES)
+        async with server:
+            await server.serve_forever()
+
+
+def start_model_server(socket_path, batch_window_ms=None, wait=True):
+    command = [sys.executable, os.path.join(current_dir, 'model_server.py'), '--socket', socket_path]
+    if batch_window_ms is not None:
+        command += ['--batch-window-ms', str(batch_window_ms)]
+    process = subprocess.Popen(command, cwd=current_dir)
+    if wait:
+        wait_for_server(socket_path)
+    return process
+
+
+def start_worker(port, socket_path):
+    """One headless Streamlit process on localhost, scoring on the model server"""
+    env = dict(os.environ)
+    if socket_path is not None:
+        env['MODEL_SERVER_SOCKET'] = socket_path
+    return subprocess.Popen([
+        sys.executable, '-m', 'streamlit', 'run', os.path.join(current_dir, 'app.py'),
+        '--server.port', str(port), '--server.address', '127.0.0.1', '--server.headless', 'true',
+        '--browser.gatherUsageStats', 'false',
+    ], cwd=current_dir, env=env)
+
+
+async def supervise(model_server, workers, ports, socket_path, batch_window_ms=None, interval=2.0):
+    """Restart the model server (a list of at most one process) and workers that exited"""
+    while True:
+        await asyncio.sleep(interval)
+        # Not waited for, so the proxy keeps serving; scoring fails until it listens again
+        if model_server and model_server[0].poll() is not None:
+            print(f"Model server exited with code {model_server[0].returncode}, restarting", flush=True)
+            model_server[0] = start_model_server(socket_path, batch_window_ms, wait=False)
+        for i, process in enumerate(workers):
+            if process.poll() is not None:
+                print(f"Worker {i} exited with code {process.returncode}, restarting", flush=True)
+                workers[i] = start_worker(ports[i], socket_path)
+
+
+async def run(args):
+    socket_path = None if args.no_model_server else args.socket
+    model_server = []
+    if socket_path is not None:
+        model_server.append(start_model_server(socket_path, args.batch_window_ms))
+    ports = [args.worker_port + i for i in range(args.workers)]
+    workers = [start_worker(port, socket_path) for port in ports]
+
+    proxy = StickyProxy([('127.0.0.1', port) for port in ports])
+    print(f"Proxy on {args.host}:{args.port} -> {args.workers} worker(s) on ports "
+          f"{ports[0]}-{ports[-1]}" + (f", model server on {socket_path}" if socket_path else ""), flush=True)
+    try:
+        await asyncio.gather(proxy.serve(args.host, args.port),
+                             supervise(model_server, workers, ports, socket_path, args.batch_window_ms))
+    finally:
+        for process in workers + model_server:
+            process.terminate()
+        for process in workers + model_server:
+            process.wait()
+
+
+# Serve the app from N Streamlit workers behind one port:
+#   python deploy.py --workers 4 --port 8501
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Multi-process deployment of the app")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8501)))
+    parser.add_argument('--worker-port', type=int, default=None, help="first worker port (default: port + 1)")
+    parser.add_argument('--socket', default=SOCKET_PATH, help="model server socket")
+    parser.add_argument('--batch-window-ms', type=float, default=None,
+                        help="model server batching window (default: its own)")
+    parser.add_argument('--no-model-server', action='store_true',
+                        help="load the model in every worker instead, for comparison")
+    args = parser.parse_args()
+    if args.worker_port is None:
+        args.worker_port = args.port + 1
+
+    # SIGTERM (e.g. from the platform) shuts the workers down like Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        asyncio.run(run(args))
+    except (KeyboardInterrupt, SystemExit):
+        pass
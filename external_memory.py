@@ -0,0 +1,125 @@
+import os
+import tempfile
+
+import numpy as np
+import xgboost
+from sklearn.preprocessing import StandardScaler
+
+from features import scale_features
+from ingest import CHUNK_ROWS, iter_training_batches, training_columns
+
+
+class BatchIter(xgboost.DataIter):
+    """Hand XGBoost one (X, y, weight) batch at a time from a batch factory
+
+    `make_batches()` must return a fresh iterator that yields the same
+    batches in the same order every time, since XGBoost may reset and
+    re-read the data.
+    """
+
+    def __init__(self, make_batches, cache_prefix=None):
+        self.make_batches = make_batches
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = iter(self.make_batches())
+        batch = next(self._batches, None)
+        if batch is None:
+            return 0
+        X, y, weight = batch
+        input_data(data=X, label=y, weight=weight)
+        return 1
+
+    def reset(self):
+        self._batches = None
+
+
+class StreamingDataset:
+    """A player CSV read chunk by chunk, with a reproducible train/test split
+
+    Chunks come from ingest.iter_training_batches, the reader behind
+    ingest.load_training_data, so both training routes see the features
+    serving builds. Each row's split is drawn from a generator seeded by
+    its chunk number, so every pass over the file sees the same split
+    without keeping any row indices in memory.
+    """
+
+    def __init__(self, path, test_size=0.2, chunksize=CHUNK_ROWS, random_state=42):
+        self.path = path
+        self.test_size = test_size
+        self.chunksize = chunksize
+        self.random_state = random_state
+        self.feature_names = training_columns(path)
+
+    def batches(self, subset):
+        """Yield (X, y) for the 'train' or 'test' rows of every chunk"""
+        for i, (X, y) in enumerate(iter_training_batches(self.path, self.chunksize)):
+            is_test = np.random.default_rng([self.random_state, i]).random(len(y)) < self.test_size
+            mask = is_test if subset == 'test' else ~is_test
+            if mask.any():
+                yield X[mask], y[mask]
+
+    def fit_scaler(self):
+        """First pass: scaler statistics and class counts of the training rows"""
+        scaler = StandardScaler()
+        class_counts = np.zeros(2, dtype=np.int64)
+        for X, y in self.batches('train'):
+            scaler.partial_fit(X.astype(np.float64))
+            class_counts += np.bincount(y, minlength=2)[:2]
+        # Same column names a scaler fitted on a DataFrame would record
+        scaler.feature_names_in_ = np.asarray(self.feature_names, dtype=object)
+        return scaler, class_counts
+
+    def scaled_batches(self, subset, scaler, class_weights=None):
+        """Yield scaled (X, y, weight) batches for XGBoost
+
+        Scaling happens in float64 through features.scale_features, so the
+        model sees the same values as with in-memory training and serving;
+        XGBoost rounds them to float32 itself, as it does for those.
+        """
+        for X, y in self.batches(subset):
+            weight = class_weights[y].astype(np.float32) if class_weights is not None else None
+            yield scale_features(X, scaler), y, weight
+
+
+def minority_weights(class_counts, factor=2.0):
+    """Per-class sample weights standing in for random oversampling
+
+    Weighting positives by `factor` (capped so they never outweigh the
+    majority class) matches duplicating them like train_model's
+    RandomOverSampler does, without materializing the copies.
+    """
+    n_majority, n_minority = class_counts[0], class_counts[1]
+    target = min(n_minority * factor, n_majority)
+    return np.array([1.0, target / n_minority if n_minority else 1.0])
+
+
+def train_external_memory(dataset, params, num_boost_round, callbacks=None, cache_dir=None):
+    """Train a booster whose data lives in on-disk pages, not in RAM
+
+    Returns (booster, scaler, class_counts). The cache pages are written to
+    `cache_dir` (a temporary directory by default) and removed afterwards.
+    """
+    scaler, class_counts = dataset.fit_scaler()
+    class_weights = minority_weights(class_counts)
+
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        data_iter = BatchIter(lambda: dataset.scaled_batches('train', scaler, class_weights),
+                              cache_prefix=os.path.join(tmp, 'cache'))
+        dtrain = xgboost.DMatrix(data_iter, missing=np.nan)
+        booster = xgboost.train({**params, 'tree_method': 'hist'}, dtrain,
+                                num_boost_round=num_boost_round, callbacks=callbacks)
+        del dtrain
+    return booster, scaler, class_counts
+
+
+def evaluate_accuracy(booster, dataset, scaler, threshold=0.5):
+    """Test-set accuracy, predicted one chunk at a time"""
+    correct = total = 0
+    for X, y, _ in dataset.scaled_batches('test', scaler):
+        prediction = booster.predict(xgboost.DMatrix(X)) >= threshold
+        correct += int((prediction == y).sum())
+        total += len(y)
+    return correct / total if total else float('nan')
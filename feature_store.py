@@ -0,0 +1,152 @@
+import argparse
+import itertools
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from features import DERIVATION_INPUTS, build_feature_matrix, input_columns
+from ingest import CHUNK_ROWS, SCHEMA, STAT_DTYPE, TARGET, iter_chunks
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+STORE_PATH = os.path.join(current_dir, 'feature_store')
+PARTITION_COLUMNS = ['season', 'league']
+UNKNOWN = 'unknown'
+
+# Arrow types matching ingest.SCHEMA; names are stored as plain strings since
+# Parquet dictionary-encodes them anyway
+ARROW_TYPES = {'category': pa.string(), 'uint8': pa.uint8(), 'float32': pa.float32()}
+
+
+class FeatureStore:
+    """Player stats as Parquet files partitioned by season and league
+
+    Layout::
+
+        feature_store/
+            season=2023-24/league=EPL/part-<id>-0.parquet
+            season=2023-24/league=LaLiga/...
+
+    Queries go through Arrow datasets: only the requested columns are read,
+    partitions that cannot match a filter are skipped without being opened,
+    and other filters are checked against Parquet row-group statistics
+    before any data is decoded.
+    """
+
+    def __init__(self, root=STORE_PATH):
+        self.root = root
+
+    def schema(self, columns):
+        """Arrow schema for raw CSV columns (partition columns excluded)"""
+        return pa.schema([
+            (name, ARROW_TYPES[SCHEMA.get(name, STAT_DTYPE)]) for name in columns
+            if name not in PARTITION_COLUMNS
+        ])
+
+    def ingest_csv(self, path, season=UNKNOWN, league=UNKNOWN, chunksize=CHUNK_ROWS):
+        """Append a player CSV, streamed in chunks; returns the number of rows
+
+        Rows go to the partitions named by the file's own season/league
+        columns when it has them, otherwise to the given season and league.
+        """
+        chunks = iter_chunks(path, chunksize)
+        first = next(chunks, None)
+        if first is None:
+            return 0
+        schema = self.schema(first.columns)
+        for name in PARTITION_COLUMNS:
+            schema = schema.append(pa.field(name, pa.string()))
+
+        n_rows = 0
+
+        def batches():
+            nonlocal n_rows
+            for chunk in itertools.chain([first], chunks):
+                n_rows += len(chunk)
+                # Categorical names become plain strings, missing partition keys the defaults
+                chunk = chunk.assign(**{
+                    name: chunk[name].astype(object) if name in chunk else default
+                    for name, default in [('player_name', None), ('season', season), ('league', league)]
+                    if name in schema.names
+                })
+                yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+        self.write_batches(batches(), schema)
+        return n_rows
+
+    def write_batches(self, batches, schema):
+        """Write record batches into the partitioned dataset, next to existing files"""
+        ds.write_dataset(
+            batches, self.root, schema=schema, format='parquet',
+            partitioning=ds.partitioning(pa.schema([schema.field(name) for name in PARTITION_COLUMNS]),
+                                         flavor='hive'),
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+            max_rows_per_group=CHUNK_ROWS,
+        )
+
+    def dataset(self):
+        return ds.dataset(self.root, format='parquet', partitioning='hive')
+
+    def partitions(self):
+        """Sorted (season, league) pairs present in the store"""
+        if not os.path.isdir(self.root):
+            return []
+        table = self.dataset().to_table(columns=PARTITION_COLUMNS)
+        return sorted(set(zip(table['season'].to_pylist(), table['league'].to_pylist())))
+
+    def query(self, columns=None, filters=None, as_arrow=False):
+        """Read `columns` of the rows matching `filters`
+
+        `filters` is a list of (column, op, value) tuples that must all hold,
+        e.g. [('season', '=', '2023-24'), ('position_DF', '=', 1), ('age', '>', 30)].
+        Ops are those of pyarrow.parquet: = == != < <= > >= in not in.
+        """
+        expression = pq.filters_to_expression(filters) if filters else None
+        table = self.dataset().to_table(columns=columns, filter=expression)
+        if as_arrow:
+            return table
+        return table.to_pandas(strings_to_categorical=True)
+
+    def load_training_data(self, feature_names, filters=None):
+        """Feature frame X (float32, model column order) and target y (uint8)
+
+        Only the model's raw inputs, the stats the derived features need and
+        the target are read from disk. X holds exactly the values serving
+        builds for the same players.
+        """
+        columns = list(dict.fromkeys(input_columns(feature_names) + DERIVATION_INPUTS + [TARGET]))
+        available = set(self.dataset().schema.names)
+        df = self.query([name for name in columns if name in available], filters)
+        X = build_feature_matrix(df, feature_names).astype(np.float32)
+        return (pd.DataFrame(X, columns=feature_names, copy=False),
+                pd.Series(df[TARGET].to_numpy(dtype=np.uint8), name=TARGET))
+
+
+# Load a CSV into the store or list its partitions
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Columnar player feature store")
+    parser.add_argument('--root', default=STORE_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = commands.add_parser('ingest', help="append a player CSV")
+    ingest_parser.add_argument('csv')
+    ingest_parser.add_argument('--season', default=UNKNOWN)
+    ingest_parser.add_argument('--league', default=UNKNOWN)
+    commands.add_parser('list', help="show partitions and row counts")
+    args = parser.parse_args()
+
+    store = FeatureStore(args.root)
+    if args.command == 'ingest':
+        n_rows = store.ingest_csv(args.csv, args.season, args.league)
+        print(f"Added {n_rows} rows to {args.root}")
+    else:
+        for season, league in store.partitions():
+            n_rows = store.dataset().count_rows(
+                filter=(ds.field('season') == season) & (ds.field('league') == league))
+            print(f"season={season} league={league}: {n_rows} rows")
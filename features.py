@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+# Columns computed from the raw player stats rather than supplied by the caller
+DERIVED_COLUMNS = ['injury_risk_score', 'match_fitness', 'workload_intensity']
+
+# Raw stats the derived columns are computed from
+DERIVATION_INPUTS = ['n_injuries', 'n_severe_injuries', 'minutes_90s', 'minutes', 'age', 'games', 'shots']
+
+# Precision of every model input. Training stores features in this dtype and
+# serving rounds to the same values (held in float64 for scaling), so both see
+# exactly the same numbers; derived features are computed in float64 first.
+FEATURE_DTYPE = np.float32
+
+
+def input_columns(feature_names):
+    """Raw columns a caller has to provide, in model order"""
+    return [name for name in feature_names if name not in DERIVED_COLUMNS]
+
+
+def derive_columns(col):
+    """Compute the engineered features from a mapping of float64 column arrays
+
+    This is the only place the formulas live: training, the app and the batch
+    scorer all go through it, so they cannot drift apart.
+    """
+    games = np.maximum(col['games'], 1)
+
+    # Enhanced injury risk scoring with workload management
+    injury_risk_score = (
+        col['n_injuries'] * 1.5 +
+        col['n_severe_injuries'] * 2.5 +
+        (col['minutes_90s'] > 30) * 1.0 +   # Match workload
+        (col['minutes'] > 3000) * 1.0 +     # Season workload
+        (col['age'] > 30) * 1.0 +           # Age factor
+        (col['games'] < 5) * 0.5 +          # Match fitness
+        (col['shots'] > 40) * 0.5           # Physical exertion
+    )
+
+    # Fitness indicators
+    return {
+        'injury_risk_score': injury_risk_score,
+        'match_fitness': col['minutes'] / games,
+        'workload_intensity': col['minutes_90s'] / games,
+    }
+
+
+def add_engineered_features(df):
+    """Return a copy of a raw stats DataFrame with the derived columns added
+
+    Float stats become FEATURE_DTYPE, with missing values as 0, and the
+    derived columns are stored in it too: the same values build_feature_matrix
+    returns for these players.
+    """
+    df = df.copy()
+    stats = df.select_dtypes('floating').columns
+    df[stats] = df[stats].fillna(0).astype(FEATURE_DTYPE)
+    raw = {name: df[name].to_numpy(dtype=np.float64) for name in DERIVATION_INPUTS}
+    for name, values in derive_columns(raw).items():
+        df[name] = values.astype(FEATURE_DTYPE)
+    return df
+
+
+def build_feature_matrix(players, feature_names):
+    """Build the float64 model input matrix for a batch of players
+
+    `players` is a DataFrame with (a subset of) the raw stat columns, or an
+    array whose columns follow `input_columns(feature_names)`. Missing
+    columns and values are treated as 0. Derived columns are always
+    recomputed. Every value is rounded to FEATURE_DTYPE, like the matrices
+    training stores.
+    """
+    n_features = len(feature_names)
+    if isinstance(players, pd.DataFrame):
+        X = np.zeros((len(players), n_features), dtype=np.float64)
+        for i, name in enumerate(feature_names):
+            if name in players.columns and name not in DERIVED_COLUMNS:
+                X[:, i] = players[name].to_numpy(dtype=np.float64, na_value=0.0)
+    else:
+        raw = np.asarray(players, dtype=np.float64)
+        if raw.ndim == 1:
+            raw = raw[np.newaxis, :]
+        raw_idx = [i for i, name in enumerate(feature_names) if name not in DERIVED_COLUMNS]
+        if raw.shape[1] != len(raw_idx):
+            raise ValueError(
+                f"Expected {len(raw_idx)} columns ({', '.join(input_columns(feature_names))}), "
+                f"got {raw.shape[1]}"
+            )
+        X = np.zeros((raw.shape[0], n_features), dtype=np.float64)
+        X[:, raw_idx] = np.nan_to_num(raw, nan=0.0)
+
+    X[:] = X.astype(FEATURE_DTYPE)
+    col = {name: X[:, i] for i, name in enumerate(feature_names)}
+    for name, values in derive_columns(col).items():
+        if name in col:
+            col[name][:] = values.astype(FEATURE_DTYPE)
+    return X
+
+
+def scale_features(X, scaler):
+    """Standardize a feature matrix in float64, whatever dtype it is stored in
+
+    Training and serving both scale through here, so a float32 training
+    matrix and a float64 serving batch give the model the same values.
+    """
+    return (np.asarray(X, dtype=np.float64) - scaler.mean_) / scaler.scale_
+
+
+def check_parity(df, feature_names):
+    """Compare training-path and serving-path features, return mismatching columns"""
+    # Training path: DataFrame-level feature engineering, then column selection
+    train_X = add_engineered_features(df)[feature_names].to_numpy(dtype=np.float64)
+
+    # Serving path: whole batch, raw array input and one-row-at-a-time like the app
+    raw = df.reindex(columns=input_columns(feature_names), fill_value=0)
+    candidates = {
+        'batch DataFrame': build_feature_matrix(df, feature_names),
+        'batch array': build_feature_matrix(raw.to_numpy(), feature_names),
+        'single rows': np.vstack([
+            build_feature_matrix(pd.DataFrame([row]), feature_names)
+            for row in raw.to_dict('records')
+        ]),
+    }
+
+    mismatches = []
+    for path, serve_X in candidates.items():
+        mismatches += mismatching_columns(train_X, serve_X, feature_names, path)
+    return mismatches
+
+
+def mismatching_columns(expected, actual, feature_names, path):
+    """(path, column) for every column of `actual` that differs from `expected`"""
+    if expected.shape != actual.shape:
+        return [(path, f'shape {actual.shape} != {expected.shape}')]
+    # Bit-for-bit comparison, NaN never occurs in these features
+    return [(path, name) for i, name in enumerate(feature_names)
+            if not np.array_equal(expected[:, i], actual[:, i])]
+
+
+def training_matrices(path, feature_names, scaler):
+    """{loader: (features, scaled features)} from every training loader, in file row order"""
+    # Imported here: the loaders are built on this module
+    import tempfile
+    from external_memory import StreamingDataset
+    from feature_store import FeatureStore
+    from ingest import load_training_data
+
+    X, _ = load_training_data(path)
+    X = X[feature_names]
+    matrices = {'ingest.load_training_data': (X.to_numpy(), scale_features(X, scaler))}
+
+    # No test rows, so every chunk comes back whole and in order
+    dataset = StreamingDataset(path, test_size=0.0)
+    if dataset.feature_names != list(feature_names):
+        raise ValueError(f"{path} does not have the model's feature columns")
+    matrices['StreamingDataset'] = (
+        np.vstack([X for X, _ in dataset.batches('train')]),
+        np.vstack([X for X, _, _ in dataset.scaled_batches('train', scaler)]),
+    )
+
+    # A store holding just this file keeps its rows in order
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeatureStore(tmp)
+        store.ingest_csv(path)
+        X, _ = store.load_training_data(feature_names)
+    matrices['FeatureStore.load_training_data'] = (X.to_numpy(), scale_features(X, scaler))
+    return matrices
+
+
+def check_training_parity(path, feature_names, scaler):
+    """Compare every training loader against serving, before and after scaling
+
+    Returns the mismatching (loader, column) pairs.
+    """
+    # Serving path: the app and the batch scorer parse the CSV as is
+    df = pd.read_csv(path, encoding='ISO-8859-1')
+    serve_X = build_feature_matrix(df, feature_names)
+    serve_scaled = scale_features(serve_X, scaler)
+
+    mismatches = []
+    for loader, (train_X, train_scaled) in training_matrices(path, feature_names, scaler).items():
+        mismatches += mismatching_columns(serve_X, train_X, feature_names, loader)
+        mismatches += mismatching_columns(serve_scaled, train_scaled, feature_names, f'{loader} scaled')
+    return mismatches
+
+
+# Check serving/training feature parity against the bundled dataset
+if __name__ == '__main__':
+    import sys
+    from scoring import DATA_PATH, load_artifacts
+
+    _, scaler, feature_names = load_artifacts()
+    df = pd.read_csv(DATA_PATH, encoding='ISO-8859-1')
+    df = df.drop(columns=["player_name", "currently_injured"], errors="ignore")
+
+    # Also cover the thresholds the risk score switches on
+    edges = pd.DataFrame({
+        'age': [30, 30.0001, 16, 45], 'games': [0, 5, 4, 1],
+        'minutes': [3000, 3001, 0, 4500], 'minutes_90s': [30, 30.1, 0, 50],
+        'shots': [40, 41, 0, 100], 'n_injuries': [0, 1, 3, 20],
+        'n_severe_injuries': [0, 1, 2, 10],
+    }).reindex(columns=df.columns, fill_value=0)
+    df = pd.concat([df, edges], ignore_index=True)
+
+    mismatches = check_parity(df, feature_names)
+    # Then the loaders training actually reads the CSV through
+    mismatches += check_training_parity(DATA_PATH, feature_names, scaler)
+    for path, name in mismatches:
+        print(f"MISMATCH {path}: {name}")
+    print(f"Checked {len(df)} rows x {len(feature_names)} features, serving and training loaders: "
+          f"{'OK' if not mismatches else f'{len(mismatches)} mismatches'}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from sensitivity import SWEEP_FEATURES, sensitivity_grid, sweep_values
+
+# Figures are built once per server process for each distinct input and shared
+# by every session and rerun; st.plotly_chart only reads them. They live here
+# rather than in app.py so the cached functions are not redefined on every rerun.
+
+
+def generate_historical_data(minutes):
+    """Generate historical performance data for a player"""
+    # Create sample historical data
+    dates = pd.date_range(end=pd.Timestamp.now(), periods=10, freq='W')
+    data = {
+        'Date': dates,
+        'Minutes Played': np.linspace(0, minutes, 10),
+        'Fitness Score': np.random.normal(80, 10, 10).clip(0, 100),
+        'Risk Score': np.random.normal(50, 15, 10).clip(0, 100)
+    }
+    return pd.DataFrame(data)
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def radar_figure(name, categories, values):
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=values,
+        theta=categories,
+        fill='toself',
+        name=name
+    ))
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )),
+        showlegend=False
+    )
+    return fig
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def comparison_figure(player1, values1, player2, values2, categories):
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=values1,
+        theta=categories,
+        fill='toself',
+        name=player1
+    ))
+    fig.add_trace(go.Scatterpolar(
+        r=values2,
+        theta=categories,
+        fill='toself',
+        name=player2
+    ))
+    fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
+        showlegend=True,
+        title='Player Comparison'
+    )
+    return fig
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def performance_trends(player, minutes):
+    """(sample history, chart) for a player, regenerated when their minutes change"""
+    historical_data = generate_historical_data(minutes)
+    fig = go.Figure()
+
+    # Add traces for each metric
+    for name, color in [('Minutes Played', '#2e7d32'), ('Fitness Score', '#1976d2'), ('Risk Score', '#d32f2f')]:
+        fig.add_trace(go.Scatter(
+            x=historical_data['Date'],
+            y=historical_data[name],
+            name=name,
+            line=dict(color=color)
+        ))
+
+    fig.update_layout(
+        title='Performance Trends',
+        xaxis_title='Date',
+        yaxis_title='Value',
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return historical_data, fig
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def sensitivity_figure(model_version, inputs, x_feature, y_feature, steps,
+                       _model, _scaler, _feature_names, _predictor=None):
+    """(number of what-if points, curve or heatmap) around the slider values `inputs`
+
+    Cached per model version; the underscored model arguments are not
+    hashed, so they must be the ones of `model_version`.
+    """
+    input_data = dict(inputs)
+    axes = [(x_feature, sweep_values(x_feature, input_data[x_feature], steps))]
+    if y_feature is not None:
+        axes.append((y_feature, sweep_values(y_feature, input_data[y_feature], steps)))
+    grid = sensitivity_grid(input_data, axes, _model, _scaler, _feature_names, _predictor)
+
+    x_label = SWEEP_FEATURES[x_feature][0]
+    if y_feature is None:
+        fig = go.Figure(go.Scatter(
+            x=axes[0][1], y=grid, mode='lines+markers', name='Injury probability',
+            line=dict(color='#2e7d32')
+        ))
+        fig.add_vline(x=input_data[x_feature], line_dash='dash', annotation_text='Current')
+        fig.update_layout(xaxis_title=x_label, yaxis_title='Injury probability', yaxis_range=[0, 1])
+    else:
+        fig = go.Figure(go.Heatmap(
+            x=axes[0][1], y=axes[1][1], z=grid.T, zmin=0, zmax=1,
+            colorscale='RdYlGn_r', colorbar=dict(title='Probability')
+        ))
+        fig.add_trace(go.Scatter(
+            x=[input_data[x_feature]], y=[input_data[y_feature]], mode='markers', name='Current',
+            marker=dict(symbol='x', size=12, color='black')
+        ))
+        fig.update_layout(xaxis_title=x_label, yaxis_title=SWEEP_FEATURES[y_feature][0])
+    fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+    return grid.size, fig
@@ -0,0 +1,167 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.preprocessing import StandardScaler
+from xgboost import Booster, XGBClassifier
+
+from features import build_feature_matrix, scale_features
+from ingest import TARGET
+from predictor import fold_threshold
+from registry import ModelRegistry
+
+# Trees added per update, on top of the current model's
+NEW_ROUNDS = 50
+# Share of each update's newest rows held out for validation
+HOLDOUT_FRACTION = 0.2
+# Most recent held-out rows kept for validating later updates
+HOLDOUT_WINDOW = 2000
+HOLDOUT_FILE = 'holdout.npz'
+# Largest holdout logloss increase a candidate may have and still be promoted
+MAX_LOGLOSS_INCREASE = 0.0
+
+
+def refit_scaler(scaler, X):
+    """Copy of a fitted StandardScaler with X folded into its running statistics"""
+    updated = StandardScaler()
+    updated.mean_ = np.array(scaler.mean_, dtype=np.float64)
+    updated.var_ = np.array(scaler.var_, dtype=np.float64)
+    updated.scale_ = np.array(scaler.scale_, dtype=np.float64)
+    updated.n_samples_seen_ = int(np.max(scaler.n_samples_seen_))
+    updated.n_features_in_ = scaler.n_features_in_
+    if hasattr(scaler, 'feature_names_in_'):
+        updated.feature_names_in_ = scaler.feature_names_in_
+    return updated.partial_fit(np.asarray(X, dtype=np.float64))
+
+
+def rescale_booster(booster, old_scaler, new_scaler):
+    """Booster whose split thresholds apply to new_scaler's output
+
+    A split `(x - m1) / s1 < t` on the old scaling is the raw split
+    `x < t * s1 + m1`, which is `(x - m2) / s2 < (t * s1 + m1 - m2) / s2`
+    on the new one. Splits usually sit exactly on a data value, so the raw
+    boundary is found exactly (as for the compiled predictor) and then
+    scaled the way serving scales inputs, keeping every decision the same.
+    """
+    old_mean, old_scale = np.asarray(old_scaler.mean_), np.asarray(old_scaler.scale_)
+    new_mean, new_scale = np.asarray(new_scaler.mean_), np.asarray(new_scaler.scale_)
+
+    model = json.loads(booster.save_raw('json'))
+    trees = model['learner']['gradient_booster']['model']['trees']
+
+    # All trees' nodes in one array, so the boundary search runs once
+    sizes = [len(tree['split_conditions']) for tree in trees]
+    is_split = np.concatenate([np.asarray(tree['left_children']) != -1 for tree in trees])
+    feature = np.concatenate([tree['split_indices'] for tree in trees])[is_split]
+    threshold = np.concatenate([tree['split_conditions'] for tree in trees]).astype(np.float32)
+    boundary = fold_threshold(threshold[is_split], old_mean[feature], old_scale[feature])
+    threshold[is_split] = ((boundary - new_mean[feature]) / new_scale[feature]).astype(np.float32)
+
+    for tree, conditions in zip(trees, np.split(threshold, np.cumsum(sizes)[:-1])):
+        tree['split_conditions'] = conditions.tolist()
+    return Booster(model_file=bytearray(json.dumps(model).encode()))
+
+
+def load_holdout(registry):
+    """Rolling holdout rows (raw feature matrix, labels) stored next to the registry"""
+    try:
+        with np.load(os.path.join(registry.root, HOLDOUT_FILE), allow_pickle=False) as data:
+            return data['X'], data['y']
+    except FileNotFoundError:
+        return None, None
+
+
+def save_holdout(registry, X, y, window=HOLDOUT_WINDOW):
+    """Keep the newest `window` holdout rows, replacing the file atomically"""
+    tmp_path = os.path.join(registry.root, f'.{HOLDOUT_FILE}.tmp.npz')
+    np.savez(tmp_path, X=X[-window:], y=y[-window:])
+    os.replace(tmp_path, os.path.join(registry.root, HOLDOUT_FILE))
+
+
+def holdout_metrics(model, scaler, X, y):
+    proba = model.predict_proba(scale_features(X, scaler))[:, 1]
+    return {'logloss': float(log_loss(y, proba, labels=[0, 1])),
+            'accuracy': float(accuracy_score(y, proba >= 0.5))}
+
+
+def update_model(players, registry=None, n_rounds=NEW_ROUNDS, holdout_fraction=HOLDOUT_FRACTION,
+                 max_logloss_increase=MAX_LOGLOSS_INCREASE):
+    """Continue boosting the current model on newly arrived rows
+
+    `players` is a DataFrame of raw stats plus currently_injured, oldest
+    first. Its newest `holdout_fraction` is held out and added to the
+    rolling holdout. The rest updates the scaler's running statistics (the
+    existing trees are rewritten to match) and grows `n_rounds` new trees.
+    The candidate is published as a new version and only becomes current
+    if its holdout logloss is no worse than the current model's.
+
+    Returns a report dict with versions, timings and holdout metrics.
+    """
+    start = time.perf_counter()
+    registry = registry or ModelRegistry()
+    current_version = registry.current_version()
+    model, scaler, feature_names = registry.load(current_version)
+
+    X_all = build_feature_matrix(players, feature_names)
+    y_all = players[TARGET].to_numpy(dtype=np.uint8)
+    n_holdout = int(round(len(y_all) * holdout_fraction))
+    n_train = len(y_all) - n_holdout
+    X_new, y_new = X_all[:n_train], y_all[:n_train]
+
+    # Rolling holdout: earlier updates' held-out rows plus this update's newest rows
+    X_hold, y_hold = load_holdout(registry)
+    if X_hold is None:
+        X_hold, y_hold = X_all[n_train:], y_all[n_train:]
+    else:
+        X_hold = np.vstack([X_hold, X_all[n_train:]])
+        y_hold = np.concatenate([y_hold, y_all[n_train:]])
+
+    # New scaling statistics, with the existing trees moved onto them
+    new_scaler = refit_scaler(scaler, X_new)
+    booster = rescale_booster(model.get_booster(), scaler, new_scaler)
+
+    candidate = XGBClassifier(**{**model.get_params(), 'n_estimators': n_rounds})
+    candidate.fit(scale_features(X_new, new_scaler), y_new, xgb_model=booster)
+    fit_seconds = time.perf_counter() - start
+
+    report = {
+        'base_version': current_version,
+        'n_train': int(n_train),
+        'n_holdout': int(len(y_hold)),
+        'n_trees': candidate.get_booster().num_boosted_rounds(),
+        'fit_seconds': fit_seconds,
+    }
+    if len(y_hold):
+        report['current'] = holdout_metrics(model, scaler, X_hold, y_hold)
+        report['candidate'] = holdout_metrics(candidate, new_scaler, X_hold, y_hold)
+        promote = report['candidate']['logloss'] <= report['current']['logloss'] + max_logloss_increase
+    else:
+        promote = True
+
+    report['version'] = registry.publish(candidate, new_scaler, feature_names, promote=promote, metadata={
+        'trained_by': 'incremental.update_model',
+        'base_version': current_version,
+        'n_new_rows': int(n_train),
+        'holdout': report.get('candidate'),
+    })
+    report['promoted'] = promote
+    if len(y_hold):
+        save_holdout(registry, X_hold, y_hold)
+    return report
+
+
+# Apply one matchday of new rows: python incremental.py matchday.csv
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python incremental.py NEW_ROWS.csv")
+        sys.exit(1)
+    from ingest import ENCODING
+
+    players = pd.read_csv(sys.argv[1], encoding=ENCODING)
+    report = update_model(players)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['promoted'] else 2)
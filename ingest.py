@@ -0,0 +1,94 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from features import DERIVED_COLUMNS, add_engineered_features
+
+ENCODING = 'ISO-8859-1'
+TARGET = 'currently_injured'
+CHUNK_ROWS = 20_000
+
+# Identifying columns, never used as features
+ID_COLUMNS = ['player_name', 'season', 'league']
+
+# Compact dtypes for the scraped player stats; columns not listed here are read as float32
+SCHEMA = {
+    'player_name': 'category',
+    'season': 'category',
+    'league': 'category',
+    'currently_injured': 'uint8',
+    'position_DF': 'uint8',
+    'position_FW': 'uint8',
+    'position_GK': 'uint8',
+    'position_MF': 'uint8',
+}
+STAT_DTYPE = 'float32'
+
+
+def column_dtypes(path):
+    """Schema dtype for every column in the file's header"""
+    header = pd.read_csv(path, encoding=ENCODING, nrows=0).columns
+    return {name: SCHEMA.get(name, STAT_DTYPE) for name in header}
+
+
+def iter_chunks(path, chunksize=CHUNK_ROWS, columns=None):
+    """Stream a player CSV as typed DataFrames of at most `chunksize` rows"""
+    dtypes = column_dtypes(path)
+    if columns is not None:
+        dtypes = {name: dtypes[name] for name in columns}
+    yield from pd.read_csv(path, encoding=ENCODING, dtype=dtypes, usecols=list(dtypes),
+                           chunksize=chunksize)
+
+
+def count_rows(path, chunksize=CHUNK_ROWS):
+    """Number of data rows, reading only the target column"""
+    return sum(len(chunk) for chunk in iter_chunks(path, chunksize, columns=[TARGET]))
+
+
+def training_columns(path):
+    """Raw stat columns of a player CSV followed by the engineered features"""
+    raw_columns = [name for name in column_dtypes(path) if name not in ID_COLUMNS + [TARGET]]
+    return raw_columns + [name for name in DERIVED_COLUMNS if name not in raw_columns]
+
+
+def iter_training_batches(path, chunksize=CHUNK_ROWS):
+    """Stream (X, y) chunks: float32 features in training_columns order, uint8 target"""
+    feature_columns = training_columns(path)
+    raw_columns = [name for name in feature_columns if name not in DERIVED_COLUMNS]
+    for chunk in iter_chunks(path, chunksize, columns=raw_columns + [TARGET]):
+        chunk = add_engineered_features(chunk)
+        yield chunk[feature_columns].to_numpy(dtype=np.float32), chunk[TARGET].to_numpy()
+
+
+def load_training_data(path, chunksize=CHUNK_ROWS):
+    """Feature frame X (float32) and target y (uint8) for training
+
+    The file is read twice in chunks: once to count rows, then to fill a
+    preallocated float32 matrix with each chunk's raw stats and engineered
+    features. Peak memory is the final matrix plus one chunk, however large
+    the file is. The values are bit-for-bit those serving builds with
+    features.build_feature_matrix; scale them with features.scale_features.
+    """
+    feature_columns = training_columns(path)
+    n_rows = count_rows(path, chunksize)
+    X = np.empty((n_rows, len(feature_columns)), dtype=np.float32)
+    y = np.empty(n_rows, dtype=np.uint8)
+
+    start = 0
+    for X_chunk, y_chunk in iter_training_batches(path, chunksize):
+        stop = start + len(X_chunk)
+        X[start:stop] = X_chunk
+        y[start:stop] = y_chunk
+        start = stop
+
+    return pd.DataFrame(X, columns=feature_columns, copy=False), pd.Series(y, name=TARGET)
+
+
+# Summarize a player CSV as it would be loaded for training
+if __name__ == '__main__':
+    from scoring import DATA_PATH
+
+    X, y = load_training_data(sys.argv[1] if len(sys.argv) > 1 else DATA_PATH)
+    print(f"{len(X)} rows x {X.shape[1]} features, {X.memory_usage(index=False).sum() / 1e6:.1f} MB")
+    print(f"Class counts: {y.value_counts().sort_index().to_dict()}")
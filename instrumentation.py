@@ -0,0 +1,145 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram upper bounds in seconds, Prometheus-style (an implicit +Inf follows)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Reruns kept for the profiling panel
+RECENT_RUNS = 20
+
+
+class Histogram:
+    """Cumulative-bucket duration histogram, as Prometheus expects it"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with '+Inf'"""
+        running, pairs = 0, []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+
+class Metrics:
+    """Process-wide stage timings: one histogram per stage plus the last reruns
+
+    Shared by every session of a server process, so updates take a lock.
+    """
+
+    def __init__(self, name='app_stage_duration_seconds', recent=RECENT_RUNS):
+        self.name = name
+        self.histograms = {}
+        self.recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def _observe(self, stage, seconds):
+        if stage not in self.histograms:
+            self.histograms[stage] = Histogram()
+        self.histograms[stage].observe(seconds)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._observe(stage, seconds)
+
+    def record_run(self, timings, session=None):
+        """Add a finished rerun's {stage: seconds} (including 'total')"""
+        with self._lock:
+            for stage, seconds in timings.items():
+                self._observe(stage, seconds)
+            self.recent.append({'time': time.time(), 'session': session, 'timings': dict(timings)})
+
+    def recent_runs(self, session=None):
+        """Latest reruns, oldest first, optionally only one session's"""
+        with self._lock:
+            runs = list(self.recent)
+        return [run for run in runs if session is None or run['session'] == session]
+
+    def prometheus_text(self):
+        """All histograms in the Prometheus text exposition format"""
+        lines = [f"# HELP {self.name} Wall time spent per stage.",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for stage in sorted(self.histograms):
+                histogram = self.histograms[stage]
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{self.name}_bucket{{stage="{label}",le="{bound}"}} {count}')
+                lines.append(f'{self.name}_sum{{stage="{label}"}} {histogram.total:.6f}')
+                lines.append(f'{self.name}_count{{stage="{label}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Monotonic timings for the stages of one script run or request
+
+    `lap(name)` charges the time since the previous lap to `name`, which
+    suits straight-line scripts; `stage(name)` times a block on its own.
+    Repeated names add up. `finish()` records everything in `metrics`.
+    """
+
+    def __init__(self, metrics, session=None):
+        self.metrics = metrics
+        self.session = session
+        self.timings = {}
+        self.finished = False
+        self.started = self._last = time.perf_counter()
+
+    def _add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self._add(name, now - self._last)
+        self._last = now
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - start)
+
+    def finish(self):
+        """Record the run (with its 'total') and return its timings"""
+        self.timings['total'] = time.perf_counter() - self.started
+        self.metrics.record_run(self.timings, self.session)
+        self.finished = True
+        return self.timings
+
+
+def start_metrics_server(metrics, host='0.0.0.0', port=9100):
+    """Serve metrics.prometheus_text() at /metrics from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,97 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmark import synthetic_players
+
+PLAYER_COLUMNS = [
+    'age', 'games', 'minutes', 'minutes_90s', 'shots', 'n_injuries', 'n_severe_injuries',
+    'position_DF', 'position_FW', 'position_GK', 'position_MF',
+]
+
+
+def make_payloads(n, batch_size):
+    """Pre-encoded request bodies, so the client does not measure its own JSON encoding"""
+    players = synthetic_players(n * batch_size)[PLAYER_COLUMNS].to_dict('records')
+    if batch_size == 1:
+        return [json.dumps(player).encode() for player in players]
+    return [
+        json.dumps({'players': players[i:i + batch_size]}).encode()
+        for i in range(0, len(players), batch_size)
+    ]
+
+
+def client(url, path, payloads, deadline, latencies, errors):
+    """One keep-alive connection sending requests back to back until the deadline"""
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    i = 0
+    while time.perf_counter() < deadline:
+        body = payloads[i % len(payloads)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as exc:
+            errors.append(type(exc).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run(base_url, concurrency, duration, batch_size):
+    """Hammer the API and return latency percentiles and throughput"""
+    url = urlparse(base_url)
+    path = '/predict' if batch_size == 1 else '/predict/batch'
+    payloads = make_payloads(200, batch_size)
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client, args=(url, path, payloads, deadline, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.asarray(latencies) * 1e3
+    return {
+        'endpoint': path,
+        'concurrency': concurrency,
+        'batch_size': batch_size,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 2) if len(latencies) else None,
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 2) if len(latencies) else None,
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'players_per_s': round(len(latencies) * batch_size / elapsed, 1),
+    }
+
+
+# Load-test a running `python service.py` instance
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test for the scoring API")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per run")
+    parser.add_argument('--batch-size', type=int, default=1, help="players per request; >1 uses /predict/batch")
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        print(json.dumps(run(args.url, concurrency, args.duration, args.batch_size)))
@@ -1,44 +1,35 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, RandomizedSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
 from xgboost import XGBClassifier
-from imblearn.over_sampling import SMOTE
-import pickle
+from features import add_engineered_features, scale_features
+from ingest import load_training_data
+from registry import ModelRegistry
+from resampling import Resampler
+from tuning import search
 
-# Load dataset
-df = pd.read_csv('balanced_data2.csv', encoding='ISO-8859-1')
+# Load dataset as compact float32 features and uint8 target
+X, y = load_training_data('balanced_data2.csv')
 
-df = df.drop(columns=["player_name"], errors="ignore")
-df['injury_risk_score'] = df['n_injuries'] * 2 + df['n_severe_injuries'] * 3
-
-X = df.drop(columns=["currently_injured"])
-y = df["currently_injured"]
-
-# Apply SMOTE
-try:
-    smote = SMOTE(random_state=42, sampling_strategy='auto')
-    X, y = smote.fit_resample(X, y)
-except ValueError:
-    pass
-
-# Split dataset
+# Split dataset before any resampling, so synthetic rows never reach the test set
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
 
-# Scale features
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
+# Scale features in float64, as serving does
+scaler = StandardScaler().fit(X_train.astype(np.float64))
+X_train_scaled = scale_features(X_train, scaler)
+X_test_scaled = scale_features(X_test, scaler)
 
-# Save feature names for consistency with app.py
-pickle.dump(list(X_train.columns), open('X_train_columns.pkl', 'wb'))
+# SMOTE on scaled training rows only: inside every CV fold during the search,
+# then once on the full training set for the final model
+smote = Resampler('smote', sampling_strategy='auto', random_state=42)
 
 # Calculate class weights
 class_weights = dict(zip(np.unique(y_train), 1 / np.bincount(y_train) * len(y_train)))
 
-# Define XGBoost model
-xgb = XGBClassifier(
+# Base XGBoost parameters
+xgb_params = dict(
     n_estimators=400,
     learning_rate=0.03,
     max_depth=5,
@@ -60,12 +51,16 @@ tuned_params = {
     'scale_pos_weight': [class_weights[1] * 1.5, class_weights[1] * 2, class_weights[1] * 2.5]
 }
 
-search = RandomizedSearchCV(xgb, param_distributions=tuned_params, n_iter=10, scoring='f1', cv=5, random_state=42)
-search.fit(X_train_scaled, y_train)
+# Trials run in parallel with early stopping and successive halving; an
+# interrupted search picks up from the trial store when rerun
+best_params, _ = search(X_train_scaled, y_train, tuned_params, base_params=xgb_params, n_trials=30, cv=5,
+                        resampler=smote)
+print(f"Best parameters: {best_params}")
 
-# Train best model
-best_xgb = search.best_estimator_
-best_xgb.fit(X_train_scaled, y_train)
+# Train best model once on the full training set
+X_fit, y_fit, _ = smote.fit_resample(X_train_scaled, y_train.to_numpy())
+best_xgb = XGBClassifier(**best_params)
+best_xgb.fit(X_fit, y_fit)
 
 # Evaluate model
 y_pred = best_xgb.predict(X_test_scaled)
@@ -82,15 +77,16 @@ print(f"Precision: {precision:.4f}")
 print(f"Recall: {recall:.4f}")
 print(f"F1 Score: {f1:.4f}")
 
-# Save model and scaler
-pickle.dump(best_xgb, open('model.pkl', 'wb'))
-pickle.dump(scaler, open('scaler.pkl', 'wb'))
+# Publish model, scaler and feature names as a new registry version
+ModelRegistry().publish(best_xgb, scaler, list(X_train.columns), metadata={
+    'trained_by': 'model.py',
+    'test_accuracy': float(accuracy),
+    'test_f1': float(f1),
+})
 # Add injury risk score to test data
-for player in test_players:
-    player['injury_risk_score'] = player['n_injuries'] * 2 + player['n_severe_injuries'] * 3
-
-# Convert to DataFrame
-test_df = pd.DataFrame(test_players)
+test_df = add_engineered_features(pd.DataFrame(test_players))
+for player, risk_score in zip(test_players, test_df['injury_risk_score']):
+    player['injury_risk_score'] = risk_score
 
 # Ensure same features as training data
 missing_cols = set(X_train.columns) - set(test_df.columns)
@@ -101,7 +97,7 @@ for col in missing_cols:
 test_df = test_df[X_train.columns]
 
 # Scale test data
-test_df_scaled = scaler.transform(test_df)
+test_df_scaled = scale_features(test_df, scaler)
 
 # Get probability scores
 proba = best_xgb.predict_proba(test_df_scaled)[:, 1]
@@ -0,0 +1,426 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from batching import BatchMetrics, MicroBatcher, prometheus_text
+from registry import ModelSnapshot
+
+SOCKET_PATH = os.environ.get('MODEL_SERVER_SOCKET', os.path.join(tempfile.gettempdir(), 'injury-model.sock'))
+
+# Every message is (header length, payload length), a JSON header and a raw
+# array payload, so feature matrices cross the socket without pickling
+FRAME = struct.Struct('!II')
+
+# The parts of a StandardScaler that scoring and explanations read
+Scaler = namedtuple('Scaler', ['mean_', 'scale_'])
+
+# Row-wise operations on a model version, coalesced across concurrent requests
+SCORING_OPS = ('predict_proba', 'compiled', 'contributions')
+
+# Scalers of this many past versions are kept, to translate scaled rows sent
+# for a version that is no longer served
+SCALER_HISTORY = 64
+
+
+def encode_frame(header, array=None):
+    """Bytes of one message; `array` is described in the header and sent as is"""
+    payload = b''
+    if array is not None:
+        array = np.ascontiguousarray(array)
+        header = {**header, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        payload = array.tobytes()
+    data = json.dumps(header).encode()
+    return FRAME.pack(len(data), len(payload)) + data + payload
+
+
+def decode_array(header, payload):
+    if 'shape' not in header:
+        return None
+    return np.frombuffer(payload, dtype=header['dtype']).reshape(header['shape'])
+
+
+class ModelServer:
+    """One process holding the model, scoring for every app worker over a Unix socket
+
+    Requests name the model version the worker is using. The current
+    version and the one it replaced stay loaded, so a worker mid-rerun
+    during a hot swap still gets scores from the model it started with.
+    A request for a version evicted since is scored by the current model
+    instead, and the response names that version so the worker refreshes.
+    Model calls run in a thread pool; XGBoost and NumPy release the GIL, so
+    concurrent workers' batches use all cores. Scoring requests for the
+    same operation and version arriving within `batch_window_ms` of each
+    other (up to `batch_max_rows` rows) share one model call; pass
+    batch_window_ms=None to score every request on its own. With a
+    `training_job`, workers start and follow training through the server,
+    so only this process ever trains.
+    """
+
+    def __init__(self, live_model, threads=None, keep=2, batch_window_ms=2.0, batch_max_rows=256,
+                 training_job=None):
+        self.live_model = live_model
+        self.training_job = training_job
+        self.keep = keep
+        self.executor = ThreadPoolExecutor(max_workers=threads or os.cpu_count() or 1)
+        self.batch_window_ms = batch_window_ms
+        self.batch_max_rows = batch_max_rows
+        self.batch_metrics = {op: BatchMetrics('model_server', {'op': op}) for op in SCORING_OPS}
+        self._batchers = {}
+        self._snapshots = OrderedDict()
+        # Version -> (scaler, feature names), kept after the model is evicted
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def snapshot(self, version=None):
+        """Current snapshot, or a recent one by version; None if no model yet"""
+        current = self.live_model.get()
+        with self._lock:
+            if current is not None and current.version not in self._snapshots:
+                self._snapshots[current.version] = current
+                while len(self._snapshots) > self.keep:
+                    self._snapshots.popitem(last=False)
+                self._layouts[current.version] = (current.scaler, list(current.feature_names))
+                while len(self._layouts) > SCALER_HISTORY:
+                    self._layouts.popitem(last=False)
+            if version is None:
+                return current
+            if version not in self._snapshots:
+                raise LookupError(f"Model {version} is no longer served")
+            return self._snapshots[version]
+
+    def layout(self, version):
+        """(scaler, feature names) of a past version, from memory or the registry"""
+        with self._lock:
+            if version in self._layouts:
+                return self._layouts[version]
+        # Not seen since this server started, e.g. after a restart
+        try:
+            _, scaler, feature_names = self.live_model.registry.load(version)
+        except (AttributeError, FileNotFoundError) as exc:
+            raise LookupError(f"Model {version} is no longer served") from exc
+        return scaler, list(feature_names)
+
+    def resolve(self, op, version, X):
+        """(snapshot, X) to score a request with
+
+        The requested version while it is served, otherwise the current one.
+        Rows arrive in the old version's feature layout; for predict_proba
+        they are also scaled with its scaler, so they are rescaled for the
+        current model.
+        """
+        try:
+            return self.snapshot(version), X
+        except LookupError:
+            current = self.snapshot()
+            if current is None:
+                raise
+        scaler, feature_names = self.layout(version)
+        if feature_names != list(current.feature_names):
+            raise LookupError(f"Model {version} is no longer served and {current.version} "
+                              f"uses different features")
+        if op == 'predict_proba' and X is not None:
+            raw = X * scaler.scale_ + scaler.mean_
+            X = (raw - current.scaler.mean_) / current.scaler.scale_
+        return current, X
+
+    def info(self, known_version):
+        """Current version, plus its feature names and scaler if the caller has another"""
+        snapshot = self.snapshot()
+        if snapshot is None or snapshot.version == known_version:
+            return {'version': snapshot and snapshot.version}
+        return {
+            'version': snapshot.version,
+            'feature_names': list(snapshot.feature_names),
+            'mean': snapshot.scaler.mean_.tolist(),
+            'scale': snapshot.scaler.scale_.tolist(),
+        }
+
+    def training(self, action):
+        """Training job state after `action`: 'status', 'start' or 'ensure_started'"""
+        job = self.training_job
+        if job is None:
+            raise LookupError("This model server does not train models")
+        started = False
+        if action == 'start':
+            started = job.start()
+        elif action == 'ensure_started':
+            job.ensure_started()
+        elif action != 'status':
+            raise ValueError(f"Unknown training action {action!r}")
+        return {'status': job.status(), 'running': job.is_running(), 'started': started}
+
+    def score(self, op, version, approximate, X):
+        """One row of output per row of X"""
+        snapshot, X = self.resolve(op, version, X)
+        if op == 'predict_proba':
+            # X is already scaled, as for the local model
+            return snapshot.model.predict_proba(X)[:, 1]
+        if op == 'compiled':
+            return snapshot.predictor.predict_proba(X)
+        from explain import contributions
+        return contributions(X, snapshot.model, snapshot.scaler, approximate)
+
+    async def handle(self, header, X):
+        """(response header, response array) for one request"""
+        loop = asyncio.get_running_loop()
+        op = header['op']
+        if op == 'info':
+            return await loop.run_in_executor(self.executor, self.info, header.get('version')), None
+        if op == 'training':
+            return await loop.run_in_executor(self.executor, self.training, header.get('action', 'status')), None
+        if op not in SCORING_OPS:
+            raise ValueError(f"Unknown operation {op!r}")
+        version, response = header['version'], {}
+        with self._lock:
+            served = version in self._snapshots
+        if not served:
+            # Evicted (or from before a restart): score with the current model
+            # and tell the client which version that was
+            snapshot, X = await loop.run_in_executor(self.executor, self.resolve, op, version, X)
+            version, response = snapshot.version, {'version': snapshot.version}
+        key = (op, version, header.get('approximate', False))
+        if self.batch_window_ms is None:
+            return response, await loop.run_in_executor(self.executor, self.score, *key, X)
+        if key not in self._batchers:
+            # A new key usually means a promotion: forget batchers of versions no longer served
+            with self._lock:
+                served = set(self._snapshots)
+            for stale in [other for other in self._batchers if other[1] not in served]:
+                del self._batchers[stale]
+            self._batchers[key] = MicroBatcher(functools.partial(self.score, *key), self.batch_window_ms,
+                                               self.batch_max_rows, self.batch_metrics[op], self.executor)
+        return response, await self._batchers[key].submit(X)
+
+    def prometheus_text(self):
+        return prometheus_text(self.batch_metrics.values())
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header_size, payload_size = FRAME.unpack(await reader.readexactly(FRAME.size))
+                    header = json.loads(await reader.readexactly(header_size))
+                    payload = await reader.readexactly(payload_size)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    response, array = await self.handle(header, decode_array(header, payload))
+                except Exception as exc:
+                    response, array = {'error': f"{type(exc).__name__}: {exc}"}, None
+                writer.write(encode_frame(response, array))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, path=SOCKET_PATH):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.serve_connection, path)
+        async with server:
+            await server.serve_forever()
+
+
+class ModelClient:
+    """Blocking requests to a ModelServer, safe to share between threads
+
+    Streamlit runs every rerun on a new thread, so connections are pooled
+    rather than kept per thread.
+    """
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError as exc:
+            sock.close()
+            raise ConnectionError(f"No model server at {self.path}: {exc}") from exc
+        return sock, sock.makefile('rb')
+
+    def request(self, header, array=None):
+        """(response header, response array), raising RuntimeError for server errors"""
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        # An idle connection may have been closed by a server restart: retry once
+        for attempt in range(2):
+            if connection is None:
+                connection = self._connect()
+            sock, stream = connection
+            try:
+                sock.sendall(encode_frame(header, array))
+                prefix = stream.read(FRAME.size)
+                if len(prefix) < FRAME.size:
+                    raise ConnectionError("Model server closed the connection")
+                header_size, payload_size = FRAME.unpack(prefix)
+                response = json.loads(stream.read(header_size))
+                payload = stream.read(payload_size)
+                break
+            except OSError:
+                sock.close()
+                connection = None
+                if attempt:
+                    raise
+        with self._lock:
+            self._idle.append(connection)
+        if 'error' in response:
+            raise RuntimeError(f"Model server: {response['error']}")
+        return response, decode_array(response, payload)
+
+    def close(self):
+        with self._lock:
+            for sock, _ in self._idle:
+                sock.close()
+            self._idle.clear()
+
+
+class RemoteModel:
+    """Stands in for the XGBClassifier of one model version on the server
+
+    `on_replaced(version)` is called when the server no longer serves this
+    version and answered with the current model instead.
+    """
+
+    def __init__(self, client, version, on_replaced=None):
+        self.client = client
+        self.version = version
+        self.on_replaced = on_replaced
+
+    def _request(self, header, X):
+        response, result = self.client.request({**header, 'version': self.version},
+                                               np.asarray(X, dtype=np.float64))
+        if response.get('version', self.version) != self.version and self.on_replaced is not None:
+            self.on_replaced(self.version)
+        return result
+
+    def predict_proba(self, X_scaled):
+        probability = self._request({'op': 'predict_proba'}, X_scaled)
+        return np.column_stack([1 - probability, probability])
+
+    def contributions(self, X, approximate=False):
+        """explain.contributions computed by the server, from the raw matrix"""
+        return self._request({'op': 'contributions', 'approximate': approximate}, X)
+
+
+class RemotePredictor(RemoteModel):
+    """Stands in for the CompiledPredictor of one model version on the server"""
+
+    def predict_proba(self, X):
+        return self._request({'op': 'compiled'}, X)
+
+
+class RemoteLiveModel:
+    """LiveModel whose snapshots score on a shared model server
+
+    `get()` asks the server for its current version on every call (one
+    small round trip) and only fetches the feature names and scaler again
+    when it changed; the model itself never leaves the server.
+    """
+
+    def __init__(self, path=SOCKET_PATH):
+        self.client = ModelClient(path)
+        self._snapshot = None
+
+    def get(self):
+        """Current snapshot, None if the server has no model yet"""
+        snapshot = self._snapshot
+        info, _ = self.client.request({'op': 'info', 'version': snapshot and snapshot.version})
+        version = info['version']
+        if version is None:
+            return None
+        if snapshot is None or snapshot.version != version:
+            scaler = Scaler(np.asarray(info['mean']), np.asarray(info['scale']))
+            snapshot = self._snapshot = ModelSnapshot(
+                version, RemoteModel(self.client, version, self.replaced), scaler, info['feature_names'],
+                RemotePredictor(self.client, version, self.replaced)
+            )
+        return snapshot
+
+    def replaced(self, version):
+        """Forget a snapshot the server stopped serving; the next get() fetches the current one"""
+        if self._snapshot is not None and self._snapshot.version == version:
+            self._snapshot = None
+
+
+class RemoteTrainingJob:
+    """Stands in for a TrainingJob, training on the model server that owns the registry"""
+
+    def __init__(self, path=SOCKET_PATH):
+        self.client = ModelClient(path)
+
+    def _request(self, action):
+        response, _ = self.client.request({'op': 'training', 'action': action})
+        return response
+
+    def start(self):
+        """Start training on the server unless a run is already in progress"""
+        return self._request('start')['started']
+
+    def ensure_started(self):
+        self._request('ensure_started')
+
+    def is_running(self):
+        return self._request('status')['running']
+
+    def status(self):
+        return self._request('status')['status']
+
+
+def wait_for_server(path=SOCKET_PATH, timeout=60.0):
+    """Block until a model server accepts connections at path"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ModelClient(path).request({'op': 'info'})
+            return
+        except ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+# Serve the registry's current model to every app worker on this machine
+if __name__ == '__main__':
+    from instrumentation import start_metrics_server
+    from registry import LiveModel, ModelRegistry
+    from training_job import TrainingJob
+
+    parser = argparse.ArgumentParser(description="Shared model server")
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    parser.add_argument('--threads', type=int, default=None, help="concurrent model calls (default: cores)")
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help="how long a request waits for others to share its model call")
+    parser.add_argument('--batch-max-rows', type=int, default=256, help="rows that close a batch early")
+    parser.add_argument('--no-batching', action='store_true', help="score every request on its own")
+    parser.add_argument('--metrics-port', type=int, default=None, help="serve batching metrics at /metrics")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    # Train here rather than in every worker; the new model hot-swaps in
+    training_job = TrainingJob()
+    if registry.current_version() is None:
+        training_job.start()
+    server = ModelServer(LiveModel(registry), threads=args.threads,
+                         batch_window_ms=None if args.no_batching else args.batch_window_ms,
+                         batch_max_rows=args.batch_max_rows, training_job=training_job)
+    if args.metrics_port:
+        start_metrics_server(server, port=args.metrics_port)
+    print(f"Model server listening on {args.socket}", flush=True)
+    try:
+        asyncio.run(server.serve(args.socket))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,234 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest import iter_chunks
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+STORE_PATH = os.environ.get('PLAYER_STORE_PATH', os.path.join(current_dir, 'players.sqlite'))
+
+# Stats kept per player, as used by the app's sliders and the model
+STAT_COLUMNS = ['age', 'games', 'minutes', 'minutes_90s', 'shots', 'n_injuries', 'n_severe_injuries']
+POSITION_COLUMNS = ['position_FW', 'position_MF', 'position_DF', 'position_GK']
+PROFILE_COLUMNS = STAT_COLUMNS + POSITION_COLUMNS
+
+# Roster a new store starts with
+DEFAULT_PLAYERS = {
+    "Lionel Messi": dict(age=23, games=14, minutes=1260, minutes_90s=14, shots=20, n_injuries=2,
+                         n_severe_injuries=0, position_FW=1, position_MF=0, position_DF=0, position_GK=0),
+    "Cristiano Ronaldo": dict(age=28, games=12, minutes=873, minutes_90s=9.7, shots=15, n_injuries=4,
+                              n_severe_injuries=1, position_FW=1, position_MF=0, position_DF=0, position_GK=0),
+    "Sergio Ramos": dict(age=31, games=8, minutes=701, minutes_90s=7.8, shots=9, n_injuries=1,
+                         n_severe_injuries=0, position_FW=0, position_MF=0, position_DF=1, position_GK=0),
+    "Toni Kroos": dict(age=25, games=15, minutes=1350, minutes_90s=15, shots=25, n_injuries=3,
+                       n_severe_injuries=1, position_FW=0, position_MF=1, position_DF=0, position_GK=0),
+    "Pepe": dict(age=29, games=10, minutes=900, minutes_90s=10, shots=12, n_injuries=0,
+                 n_severe_injuries=0, position_FW=0, position_MF=0, position_DF=1, position_GK=0),
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    team TEXT,
+    position TEXT,
+    {', '.join(f'{name} REAL NOT NULL DEFAULT 0' for name in STAT_COLUMNS)},
+    {', '.join(f'{name} INTEGER NOT NULL DEFAULT 0' for name in POSITION_COLUMNS)},
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_position ON players (position, name);
+CREATE INDEX IF NOT EXISTS players_team ON players (team, name);
+
+CREATE TABLE IF NOT EXISTS scores (
+    player_id INTEGER NOT NULL,
+    model_version TEXT NOT NULL,
+    probability REAL NOT NULL,
+    injury_risk_score REAL NOT NULL,
+    risk_level TEXT NOT NULL,
+    is_injured INTEGER NOT NULL,
+    contributions BLOB,
+    PRIMARY KEY (player_id, model_version)
+) WITHOUT ROWID;
+
+-- A player's cached scores go stale as soon as any of their stats change
+CREATE TRIGGER IF NOT EXISTS players_stats_changed AFTER UPDATE ON players
+WHEN {' OR '.join(f'OLD.{name} IS NOT NEW.{name}' for name in PROFILE_COLUMNS)}
+BEGIN
+    DELETE FROM scores WHERE player_id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS players_deleted AFTER DELETE ON players
+BEGIN
+    DELETE FROM scores WHERE player_id = OLD.id;
+END;
+"""
+
+
+class PlayerStore:
+    """Player profiles in SQLite, shared by every session and kept across restarts
+
+    Names are unique and indexed, as are position and team. One connection
+    is opened per store and reused; calls are serialized with a lock, so a
+    single store can be shared between Streamlit's script threads. Scores
+    are cached per (player, model version) and dropped by a trigger when the
+    player's stats change.
+    """
+
+    def __init__(self, path=STORE_PATH, seed=DEFAULT_PLAYERS):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            # Stores created before scores carried their explanation
+            columns = [row['name'] for row in self.conn.execute("PRAGMA table_info(scores)")]
+            if 'contributions' not in columns:
+                self.conn.execute("ALTER TABLE scores ADD COLUMN contributions BLOB")
+        if seed and not self.count():
+            self.save_many(pd.DataFrame.from_dict(seed, orient='index').rename_axis('name').reset_index())
+
+    def close(self):
+        self.conn.close()
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    @staticmethod
+    def _where(position=None, team=None):
+        """WHERE clause and parameters for the optional position/team filters"""
+        conditions = {'position': position, 'team': team}
+        conditions = {name: value for name, value in conditions.items() if value is not None}
+        if not conditions:
+            return "", []
+        return " WHERE " + " AND ".join(f"{name} = ?" for name in conditions), list(conditions.values())
+
+    def names(self, position=None, team=None):
+        """Player names in alphabetical order, optionally of one position and/or team"""
+        where, params = self._where(position, team)
+        with self._lock:
+            # Plain tuples: building a Row per name would dominate for large rosters
+            cursor = self.conn.cursor()
+            cursor.row_factory = None
+            return [name for name, in cursor.execute(f"SELECT name FROM players{where} ORDER BY name", params)]
+
+    def revision(self):
+        """(player count, latest update time): changes whenever a player is saved or deleted"""
+        with self._lock:
+            return tuple(self.conn.execute("SELECT COUNT(*), MAX(updated_at) FROM players").fetchone())
+
+    def teams(self):
+        with self._lock:
+            return [row['team'] for row in self.conn.execute(
+                "SELECT DISTINCT team FROM players WHERE team IS NOT NULL ORDER BY team")]
+
+    def get(self, name):
+        """Profile dict (id, name, team, position and PROFILE_COLUMNS), or None"""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM players WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def save(self, name, stats, team=None):
+        """Insert or update one player; returns its id"""
+        self.save_many(pd.DataFrame([{'name': name, 'team': team, **stats}]))
+        return self.get(name)['id']
+
+    def save_many(self, players):
+        """Insert or update players from a DataFrame with a `name` column
+
+        Missing stat columns are stored as 0 and a missing team as NULL.
+        Updating a player whose stats differ drops their cached scores.
+        """
+        columns = ['name', 'team', 'position'] + PROFILE_COLUMNS + ['updated_at']
+        players = players.reindex(columns=['name', 'team'] + PROFILE_COLUMNS)
+        players[PROFILE_COLUMNS] = players[PROFILE_COLUMNS].fillna(0)
+        players = players.astype({name: float for name in STAT_COLUMNS} | {name: int for name in POSITION_COLUMNS})
+        positions = players[POSITION_COLUMNS].to_numpy().argmax(axis=1)
+        players['position'] = [
+            POSITION_COLUMNS[i][len('position_'):] if flags.any() else None
+            for i, flags in zip(positions, players[POSITION_COLUMNS].to_numpy() > 0)
+        ]
+        players['updated_at'] = time.time()
+        players['team'] = players['team'].astype(object).where(players['team'].notna(), None)
+        updates = ', '.join(f'{name} = excluded.{name}' for name in columns if name != 'name')
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO players ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (name) DO UPDATE SET {updates}",
+                players[columns].itertuples(index=False, name=None),
+            )
+
+    def delete(self, name):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM players WHERE name = ?", (name,))
+
+    def frame(self, position=None, team=None):
+        """All matching players as a DataFrame indexed by player id"""
+        where, params = self._where(position, team)
+        with self._lock:
+            return pd.read_sql_query(f"SELECT * FROM players{where}", self.conn, params=params, index_col='id')
+
+    def cached_score(self, player_id, model_version):
+        """Score stored for the player's current stats under model_version, or None
+
+        `contributions` is the float32 explanation array saved with it, or None.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT probability, injury_risk_score, risk_level, is_injured, contributions FROM scores "
+                "WHERE player_id = ? AND model_version = ?", (player_id, model_version)
+            ).fetchone()
+        if row is None:
+            return None
+        score = dict(row)
+        if score['contributions'] is not None:
+            score['contributions'] = np.frombuffer(score['contributions'], dtype=np.float32)
+        return score
+
+    def save_score(self, player_id, model_version, result):
+        contributions = result.get('contributions')
+        if contributions is not None:
+            contributions = np.asarray(contributions, dtype=np.float32).tobytes()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (player_id, model_version, float(result['probability']), float(result['injury_risk_score']),
+                 str(result['risk_level']), int(bool(result['is_injured'])), contributions),
+            )
+
+
+# Import a roster CSV into the store or list the stored players
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Persistent player profiles")
+    parser.add_argument('--path', default=STORE_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="add or update players from a CSV with player_name")
+    import_parser.add_argument('csv')
+    import_parser.add_argument('--team')
+    commands.add_parser('list', help="show players by position")
+    args = parser.parse_args()
+
+    store = PlayerStore(args.path)
+    if args.command == 'import':
+        n_rows = 0
+        for chunk in iter_chunks(args.csv):
+            chunk = chunk.rename(columns={'player_name': 'name'})
+            chunk['name'] = chunk['name'].astype(str)
+            if args.team is not None or 'team' not in chunk:
+                chunk['team'] = args.team
+            # Later rows for the same name win
+            store.save_many(chunk.drop_duplicates('name', keep='last'))
+            n_rows += len(chunk)
+        print(f"Imported {n_rows} rows, {store.count()} players in {args.path}")
+    else:
+        players = store.frame()
+        print(players.groupby(players['position'].fillna('-')).size().to_string())
+        print(f"{len(players)} players")
@@ -0,0 +1,172 @@
+import json
+import numpy as np
+
+# Rows walked through the trees at once; keeps the (rows x trees) node index
+# matrix small enough to stay in cache regardless of batch size
+CHUNK_ROWS = 512
+
+
+def _scaled(x, mean, scale):
+    """What XGBoost compares against: the float64 scaled value rounded to float32"""
+    return ((x - mean) / scale).astype(np.float32)
+
+
+def fold_threshold(threshold, mean, scale):
+    """Smallest raw value whose scaled value is not below `threshold`
+
+    Splits often sit exactly on a data value (e.g. n_injuries == 2), so the
+    naive t * scale + mean can land on the wrong side of it. Bisecting for the
+    exact float64 boundary keeps every left/right decision identical to
+    scaler.transform followed by XGBoost's float32 comparison.
+    """
+    estimate = threshold.astype(np.float64) * scale + mean
+    # One float32 step in scaled space is a safe bracket around the boundary
+    step = (np.spacing(np.abs(threshold)) + np.finfo(np.float32).tiny) * scale * 4
+    lo, hi = estimate - step, estimate + step
+    while True:
+        lo_ok = _scaled(lo, mean, scale) < threshold
+        hi_ok = _scaled(hi, mean, scale) >= threshold
+        if lo_ok.all() and hi_ok.all():
+            break
+        lo = np.where(lo_ok, lo, lo - step)
+        hi = np.where(hi_ok, hi, hi + step)
+        step *= 2
+
+    # lo always goes left, hi always goes right; shrink until they are adjacent
+    while True:
+        mid = lo + (hi - lo) / 2
+        active = (mid > lo) & (mid < hi)
+        if not active.any():
+            return hi
+        right = _scaled(mid, mean, scale) >= threshold
+        hi = np.where(active & right, mid, hi)
+        lo = np.where(active & ~right, mid, lo)
+
+
+class CompiledPredictor:
+    """XGBoost trees with the StandardScaler folded into the split thresholds
+
+    The original path scales every row and then compares the scaled value
+    against each split: (x - mean) / scale < t. Since scale > 0 that is the
+    same test as x < t * scale + mean, so the scaler can be applied once to
+    the thresholds at build time and inference runs on raw features. All
+    trees are flattened into a handful of NumPy arrays and walked level by
+    level for the whole batch, with no pandas, sklearn or DMatrix involved.
+    """
+
+    def __init__(self, feature, threshold, left, default_left, value,
+                 roots, max_depth, base_margin):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_margin = base_margin
+
+    @classmethod
+    def from_artifacts(cls, model, scaler):
+        """Build a predictor from a fitted XGBClassifier and StandardScaler"""
+        booster = model.get_booster()
+        learner = json.loads(booster.save_raw('json'))['learner']
+
+        if learner['objective']['name'] != 'binary:logistic':
+            raise ValueError(f"Unsupported objective {learner['objective']['name']}")
+        if learner['gradient_booster']['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster {learner['gradient_booster']['name']}")
+
+        trees = learner['gradient_booster']['model']['trees']
+        best_iteration = learner['attributes'].get('best_iteration')
+        if best_iteration is not None:
+            trees = trees[:int(best_iteration) + 1]
+
+        base_score = float(learner['learner_model_param']['base_score'])
+        base_margin = np.log(base_score / (1 - base_score))
+
+        mean = np.asarray(scaler.mean_, dtype=np.float64)
+        scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+        features, thresholds, lefts, defaults, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            old_left = tree['left_children']
+            old_right = tree['right_children']
+
+            # Breadth-first relayout so every right child sits right after its
+            # left sibling: the walk is then node = left + (x >= threshold)
+            order, depth = [0], [0]
+            for node, node_depth in zip(order, depth):
+                if old_left[node] != -1:
+                    order += [old_left[node], old_right[node]]
+                    depth += [node_depth + 1, node_depth + 1]
+            order = np.asarray(order, dtype=np.intp)
+            new_id = np.empty(len(old_left), dtype=np.intp)
+            new_id[order] = np.arange(len(order))
+
+            left = np.asarray(old_left, dtype=np.intp)[order]
+            split_index = np.asarray(tree['split_indices'], dtype=np.intp)[order]
+            condition = np.asarray(tree['split_conditions'], dtype=np.float64)[order]
+            is_leaf = left == -1
+
+            # Leaves point back at themselves with an infinite threshold, so
+            # extra steps are no-ops and every row takes the same number of steps
+            node_ids = np.arange(len(order))
+            left = np.where(is_leaf, node_ids, new_id[np.where(is_leaf, 0, left)]) + offset
+
+            threshold = np.full(len(order), np.inf)
+            split = ~is_leaf
+            threshold[split] = fold_threshold(
+                condition[split].astype(np.float32),
+                mean[split_index[split]], scale[split_index[split]]
+            )
+
+            features.append(np.where(is_leaf, 0, split_index))
+            thresholds.append(threshold)
+            lefts.append(left)
+            defaults.append(np.asarray(tree['default_left'], dtype=bool)[order] | is_leaf)
+            values.append(np.where(is_leaf, condition, 0.0))
+            roots.append(offset)
+            max_depth = max(max_depth, max(depth))
+            offset += len(order)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            default_left=np.concatenate(defaults),
+            value=np.concatenate(values).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            base_margin=base_margin,
+        )
+
+    def predict_margin(self, X):
+        """Raw margin (log-odds) for an (n, n_features) array of unscaled features"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        has_missing = np.isnan(X).any()
+
+        margin = np.empty(X.shape[0], dtype=np.float32)
+        n_features = X.shape[1]
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            flat = chunk.ravel()
+            row_offset = (np.arange(chunk.shape[0]) * n_features)[:, np.newaxis]
+
+            node = np.broadcast_to(self.roots, (chunk.shape[0], len(self.roots)))
+            for _ in range(self.max_depth):
+                x = flat[row_offset + self.feature[node]]
+                go_right = x >= self.threshold[node]
+                if has_missing:
+                    go_right = np.where(np.isnan(x), ~self.default_left[node], go_right)
+                node = self.left[node] + go_right
+
+            margin[start:start + CHUNK_ROWS] = self.value[node].sum(axis=1)
+        return margin + self.base_margin
+
+    def predict_proba(self, X):
+        """Injury probability (0-1) for an (n, n_features) array of unscaled features"""
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
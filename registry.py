@@ -0,0 +1,166 @@
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+
+from bundle import load_bundle, read_manifest, save_bundle
+from predictor import CompiledPredictor
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+REGISTRY_PATH = os.path.join(current_dir, 'models')
+CURRENT_FILE = 'CURRENT'
+VERSION_PATTERN = re.compile(r'^v(\d{4,})$')
+
+# Everything a scoring call needs, swapped as one object
+ModelSnapshot = namedtuple('ModelSnapshot', ['version', 'model', 'scaler', 'feature_names', 'predictor'])
+
+
+class ModelRegistry:
+    """Versioned model bundles on disk plus a CURRENT pointer
+
+    Layout::
+
+        models/
+            v0001/        bundle written by bundle.save_bundle
+            v0002/
+            CURRENT       "v0002"
+
+    Publishing writes the new bundle first and then replaces CURRENT in one
+    rename, so readers see either the old or the new version, never a mix.
+    """
+
+    def __init__(self, root=REGISTRY_PATH):
+        self.root = root
+
+    def versions(self):
+        """All published versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        found = [name for name in os.listdir(self.root) if VERSION_PATTERN.match(name)]
+        return sorted(found, key=lambda name: int(VERSION_PATTERN.match(name).group(1)))
+
+    def path(self, version):
+        return os.path.join(self.root, version)
+
+    def current_version(self):
+        """Version CURRENT points at, or None for an empty registry"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_current(self, version):
+        """Atomically point CURRENT at an existing version"""
+        read_manifest(self.path(version))  # refuse to promote a broken bundle
+        fd, tmp_path = tempfile.mkstemp(prefix='.current-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+
+    def _reserve_version(self):
+        """Claim the next free version directory name"""
+        os.makedirs(self.root, exist_ok=True)
+        existing = self.versions()
+        number = int(VERSION_PATTERN.match(existing[-1]).group(1)) + 1 if existing else 1
+        while True:
+            version = f'v{number:04d}'
+            try:
+                os.mkdir(self.path(version))
+                return version
+            except FileExistsError:
+                number += 1
+
+    def publish(self, model, scaler, feature_names, metadata=None, promote=True, keep=5):
+        """Save a new version and (by default) make it current
+
+        Old versions are pruned either way, so unpromoted candidates do not
+        pile up.
+        """
+        version = self._reserve_version()
+        try:
+            save_bundle(self.path(version), model, scaler, feature_names,
+                        metadata={'version': version, **(metadata or {})})
+        except BaseException:
+            shutil.rmtree(self.path(version), ignore_errors=True)
+            raise
+        if promote:
+            self.set_current(version)
+        self.prune(keep)
+        return version
+
+    def prune(self, keep=5):
+        """Delete all but the newest `keep` versions, never the current one"""
+        current = self.current_version()
+        for version in self.versions()[:-keep]:
+            if version != current:
+                shutil.rmtree(self.path(version), ignore_errors=True)
+
+    def load(self, version=None):
+        """(model, scaler, feature_names) for a version, default current"""
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No current model in {self.root}")
+        return load_bundle(self.path(version))
+
+
+class LiveModel:
+    """Process-wide handle on the registry's current model
+
+    Every caller gets an immutable ModelSnapshot. When CURRENT moves, the
+    first caller to notice loads the new version under a lock while others
+    keep serving the old snapshot, then the reference is swapped in one
+    assignment. Each version is loaded at most once per process.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Current snapshot, reloading if the pointer moved; None if no model yet"""
+        snapshot = self._snapshot
+        version = self.registry.current_version()
+        if version is None or (snapshot is not None and snapshot.version == version):
+            return snapshot
+
+        # Someone else is already loading: keep serving what we have
+        if snapshot is not None and not self._lock.acquire(blocking=False):
+            return snapshot
+        if snapshot is None:
+            self._lock.acquire()
+        try:
+            if self._snapshot is None or self._snapshot.version != version:
+                model, scaler, feature_names = self.registry.load(version)
+                self._snapshot = ModelSnapshot(
+                    version, model, scaler, feature_names,
+                    CompiledPredictor.from_artifacts(model, scaler)
+                )
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+
+# List versions or promote one, e.g. to roll back: python registry.py promote v0001
+if __name__ == '__main__':
+    registry = ModelRegistry()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+
+    if command == 'list':
+        current = registry.current_version()
+        for version in registry.versions():
+            metadata = read_manifest(registry.path(version))['metadata']
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  {metadata.get('trained_by', metadata.get('source', ''))}")
+    elif command == 'promote' and len(sys.argv) > 2:
+        registry.set_current(sys.argv[2])
+        print(f"CURRENT -> {sys.argv[2]}")
+    else:
+        print("Usage: python registry.py [list | promote VERSION]")
+        sys.exit(1)
@@ -0,0 +1,187 @@
+import numpy as np
+
+# Distance entries computed at once during the neighbour search (~4 MB of float32)
+DISTANCE_BLOCK = 1_000_000
+# Above this many rows in a class, neighbours are searched approximately
+EXACT_NEIGHBOURS_LIMIT = 2_000
+# k-means steps used to build the approximate search's cells
+KMEANS_STEPS = 3
+
+
+def target_counts(y, sampling_strategy='auto'):
+    """Rows wanted per class after oversampling
+
+    'auto' brings every class up to the majority count; a dict
+    {class: count} sets counts explicitly. Classes are never shrunk.
+    """
+    classes, counts = np.unique(y, return_counts=True)
+    current = dict(zip(classes.tolist(), counts.tolist()))
+    if sampling_strategy == 'auto':
+        wanted = {label: max(counts) for label in current}
+    else:
+        wanted = {**current, **sampling_strategy}
+    return {label: max(int(wanted[label]), current[label]) for label in current}
+
+
+def oversample_indices(y, sampling_strategy='auto', random_state=42):
+    """Row indices of a randomly oversampled training set
+
+    Same result as RandomOverSampler, but as an index array: rows are only
+    copied if the caller does X[indices].
+    """
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    extra = []
+    for label, wanted in target_counts(y, sampling_strategy).items():
+        members = np.flatnonzero(y == label)
+        if wanted > len(members):
+            extra.append(rng.choice(members, wanted - len(members), replace=True))
+    return np.concatenate([np.arange(len(y))] + extra)
+
+
+def oversample_weights(y, sampling_strategy='auto', random_state=42):
+    """Per-row sample weights equivalent to oversample_indices, with no copies"""
+    indices = oversample_indices(y, sampling_strategy, random_state)
+    return np.bincount(indices, minlength=len(y)).astype(np.float32)
+
+
+def nearest_neighbours(queries, candidates, k, exclude_self=None):
+    """Indices of the k nearest candidates (Euclidean) for every query row
+
+    Brute force in float32 matrix products, a block of queries at a time.
+    `exclude_self[i]` is the candidate index of query i itself, or -1.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    candidates = np.asarray(candidates, dtype=np.float32)
+    candidate_norms = np.einsum('ij,ij->i', candidates, candidates)
+    block = max(1, DISTANCE_BLOCK // len(candidates))
+    neighbours = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), block):
+        chunk = queries[start:start + block]
+        distances = candidate_norms[np.newaxis, :] - 2 * chunk @ candidates.T
+        if exclude_self is not None:
+            own = exclude_self[start:start + block]
+            rows = np.flatnonzero(own >= 0)
+            distances[rows, own[rows]] = np.inf
+        nearest = np.argpartition(distances, k, axis=1)[:, :k]
+        neighbours[start:start + block] = nearest
+    return neighbours
+
+
+def closest_centroids(X, centroids, m):
+    """Indices of the m closest centroids for every row of X, closest first"""
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    block = max(1, DISTANCE_BLOCK // len(centroids))
+    closest = np.empty((len(X), m), dtype=np.int64)
+    for start in range(0, len(X), block):
+        distances = centroid_norms[np.newaxis, :] - 2 * X[start:start + block] @ centroids.T
+        nearest = np.argpartition(distances, m - 1, axis=1)[:, :m]
+        by_distance = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1)
+        closest[start:start + block] = np.take_along_axis(nearest, by_distance, axis=1)
+    return closest
+
+
+def approximate_neighbours(queries, X, k, random_state=42):
+    """Approximate k nearest rows of X for the rows X[queries]
+
+    X is split into about sqrt(n) cells by a few k-means steps. Every row
+    is listed in its two closest cells, and a query is compared exactly
+    against the list of its own closest cell only. Neighbours across a
+    cell boundary are found through the second listing, and the cost is
+    about n * sqrt(n) instead of n ** 2.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    rng = np.random.default_rng(random_state)
+    n_cells = max(1, int(np.sqrt(len(X))))
+    centroids = X[rng.choice(len(X), n_cells, replace=False)]
+    for _ in range(KMEANS_STEPS):
+        cell = closest_centroids(X, centroids, 1)[:, 0]
+        counts = np.bincount(cell, minlength=n_cells)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, cell, X)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, np.newaxis]
+
+    listed = closest_centroids(X, centroids, min(2, n_cells))
+    home = listed[queries, 0]
+    members_by_cell = np.argsort(listed.ravel(), kind='stable')
+    bounds = np.searchsorted(listed.ravel()[members_by_cell], np.arange(n_cells + 1))
+
+    neighbours = np.empty((len(queries), k), dtype=np.int64)
+    for c in np.unique(home):
+        in_cell = np.flatnonzero(home == c)
+        members = members_by_cell[bounds[c]:bounds[c + 1]] // listed.shape[1]
+        if len(members) <= k:
+            # Tiny cell: fall back to the whole class
+            members = np.arange(len(X))
+        position = np.full(len(X), -1)
+        position[members] = np.arange(len(members))
+        found = nearest_neighbours(X[queries[in_cell]], X[members], k, exclude_self=position[queries[in_cell]])
+        neighbours[in_cell] = members[found]
+    return neighbours
+
+
+def smote_samples(X, y, sampling_strategy='auto', k_neighbors=5, random_state=42):
+    """Synthetic minority rows, SMOTE-style
+
+    Each synthetic row lies on the segment between a random minority row
+    and one of its k nearest minority neighbours. Neighbours are only
+    searched for rows actually picked as a base: exactly while the class
+    has at most EXACT_NEIGHBOURS_LIMIT rows, approximately beyond that.
+    Returns (X_synthetic, y_synthetic).
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    new_X, new_y = [], []
+    for label, wanted in target_counts(y, sampling_strategy).items():
+        members = np.flatnonzero(y == label)
+        n_new = wanted - len(members)
+        if n_new <= 0 or len(members) < 2:
+            continue
+        X_class = X[members]
+        k = min(k_neighbors, len(members) - 1)
+
+        base = rng.integers(0, len(members), n_new)
+        queries, base_row = np.unique(base, return_inverse=True)
+        if len(members) <= EXACT_NEIGHBOURS_LIMIT:
+            neighbours = nearest_neighbours(X_class[queries], X_class, k, exclude_self=queries)
+        else:
+            neighbours = approximate_neighbours(queries, X_class, k, random_state)
+
+        partner = neighbours[base_row, rng.integers(0, k, n_new)]
+        gap = rng.random((n_new, 1))
+        new_X.append((X_class[base] + gap * (X_class[partner] - X_class[base])).astype(X.dtype))
+        new_y.append(np.full(n_new, label, dtype=y.dtype))
+
+    if not new_X:
+        return X[:0], y[:0]
+    return np.concatenate(new_X), np.concatenate(new_y)
+
+
+class Resampler:
+    """Rebalancing applied to a training set (or CV training fold) only
+
+    method='weights' returns the rows untouched with oversampling expressed
+    as sample weights; method='smote' appends synthetic minority rows.
+    Test and validation rows must never be passed through it.
+    """
+
+    def __init__(self, method='weights', sampling_strategy='auto', k_neighbors=5, random_state=42):
+        if method not in ('weights', 'smote'):
+            raise ValueError(f"Unknown resampling method {method!r}, use 'weights' or 'smote'")
+        self.method = method
+        self.sampling_strategy = sampling_strategy
+        self.k_neighbors = k_neighbors
+        self.random_state = random_state
+
+    def __repr__(self):
+        return (f"Resampler(method={self.method!r}, sampling_strategy={self.sampling_strategy!r}, "
+                f"k_neighbors={self.k_neighbors}, random_state={self.random_state})")
+
+    def fit_resample(self, X, y):
+        """(X, y, sample_weight) to train on; sample_weight is None for SMOTE"""
+        if self.method == 'weights':
+            return X, y, oversample_weights(y, self.sampling_strategy, self.random_state)
+        X_new, y_new = smote_samples(X, y, self.sampling_strategy, self.k_neighbors, self.random_state)
+        return np.concatenate([np.asarray(X), X_new]), np.concatenate([np.asarray(y), y_new]), None
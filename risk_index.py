@@ -0,0 +1,215 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from features import build_feature_matrix, input_columns
+from ingest import iter_chunks
+from scoring import COMPILED_BATCH_LIMIT, score_players
+
+POSITIONS = ['GK', 'DF', 'MF', 'FW']
+POSITION_COLUMNS = [f'position_{position}' for position in POSITIONS]
+RISK_LEVELS = np.array(['Low', 'Medium', 'High'], dtype=object)
+
+
+class RiskIndex:
+    """Every player's latest score as columns, kept sorted by injury probability
+
+    Players are identified by their DataFrame index (`sync_csv` and
+    `sync_league` use the player name). `sync` rescores only players that are new or whose stats
+    changed and merges them into the sorted order, so `top` and `page` are
+    slices of precomputed arrays rather than a scoring pass.
+    """
+
+    def __init__(self, model, scaler, feature_names, predictor=None, version=None):
+        self.model = model
+        self.scaler = scaler
+        self.feature_names = feature_names
+        self.predictor = predictor
+        self.version = version
+        self.source = None
+        inputs = input_columns(feature_names)
+        self.input_idx = [i for i, name in enumerate(feature_names) if name in inputs]
+
+        # One row per player ever indexed; removed players drop out of `order`
+        self.keys = np.empty(0, dtype=object)
+        self.names = np.empty(0, dtype=object)
+        self.positions = np.zeros((0, len(POSITIONS)), dtype=bool)
+        self.features = np.zeros((0, len(inputs)), dtype=np.float64)
+        self.probability = np.empty(0, dtype=np.float32)
+        self.risk_score = np.empty(0, dtype=np.float32)
+        self.risk_level = np.empty(0, dtype=np.uint8)
+        self.alive = np.empty(0, dtype=bool)
+        # Live rows by descending probability, and the same per position
+        self.order = np.empty(0, dtype=np.int64)
+        self._by_position = {}
+        # Player key -> row number
+        self._rows = pd.Series(np.empty(0, dtype=np.int64))
+        self._lock = threading.Lock()
+        # Held for a whole update, scoring included, so concurrent syncs diff
+        # against each other's results instead of all rescoring the same players
+        self._update_lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.order)
+
+    def _grow(self, n):
+        """Append n empty rows to every column, returning their row numbers"""
+        start = len(self.keys)
+        for name in ['keys', 'names', 'positions', 'features', 'probability', 'risk_score',
+                     'risk_level', 'alive']:
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros((n,) + column.shape[1:], column.dtype)]))
+        return np.arange(start, start + n)
+
+    def _merge(self, rows):
+        """Reinsert `rows` into the sorted order after their scores changed"""
+        moved = np.zeros(len(self.keys), dtype=bool)
+        moved[rows] = True
+        keep = self.order[~moved[self.order]]
+        rows = rows[self.alive[rows]]
+        rows = rows[np.argsort(-self.probability[rows], kind='stable')]
+        at = np.searchsorted(-self.probability[keep], -self.probability[rows], side='right')
+        self.order = np.insert(keep, at, rows)
+        self._by_position = {}
+
+    def _lookup(self, keys):
+        """Row numbers of player keys, -1 for players not in the index"""
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        position = self._rows.index.get_indexer(keys)
+        found = position >= 0
+        rows[found] = self._rows.to_numpy()[position[found]]
+        return rows
+
+    def upsert(self, players):
+        """Score new or changed players (a DataFrame of raw stats) and reindex them"""
+        if len(players) == 0:
+            return
+        predictor = self.predictor if len(players) <= COMPILED_BATCH_LIMIT else None
+        with self._update_lock:
+            scores = score_players(players, self.model, self.scaler, self.feature_names, predictor)
+            X = build_feature_matrix(players, self.feature_names)[:, self.input_idx]
+            with self._lock:
+                rows = self._lookup(players.index)
+                new = rows < 0
+                if new.any():
+                    rows[new] = self._grow(int(new.sum()))
+                    self._rows = pd.concat([self._rows, pd.Series(rows[new], index=players.index[new])])
+
+                self.keys[rows] = players.index.to_numpy(dtype=object)
+                self.names[rows] = (players['player_name'].astype(str).to_numpy(dtype=object)
+                                    if 'player_name' in players else players.index.astype(str))
+                self.positions[rows] = players.reindex(columns=POSITION_COLUMNS, fill_value=0).to_numpy() > 0
+                self.features[rows] = X
+                self.probability[rows] = scores['probability'].to_numpy()
+                self.risk_score[rows] = scores['injury_risk_score'].to_numpy()
+                self.risk_level[rows] = pd.Categorical(scores['risk_level'], categories=RISK_LEVELS).codes
+                self.alive[rows] = True
+                self._merge(rows)
+
+    def remove(self, keys):
+        """Drop players from the rankings"""
+        with self._update_lock, self._lock:
+            rows = self._lookup(pd.Index(keys))
+            rows = rows[rows >= 0]
+            if len(rows):
+                self._rows = self._rows[~self._rows.index.isin(keys)]
+                self.alive[rows] = False
+                self._merge(rows)
+
+    def sync(self, players):
+        """Make the index match `players` exactly, rescoring only what changed
+
+        `players` must have one row per player key. Returns the number of
+        players rescored.
+        """
+        X = build_feature_matrix(players, self.feature_names)[:, self.input_idx]
+        with self._update_lock:
+            rows = self._lookup(players.index)
+            changed = rows < 0
+            known = ~changed
+            changed[known] = (X[known] != self.features[rows[known]]).any(axis=1)
+            if 'player_name' in players:
+                names = players['player_name'].astype(str).to_numpy(dtype=object)
+                changed[known] |= names[known] != self.names[rows[known]]
+
+            self.remove(self._rows.index.difference(players.index))
+            self.upsert(players[changed])
+        return int(changed.sum())
+
+    def _csv_players(self, path):
+        """Model inputs of a player CSV, one row per name (the last one listed)"""
+        columns = ['player_name'] + input_columns(self.feature_names)
+        players = pd.concat(list(iter_chunks(path, columns=columns)), ignore_index=True)
+        players['player_name'] = players['player_name'].astype(str)
+        return players.drop_duplicates('player_name', keep='last')
+
+    def _synced(self, source, load):
+        """sync() with the players `load()` returns, unless `source` is unchanged since the last call"""
+        with self._update_lock:
+            if source == self.source:
+                return 0
+            players = load()
+            players.index = pd.Index(players['player_name'], name=None)
+            rescored = self.sync(players)
+            self.source = source
+        return rescored
+
+    def sync_csv(self, path):
+        """sync() with a player CSV, only when the file changed since the last call
+
+        Players are keyed by name, so inserting or deleting a row only
+        rescores that player; a name listed twice keeps its last row.
+        """
+        stat = os.stat(path)
+        return self._synced((path, stat.st_mtime_ns, stat.st_size), lambda: self._csv_players(path))
+
+    def sync_league(self, path, store):
+        """sync() with a player CSV plus a PlayerStore, only when either changed
+
+        A store profile replaces the CSV row of the same name, so players
+        added or edited in the app rank with their current stats.
+        """
+        def load():
+            # The store keeps only the profile stats; the others score as 0
+            profiles = store.frame().rename(columns={'name': 'player_name'})
+            profiles = profiles[[name for name in ['player_name'] + input_columns(self.feature_names)
+                                 if name in profiles]]
+            players = pd.concat([self._csv_players(path), profiles], ignore_index=True)
+            return players.drop_duplicates('player_name', keep='last')
+
+        stat = os.stat(path)
+        return self._synced((path, stat.st_mtime_ns, stat.st_size, store.path, store.revision()), load)
+
+    def ranked(self, position=None):
+        """Row numbers by descending probability, optionally of one position only"""
+        with self._lock:
+            if position is None:
+                return self.order
+            if position not in self._by_position:
+                column = POSITIONS.index(position)
+                self._by_position[position] = self.order[self.positions[self.order, column]]
+            return self._by_position[position]
+
+    def frame(self, rows, start_rank=1):
+        """Display table for row numbers, ranked from start_rank"""
+        positions = ['/'.join(p for p, flag in zip(POSITIONS, flags) if flag) for flags in self.positions[rows]]
+        return pd.DataFrame({
+            'rank': np.arange(start_rank, start_rank + len(rows)),
+            'player': self.names[rows],
+            'position': positions,
+            'probability': self.probability[rows],
+            'risk_score': self.risk_score[rows],
+            'risk_level': RISK_LEVELS[self.risk_level[rows]],
+        }, index=pd.Index(self.keys[rows], name='player_id'))
+
+    def top(self, k=10, position=None):
+        """The k players most likely to be injured"""
+        return self.frame(self.ranked(position)[:k])
+
+    def page(self, number, size=50, position=None):
+        """(page of the rankings starting at page 0, number of matching players)"""
+        ranked = self.ranked(position)
+        start = number * size
+        return self.frame(ranked[start:start + size], start_rank=start + 1), len(ranked)
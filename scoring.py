@@ -0,0 +1,164 @@
+import os
+import sys
+import joblib
+import numpy as np
+import pandas as pd
+from registry import ModelRegistry
+from features import DERIVATION_INPUTS, build_feature_matrix, derive_columns, input_columns, scale_features
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Legacy pickle artifacts, only read when the model registry is empty
+MODEL_PATH = os.path.join(current_dir, 'model.pkl')
+SCALER_PATH = os.path.join(current_dir, 'scaler.pkl')
+FEATURE_NAMES_PATH = os.path.join(current_dir, 'feature_names.pkl')
+DATA_PATH = os.path.join(current_dir, 'balanced_data2.csv')
+
+# Up to this many rows the compiled predictor beats XGBoost's own predict
+# (see `python benchmark.py predictor`)
+COMPILED_BATCH_LIMIT = 100
+
+
+def load_artifacts():
+    """Load the trained model, scaler and feature names from disk"""
+    registry = ModelRegistry()
+    if registry.current_version() is not None:
+        return registry.load()
+
+    model = joblib.load(MODEL_PATH)
+    scaler = joblib.load(SCALER_PATH)
+    feature_names = joblib.load(FEATURE_NAMES_PATH)
+    return model, scaler, feature_names
+
+
+def determine_injury_risk(probability, risk_score, n_injuries, n_severe_injuries):
+    """Vectorized risk level and injury flag for arrays of players"""
+    high = (
+        (probability > 0.6) | (risk_score >= 8) |
+        (n_severe_injuries >= 2) | (n_injuries >= 4)
+    )
+    medium = ~high & (
+        (probability > 0.3) | (risk_score >= 4) |
+        (n_severe_injuries >= 1) | (n_injuries >= 2)
+    )
+    risk_level = np.where(high, 'High', np.where(medium, 'Medium', 'Low'))
+    is_injured = high | (medium & (probability > 0.45))
+    return risk_level, is_injured
+
+
+def identify_risk_factors(player):
+    """Risk factor cards (icon, text, severity) for one player's raw stats"""
+    n_injuries = player['n_injuries']
+    n_severe_injuries = player['n_severe_injuries']
+    age = player['age']
+
+    risk_factors = []
+    if n_injuries > 0:
+        severity = "High" if n_injuries >= 3 else "Moderate" if n_injuries >= 2 else "Low"
+        risk_factors.append({
+            'icon': '🤕',
+            'text': f"Previous injuries: {n_injuries}",
+            'severity': severity
+        })
+    if n_severe_injuries > 0:
+        risk_factors.append({
+            'icon': '🏥',
+            'text': f"Severe injuries: {n_severe_injuries}",
+            'severity': 'High'
+        })
+    if player['minutes_90s'] > 30:
+        risk_factors.append({
+            'icon': '⚡',
+            'text': "High match load",
+            'severity': 'Medium'
+        })
+    if age > 30:
+        risk_factors.append({
+            'icon': '📅',
+            'text': f"Age factor: {age} years",
+            'severity': 'Medium'
+        })
+    if player['games'] < 10:
+        risk_factors.append({
+            'icon': '⚠️',
+            'text': "Limited game time",
+            'severity': 'Low'
+        })
+    return risk_factors
+
+
+def score_players(players, model, scaler, feature_names, predictor=None):
+    """Score a whole squad in one batched pass
+
+    `players` is a DataFrame with (a subset of) the raw stat columns, or an
+    array whose columns follow `input_columns(feature_names)`. Missing
+    DataFrame columns are treated as 0. Returns one row per player with the
+    injury probability (0-1), risk score, risk level and injury flag.
+    With a `CompiledPredictor` the scaler and model are bypassed entirely.
+    """
+    X = build_feature_matrix(players, feature_names)
+    risk_score = X[:, feature_names.index('injury_risk_score')]
+
+    if predictor is not None:
+        probability = predictor.predict_proba(X)
+    else:
+        # StandardScaler.transform without the per-call validation layer
+        X_scaled = scale_features(X, scaler)
+        probability = model.predict_proba(X_scaled)[:, 1]
+
+    n_injuries = X[:, feature_names.index('n_injuries')]
+    n_severe_injuries = X[:, feature_names.index('n_severe_injuries')]
+    risk_level, is_injured = determine_injury_risk(
+        probability, risk_score, n_injuries, n_severe_injuries
+    )
+
+    index = players.index if isinstance(players, pd.DataFrame) else None
+    return pd.DataFrame({
+        'probability': probability,
+        'injury_risk_score': risk_score,
+        'risk_level': risk_level,
+        'is_injured': is_injured,
+    }, index=index)
+
+
+def fallback_scores(players):
+    """Rule-based scores from the risk thresholds alone, for when no model is loaded
+
+    Same output as score_players with `probability` set to NaN, which the
+    thresholds treat as "no signal from the model".
+    """
+    col = {
+        name: players[name].to_numpy(dtype=np.float64, na_value=0.0) if name in players.columns
+        else np.zeros(len(players))
+        for name in DERIVATION_INPUTS
+    }
+    risk_score = derive_columns(col)['injury_risk_score']
+    probability = np.full(len(players), np.nan)
+    risk_level, is_injured = determine_injury_risk(
+        probability, risk_score, col['n_injuries'], col['n_severe_injuries']
+    )
+    return pd.DataFrame({
+        'probability': probability,
+        'injury_risk_score': risk_score,
+        'risk_level': risk_level,
+        'is_injured': is_injured,
+    }, index=players.index)
+
+
+# Score a CSV of players from the command line, e.g. a full league export
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python scoring.py players.csv [scores.csv]")
+        sys.exit(1)
+
+    players = pd.read_csv(sys.argv[1], encoding='ISO-8859-1')
+    model, scaler, feature_names = load_artifacts()
+    scores = score_players(players, model, scaler, feature_names)
+    if 'player_name' in players.columns:
+        scores.insert(0, 'player_name', players['player_name'])
+
+    if len(sys.argv) > 2:
+        scores.to_csv(sys.argv[2], index=False)
+    else:
+        print(scores.to_string())
@@ -0,0 +1,51 @@
+import numpy as np
+
+from features import input_columns
+from scoring import COMPILED_BATCH_LIMIT, score_players
+
+# Stats that can be swept: label, the app sliders' range and the default step
+SWEEP_FEATURES = {
+    'age': ("Age", 18, 40, 1.0),
+    'games': ("Games Played", 0, 40, 1.0),
+    'minutes': ("Minutes Played", 0, 4000, 100.0),
+    'minutes_90s': ("Minutes per 90s", 0, 45, 1.0),
+    'shots': ("Shots Taken", 0, 50, 1.0),
+    'n_injuries': ("Total Injuries", 0, 10, 1.0),
+    'n_severe_injuries': ("Severe Injuries", 0, 5, 1.0),
+}
+# Largest grid scored in one call
+MAX_GRID_POINTS = 10_000
+
+
+def sweep_values(feature, center, steps=10, step=None):
+    """Sorted values `steps` steps either side of center, within the slider range"""
+    _, low, high, default_step = SWEEP_FEATURES[feature]
+    step = default_step if step is None else step
+    values = float(center) + step * np.arange(-steps, steps + 1)
+    return np.unique(np.clip(values, low, high))
+
+
+def sensitivity_grid(base, axes, model, scaler, feature_names, predictor=None):
+    """Injury probability for every combination of the axes' values, in one batch
+
+    `base` maps raw stats to the player's current values (missing ones are
+    0) and `axes` is a list of one or two (feature, values) pairs. Every
+    grid point is one row of a single feature matrix, scored by one model
+    call. Returns the probabilities shaped (len(values),) per axis, with
+    the first axis first.
+    """
+    columns = input_columns(feature_names)
+    for feature, _ in axes:
+        if feature not in columns:
+            raise ValueError(f"Cannot sweep {feature!r}, choose from {', '.join(columns)}")
+    grids = np.meshgrid(*[np.asarray(values, dtype=np.float64) for _, values in axes], indexing='ij')
+    n_points = grids[0].size
+    if n_points > MAX_GRID_POINTS:
+        raise ValueError(f"Grid of {n_points} points exceeds the limit of {MAX_GRID_POINTS}")
+
+    raw = np.tile([float(base.get(name, 0)) for name in columns], (n_points, 1))
+    for (feature, _), grid in zip(axes, grids):
+        raw[:, columns.index(feature)] = grid.ravel()
+    predictor = predictor if n_points <= COMPILED_BATCH_LIMIT else None
+    probability = score_players(raw, model, scaler, feature_names, predictor)['probability'].to_numpy()
+    return probability.reshape(grids[0].shape)
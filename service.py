@@ -0,0 +1,227 @@
+import argparse
+import functools
+import os
+import socket
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, ConfigDict, Field
+
+from batching import BatchMetrics, MicroBatcher
+from explain import explain_players, risk_factor_cards
+from features import DERIVED_COLUMNS, input_columns
+from instrumentation import Metrics, StageTimer
+from registry import LiveModel, ModelRegistry
+from scoring import COMPILED_BATCH_LIMIT, score_players
+
+MAX_BATCH_SIZE = 10000
+# Concurrent /predict calls arriving within this window (or until this many
+# are waiting) are scored in one model call
+BATCH_WINDOW_MS = float(os.environ.get('API_BATCH_WINDOW_MS', 2))
+BATCH_MAX_ROWS = int(os.environ.get('API_BATCH_MAX_ROWS', 256))
+
+
+class Player(BaseModel):
+    """Raw stats for one player; other stat columns the model knows are accepted too"""
+    model_config = ConfigDict(extra='allow')
+    # Extra stats must be numbers, so a bad field is a 422 rather than a scoring error
+    __pydantic_extra__: dict[str, float]
+
+    age: float
+    games: float
+    minutes: float
+    minutes_90s: float
+    shots: float
+    n_injuries: float
+    n_severe_injuries: float
+    position_DF: int = 0
+    position_FW: int = 0
+    position_GK: int = 0
+    position_MF: int = 0
+
+
+class BatchRequest(BaseModel):
+    players: list[Player] = Field(max_length=MAX_BATCH_SIZE)
+
+
+class RiskFactor(BaseModel):
+    icon: str
+    text: str
+    severity: str
+    # Log-odds the feature adds to the risk, and the feature (None for unrecorded stats)
+    effect: float
+    feature: str | None
+
+
+class Prediction(BaseModel):
+    probability: float
+    injury_risk_score: float
+    risk_level: str
+    is_injured: bool
+    risk_factors: list[RiskFactor]
+
+
+class PredictionResponse(Prediction):
+    model_version: str
+
+
+class BatchResponse(BaseModel):
+    model_version: str
+    results: list[Prediction]
+
+
+app = FastAPI(title="Football Injury Predictor API")
+
+# Loaded once per worker process and hot-swapped when the registry moves
+live_model = LiveModel(ModelRegistry())
+# Per-worker stage timings of scoring requests, scraped at /metrics
+metrics = Metrics(name='api_stage_duration_seconds', recent=0)
+# Batch sizes and queue delays of the coalesced /predict calls
+batch_metrics = BatchMetrics(name='api_predict')
+# Model version -> the batcher scoring with it
+batchers = {}
+
+
+def current_snapshot():
+    snapshot = live_model.get()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="No model has been published yet")
+    return snapshot
+
+
+def input_rows(rows, feature_names):
+    """Raw input matrix of Player dumps, in input_columns(feature_names) order"""
+    return np.array([[row.get(name, 0) for name in input_columns(feature_names)] for row in rows],
+                    dtype=np.float64)
+
+
+def prediction(row, scores, feature_names):
+    """Response body for one player's row of score_rows"""
+    return {
+        'probability': float(scores.probability),
+        'injury_risk_score': float(scores.injury_risk_score),
+        'risk_level': scores.risk_level,
+        'is_injured': bool(scores.is_injured),
+        # The same TreeSHAP cards the app shows; stats the caller left out count as not recorded
+        'risk_factors': risk_factor_cards(scores.contributions, scores.features, feature_names,
+                                          provided=set(row) | set(DERIVED_COLUMNS)),
+    }
+
+
+def predict_players(players):
+    """Score a list of Player models in one batch"""
+    timer = StageTimer(metrics)
+    snapshot = current_snapshot()
+    timer.lap('model_load')
+    rows = [player.model_dump() for player in players]
+    timer.lap('parse')
+    scores = score_rows(snapshot, pd.DataFrame(rows))
+    timer.lap('score')
+
+    results = [
+        prediction(row, scores_row, snapshot.feature_names)
+        for row, scores_row in zip(rows, scores.itertuples(index=False))
+    ]
+    timer.lap('risk_factors')
+    timer.finish()
+    return snapshot.version, results
+
+
+def score_rows(snapshot, players):
+    """score_players plus each player's features and TreeSHAP contributions
+
+    `players` is a DataFrame or a matrix of raw input rows; the batcher
+    calls this with the rows of concurrent /predict requests.
+    """
+    predictor = snapshot.predictor if len(players) <= COMPILED_BATCH_LIMIT else None
+    scores = score_players(players, snapshot.model, snapshot.scaler, snapshot.feature_names, predictor)
+    X, contribution = explain_players(players, snapshot.model, snapshot.scaler, snapshot.feature_names)
+    scores['features'] = list(X)
+    scores['contributions'] = list(contribution)
+    return scores
+
+
+def player_batcher(snapshot):
+    if snapshot.version not in batchers:
+        # Batches already queued on an older version's batcher still finish
+        batchers.clear()
+        batchers[snapshot.version] = MicroBatcher(functools.partial(score_rows, snapshot), BATCH_WINDOW_MS,
+                                                  BATCH_MAX_ROWS, batch_metrics)
+    return batchers[snapshot.version]
+
+
+@app.get('/health')
+def health():
+    snapshot = live_model.get()
+    return {'status': 'ok' if snapshot else 'no_model',
+            'model_version': snapshot.version if snapshot else None,
+            'pid': os.getpid()}
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Each worker process reports its own requests; scrape them individually
+    # or run with --workers 1 behind the scraper
+    return metrics.prometheus_text() + batch_metrics.prometheus_text()
+
+
+# One player per request: concurrent requests share a model call through the
+# batcher, which scores on a worker thread while this loop keeps accepting
+@app.post('/predict', response_model=PredictionResponse)
+async def predict(player: Player):
+    timer = StageTimer(metrics)
+    snapshot = current_snapshot()
+    timer.lap('model_load')
+    row = player.model_dump()
+    X = input_rows([row], snapshot.feature_names)
+    timer.lap('parse')
+    scores = await player_batcher(snapshot).submit(X)
+    timer.lap('score')
+    result = prediction(row, next(scores.itertuples(index=False)), snapshot.feature_names)
+    timer.lap('risk_factors')
+    timer.finish()
+    return {'model_version': snapshot.version, **result}
+
+
+# Plain `def` endpoint: scoring is CPU-bound, so FastAPI runs it in its threadpool
+@app.post('/predict/batch', response_model=BatchResponse)
+def predict_batch(request: BatchRequest):
+    version, results = predict_players(request.players)
+    return {'model_version': version, 'results': results}
+
+
+def bind_socket(host, port):
+    """Listening socket shared by all workers
+
+    Created with an explicit IPPROTO_TCP: uvicorn's own multi-worker socket
+    has proto 0, which makes asyncio skip TCP_NODELAY on accepted connections
+    and adds a ~40ms Nagle/delayed-ACK stall to every keep-alive response.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+# Serve with N worker processes, each loading the model once
+if __name__ == '__main__':
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    parser = argparse.ArgumentParser(description="Injury scoring API")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('API_PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    config = uvicorn.Config('service:app', host=args.host, port=args.port, workers=args.workers)
+    server = uvicorn.Server(config)
+    sock = bind_socket(args.host, args.port)
+    if args.workers > 1:
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run(sockets=[sock])
@@ -0,0 +1,33 @@
+import pytest
+
+from benchmark import compare, metric_direction, undirected_columns
+
+
+@pytest.mark.parametrize('column, direction', [
+    ('rerun_ms', 'lower'), ('hit_us', 'lower'), ('kb_per_rerun', 'lower'), ('messages', 'lower'),
+    ('rows_per_s', 'higher'), ('full_acc', 'higher'),
+    ('batch_rows', 'same'), ('reruns', 'same'), ('result_rows', 'same'),
+])
+def test_metric_direction(column, direction):
+    assert metric_direction(column) == direction
+
+
+def test_undirected_columns():
+    rows = [{'case': 'slider', 'sessions': 4, 'promoted': True, 'version': 'v0002',
+             'rerun_ms': 1.5, 'new_metric': 3}]
+    # 'sessions' is a parameter of shared_cache, not an outcome
+    assert undirected_columns('shared_cache', rows) == ['new_metric']
+    assert undirected_columns('app_rerun', rows) == ['new_metric', 'sessions']
+
+
+def results(**rows):
+    return {'machine': {}, 'results': rows}
+
+
+@pytest.mark.parametrize('column, before, after', [
+    ('kb_per_rerun', 25.0, 30.0), ('hit_us', 2.0, 3.0), ('batch_rows', 8.0, 6.0),
+])
+def test_compare_flags_regressions(column, before, after):
+    base = results(shared_cache=[{'cache': 'shared', 'sessions': 4, column: before}])
+    new = results(shared_cache=[{'cache': 'shared', 'sessions': 4, column: after}])
+    assert [regression['metric'] for regression in compare(base, new)] == [column]
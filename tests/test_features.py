@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from external_memory import StreamingDataset
+from feature_store import FeatureStore
+from features import (DERIVED_COLUMNS, add_engineered_features, build_feature_matrix, input_columns,
+                      scale_features)
+from ingest import ENCODING, load_training_data
+from player_store import PROFILE_COLUMNS, PlayerStore
+from scoring import DATA_PATH, load_artifacts
+
+# Stats that switch a term of the risk score on just above (or below) them
+THRESHOLD_EDGES = [
+    # (column, value, points it adds to injury_risk_score)
+    ('age', 30, 0.0), ('age', 30.0001, 1.0),
+    ('games', 5, 0.0), ('games', 4, 0.5), ('games', 0, 0.5),
+    ('minutes', 3000, 0.0), ('minutes', 3001, 1.0),
+    ('minutes_90s', 30, 0.0), ('minutes_90s', 30.1, 1.0),
+    ('shots', 40, 0.0), ('shots', 41, 0.5),
+]
+# Stats left empty in the NaN rows; every loader treats them as 0
+NAN_COLUMNS = ['age', 'minutes', 'minutes_90s', 'shots', 'passes', 'n_injuries']
+
+
+@pytest.fixture(scope='module')
+def artifacts():
+    return load_artifacts()
+
+
+@pytest.fixture(scope='module')
+def feature_names(artifacts):
+    return artifacts[2]
+
+
+@pytest.fixture(scope='module')
+def players():
+    """Bundled players with unique names, plus threshold edge and NaN rows"""
+    df = pd.read_csv(DATA_PATH, encoding=ENCODING).drop_duplicates('player_name').head(300)
+
+    edges = pd.DataFrame([
+        {'player_name': f'Edge {column}={value}', 'games': 10, column: value}
+        for column, value, _ in THRESHOLD_EDGES
+    ])
+    gaps = df.head(5).assign(player_name=lambda d: 'Missing ' + d['player_name'])
+    gaps[NAN_COLUMNS] = np.nan
+    df = pd.concat([df, edges.reindex(columns=df.columns, fill_value=0), gaps], ignore_index=True)
+    return df.astype({'position_DF': int, 'position_FW': int, 'position_GK': int, 'position_MF': int,
+                      'currently_injured': int})
+
+
+@pytest.fixture(scope='module')
+def players_csv(players, tmp_path_factory):
+    path = tmp_path_factory.mktemp('players') / 'players.csv'
+    players.to_csv(path, index=False, encoding=ENCODING)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def training_X(players_csv, feature_names):
+    """The matrix training fits on, as ingest.load_training_data reads it"""
+    X, _ = load_training_data(players_csv)
+    return X[feature_names].to_numpy(dtype=np.float64)
+
+
+def assert_same_features(expected, actual, feature_names, columns=None):
+    """Bit-for-bit equality, column by column so a failure names the feature"""
+    assert actual.shape == expected.shape
+    for i, name in enumerate(feature_names):
+        if columns is None or name in columns:
+            np.testing.assert_array_equal(actual[:, i], expected[:, i], err_msg=name)
+
+
+def test_training_matrix_is_float32(players_csv):
+    X, _ = load_training_data(players_csv)
+    assert set(X.dtypes) == {np.dtype(np.float32)}
+
+
+@pytest.mark.parametrize('column, value, points', THRESHOLD_EDGES)
+def test_risk_score_threshold_edges(column, value, points, feature_names, players, training_X):
+    i = players.index[players['player_name'] == f'Edge {column}={value}'][0]
+    risk = feature_names.index('injury_risk_score')
+
+    served = build_feature_matrix(players.iloc[[i]], feature_names)
+    assert served[0, risk] == points
+    assert training_X[i, risk] == points
+
+
+def test_nan_stats_are_zero(feature_names, players, training_X):
+    rows = players.index[players['player_name'].str.startswith('Missing ')]
+    filled = players.loc[rows].fillna(0)
+    nan_columns = [feature_names.index(name) for name in NAN_COLUMNS]
+
+    served = build_feature_matrix(players.loc[rows], feature_names)
+    assert not np.isnan(served).any()
+    assert (served[:, nan_columns] == 0).all()
+    assert_same_features(build_feature_matrix(filled, feature_names), served, feature_names)
+    assert_same_features(served, training_X[rows], feature_names)
+
+
+def test_serving_paths_match_training(feature_names, players, training_X):
+    engineered = add_engineered_features(players)[feature_names].to_numpy(dtype=np.float64)
+    raw = players.reindex(columns=input_columns(feature_names)).to_numpy(dtype=np.float64)
+    single_rows = np.vstack([build_feature_matrix(players.iloc[[i]], feature_names)
+                             for i in range(len(players))])
+
+    assert_same_features(training_X, engineered, feature_names)
+    assert_same_features(training_X, build_feature_matrix(players, feature_names), feature_names)
+    assert_same_features(training_X, build_feature_matrix(raw, feature_names), feature_names)
+    assert_same_features(training_X, single_rows, feature_names)
+
+
+def test_csv_read_as_is_matches_training(players_csv, feature_names, training_X):
+    # The app and the batch scorer parse CSVs with pandas' default dtypes
+    df = pd.read_csv(players_csv, encoding=ENCODING)
+    assert_same_features(training_X, build_feature_matrix(df, feature_names), feature_names)
+
+
+def test_scaled_features_match_training(artifacts, feature_names, players, players_csv):
+    _, scaler, _ = artifacts
+    X, _ = load_training_data(players_csv)
+    served = scale_features(build_feature_matrix(players, feature_names), scaler)
+    assert_same_features(scale_features(X[feature_names], scaler), served, feature_names)
+
+
+def test_streaming_dataset_matches_training(artifacts, players_csv, feature_names, training_X):
+    _, scaler, _ = artifacts
+    # No test rows, so every chunk comes back whole and in order
+    dataset = StreamingDataset(players_csv, test_size=0.0, chunksize=100)
+    X = np.vstack([X for X, _ in dataset.batches('train')])
+    X_scaled = np.vstack([X for X, _, _ in dataset.scaled_batches('train', scaler)])
+
+    assert_same_features(training_X, X.astype(np.float64), feature_names)
+    assert_same_features(scale_features(training_X, scaler), X_scaled, feature_names)
+
+
+def test_feature_store_matches_training(players_csv, feature_names, training_X, tmp_path):
+    store = FeatureStore(str(tmp_path / 'store'))
+    store.ingest_csv(players_csv)
+    X, _ = store.load_training_data(feature_names)
+    assert_same_features(training_X, X.to_numpy(dtype=np.float64), feature_names)
+
+
+def test_player_store_matches_training(feature_names, players, training_X, tmp_path):
+    store = PlayerStore(str(tmp_path / 'players.sqlite'), seed=None)
+    try:
+        store.save_many(players.rename(columns={'player_name': 'name'}))
+        frame = store.frame().set_index('name').loc[players['player_name']]
+    finally:
+        store.close()
+
+    # The store keeps the profile stats only, which is all the derived features need
+    kept = set(PROFILE_COLUMNS) | set(DERIVED_COLUMNS)
+    served = build_feature_matrix(frame, feature_names)
+    assert_same_features(training_X, served, feature_names, columns=kept)
+    assert not served[:, [i for i, name in enumerate(feature_names) if name not in kept]].any()
+
+
+def test_service_inputs_match_training(feature_names, players, training_X):
+    service = pytest.importorskip('service')
+    requests = [service.Player(**row) for row in
+                players.drop(columns=['player_name', 'currently_injured']).to_dict('records')]
+    rows = [player.model_dump() for player in requests]
+
+    # /predict scores raw input rows, /predict/batch a DataFrame of the requests
+    assert_same_features(training_X, build_feature_matrix(service.input_rows(rows, feature_names),
+                                                          feature_names), feature_names)
+    assert_same_features(training_X, build_feature_matrix(pd.DataFrame(rows), feature_names),
+                         feature_names)
+
+    model, scaler, _ = load_artifacts()
+    _, results = service.predict_players(requests)
+    expected = model.predict_proba(scale_features(training_X, scaler))[:, 1]
+    np.testing.assert_array_equal([result['probability'] for result in results], expected)
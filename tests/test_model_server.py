@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+from features import build_feature_matrix, scale_features
+from ingest import load_training_data
+from model_server import ModelServer, RemoteLiveModel, RemoteTrainingJob, wait_for_server
+from registry import LiveModel, ModelRegistry
+from scoring import DATA_PATH
+
+
+def publish(registry, X, y, seed):
+    """A small model on a different sample of the data each time, so versions differ"""
+    rows = np.random.default_rng(seed).choice(len(X), len(X) // 2, replace=False)
+    scaler = StandardScaler().fit(X.iloc[rows].astype(np.float64))
+    model = XGBClassifier(n_estimators=10, max_depth=3, random_state=seed)
+    model.fit(scale_features(X.iloc[rows], scaler), y.iloc[rows])
+    return registry.publish(model, scaler, list(X.columns))
+
+
+class RecordingJob:
+    """TrainingJob double that counts runs instead of training"""
+
+    def __init__(self):
+        self.runs = 0
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return False
+        self.runs += 1
+        self.running = True
+        return True
+
+    def ensure_started(self):
+        if not self.runs:
+            self.start()
+
+    def is_running(self):
+        return self.running
+
+    def status(self):
+        return {'state': 'running' if self.running else 'failed', 'progress': 0.0, 'message': ''}
+
+
+@pytest.fixture
+def server(tmp_path):
+    X, y = load_training_data(DATA_PATH)
+    registry = ModelRegistry(str(tmp_path / 'models'))
+    publish(registry, X, y, seed=1)
+    server = ModelServer(LiveModel(registry), threads=2, keep=2, training_job=RecordingJob())
+    path = str(tmp_path / 'model.sock')
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(server.serve(path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    wait_for_server(path, timeout=10)
+    yield server, registry, path, (X, y)
+
+    async def stop():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        loop.stop()
+
+    asyncio.run_coroutine_threadsafe(stop(), loop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+def test_evicted_version_scores_with_current_model(server):
+    server, registry, path, (X, y) = server
+    stale, live = RemoteLiveModel(path), RemoteLiveModel(path)
+    pinned = stale.get()
+
+    # Two promotions later the pinned version is no longer loaded
+    for seed in (2, 3):
+        publish(registry, X, y, seed)
+        current = live.get()
+    assert pinned.version not in server._snapshots
+
+    raw = build_feature_matrix(pd.read_csv(DATA_PATH, encoding='ISO-8859-1').head(50), pinned.feature_names)
+    model, scaler, _ = registry.load(current.version)
+    expected = model.predict_proba(scale_features(raw, scaler))[:, 1]
+    try:
+        np.testing.assert_allclose(pinned.model.predict_proba(scale_features(raw, pinned.scaler))[:, 1],
+                                   expected, rtol=1e-6)
+        np.testing.assert_allclose(pinned.predictor.predict_proba(raw), expected, rtol=1e-5)
+        assert pinned.model.contributions(raw).shape == (50, len(pinned.feature_names) + 1)
+        # The stale client drops its snapshot and picks up the current one
+        assert stale._snapshot is None
+        assert stale.get().version == current.version
+
+        # A restarted server has not seen the old version: its scaler comes from the registry
+        restarted = ModelServer(LiveModel(registry), threads=1, keep=2)
+        snapshot, X_scaled = restarted.resolve('predict_proba', pinned.version,
+                                               scale_features(raw, pinned.scaler))
+        assert snapshot.version == current.version
+        np.testing.assert_allclose(X_scaled, scale_features(raw, scaler), atol=1e-9)
+    finally:
+        stale.client.close()
+        live.client.close()
+
+
+def test_training_runs_on_the_server(server):
+    server, _, path, _ = server
+    # Two workers asking at once still start one run, in the server process
+    workers = [RemoteTrainingJob(path), RemoteTrainingJob(path)]
+    try:
+        assert workers[0].status()['state'] == 'failed'
+        assert [worker.start() for worker in workers] == [True, False]
+        assert workers[1].is_running()
+        workers[1].ensure_started()
+        assert server.training_job.runs == 1
+    finally:
+        for worker in workers:
+            worker.client.close()
@@ -0,0 +1,42 @@
+import pytest
+
+from player_store import PlayerStore
+from risk_index import RiskIndex
+from scoring import DATA_PATH, load_artifacts
+
+NEW_PLAYER = dict(age=33, games=3, minutes=3200, minutes_90s=35, shots=50, n_injuries=6,
+                  n_severe_injuries=3, position_FW=1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PlayerStore(str(tmp_path / 'players.sqlite'))
+    yield store
+    store.close()
+
+
+def test_sync_league_includes_player_store(store):
+    index = RiskIndex(*load_artifacts())
+    index.sync_league(DATA_PATH, store)
+    n_players = len(index)
+    assert index.sync_league(DATA_PATH, store) == 0
+
+    # A player added in the app is ranked after one rescore
+    store.save('Added Player', NEW_PLAYER)
+    assert index.sync_league(DATA_PATH, store) == 1
+    assert len(index) == n_players + 1
+    assert 'Added Player' in set(index.top(len(index))['player'])
+
+    store.delete('Added Player')
+    assert index.sync_league(DATA_PATH, store) == 0
+    assert len(index) == n_players
+
+
+def test_store_profile_replaces_csv_row(store):
+    index = RiskIndex(*load_artifacts())
+    index.sync_csv(DATA_PATH)
+    name = index.top(1)['player'].iloc[0]
+
+    store.save(name, dict(NEW_PLAYER, n_injuries=0, n_severe_injuries=0, minutes=100, minutes_90s=1, age=20))
+    assert index.sync_league(DATA_PATH, store) >= 1
+    assert index.top(1)['player'].iloc[0] != name
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from explain import contributions, risk_factor_cards
+from features import DERIVED_COLUMNS, build_feature_matrix
+from scoring import load_artifacts
+from service import Player, predict_players
+
+PLAYER = dict(age=28, games=12, minutes=873, minutes_90s=9.7, shots=15, n_injuries=4,
+              n_severe_injuries=1, position_FW=1)
+
+
+def test_extra_stats_are_numbers():
+    assert Player(**PLAYER, passes='524').model_dump()['passes'] == 524.0
+    with pytest.raises(ValidationError):
+        Player(**PLAYER, passes='many')
+    with pytest.raises(ValidationError):
+        Player(**PLAYER, player_name='Cristiano Ronaldo')
+
+
+def test_bad_extra_field_is_422():
+    pytest.importorskip('httpx')
+    from fastapi.testclient import TestClient
+    from service import app
+
+    client = TestClient(app)
+    assert client.post('/predict', json={**PLAYER, 'passes': 'many'}).status_code == 422
+    assert client.post('/predict/batch', json={'players': [{**PLAYER, 'notes': 'x'}]}).status_code == 422
+    assert client.post('/predict/batch', json={'players': [{**PLAYER, 'passes': 524}]}).status_code == 200
+
+
+def test_risk_factors_are_model_explanations():
+    # The cards the app shows for the same stats
+    model, scaler, feature_names = load_artifacts()
+    X = build_feature_matrix(pd.DataFrame([PLAYER]), feature_names)
+    expected = risk_factor_cards(contributions(X, model, scaler)[0], X[0], feature_names,
+                                 provided=set(Player(**PLAYER).model_dump()) | set(DERIVED_COLUMNS))
+
+    _, results = predict_players([Player(**PLAYER)])
+    assert expected
+    assert results[0]['risk_factors'] == expected
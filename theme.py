@@ -0,0 +1,407 @@
+import functools
+
+# Colours that differ between the themes, as CSS custom properties (--app-<name>)
+PALETTES = {
+    'light': {
+        'background': '#f8f9fa',
+        'text': '#333333',
+        'surface': '#ffffff',
+        'border': '#e0e0e0',
+        'header-shadow': 'rgba(0,0,0,0.1)',
+        'card-shadow': 'rgba(0,0,0,0.05)',
+        'heading': '#2e7d32',
+        'overlay': 'rgba(248, 249, 250, 0.75)',
+        'glass': 'rgba(255, 255, 255, 0.85)',
+        'strong-text': '#1a1a1a',
+        'heading-shadow': 'rgba(0,0,0,0.2)',
+        'container-shadow': 'rgba(0,0,0,0.2)',
+        'accent-text': '#2e7d32',
+        'input-background': 'rgba(255, 255, 255, 0.9)',
+        'button-border': '#2e7d32',
+    },
+    'dark': {
+        'background': '#1a1a1a',
+        'text': '#ffffff',
+        'surface': '#2d2d2d',
+        'border': '#404040',
+        'header-shadow': 'rgba(0,0,0,0.3)',
+        'card-shadow': 'rgba(0,0,0,0.3)',
+        'heading': '#4CAF50',
+        'overlay': 'rgba(26, 26, 26, 0.85)',
+        'glass': 'rgba(45, 45, 45, 0.85)',
+        'strong-text': '#ffffff',
+        'heading-shadow': 'rgba(0,0,0,0.4)',
+        'container-shadow': 'rgba(0,0,0,0.5)',
+        'accent-text': '#ffffff',
+        'input-background': 'rgba(45, 45, 45, 0.9)',
+        'button-border': '#404040',
+    },
+}
+
+RULES = """
+/* Main theme */
+.main {
+    background: var(--app-background);
+    color: var(--app-text);
+}
+
+/* Header */
+.header-container {
+    background: var(--app-surface);
+    padding: 40px;
+    border-radius: 15px;
+    margin-bottom: 30px;
+    border: 1px solid var(--app-border);
+    box-shadow: 0 4px 12px var(--app-header-shadow);
+}
+
+/* Cards with clean feel */
+.stat-card {
+    background: var(--app-surface);
+    padding: 25px;
+    border-radius: 15px;
+    border: 1px solid var(--app-border);
+    margin: 15px 0;
+    box-shadow: 0 2px 8px var(--app-card-shadow);
+}
+
+/* Analysis card */
+.pitch-card {
+    background: var(--app-surface);
+    padding: 30px;
+    border-radius: 15px;
+    border: 1px solid var(--app-border);
+    margin: 15px 0;
+    box-shadow: 0 2px 8px var(--app-card-shadow);
+}
+
+/* Risk indicators */
+.injury-high {
+    color: #dc3545;
+    padding: 15px;
+    border-radius: 10px;
+    font-weight: bold;
+    background: rgba(220,53,69,0.1);
+    border: 1px solid #dc3545;
+}
+
+.injury-medium {
+    color: #ffc107;
+    padding: 15px;
+    border-radius: 10px;
+    font-weight: bold;
+    background: rgba(255,193,7,0.1);
+    border: 1px solid #ffc107;
+}
+
+.injury-low {
+    color: #28a745;
+    padding: 15px;
+    border-radius: 10px;
+    font-weight: bold;
+    background: rgba(40,167,69,0.1);
+    border: 1px solid #28a745;
+}
+
+/* Slider styling */
+.stSlider > div > div {
+    background-color: #2e7d32 !important;
+}
+
+.stSlider > div > div > div > div {
+    background-color: #ffffff !important;
+}
+
+/* Progress bar */
+.stProgress > div > div > div > div {
+    background-color: #2e7d32 !important;
+}
+
+/* Custom button */
+.custom-button {
+    background-color: #2e7d32;
+    color: white;
+    padding: 12px 30px;
+    border-radius: 25px;
+    border: none;
+    cursor: pointer;
+    font-weight: bold;
+    text-transform: uppercase;
+    letter-spacing: 1px;
+    transition: all 0.3s ease;
+}
+
+.custom-button:hover {
+    background-color: #1b5e20;
+    box-shadow: 0 0 15px rgba(46,125,50,0.5);
+}
+
+/* Animated elements */
+@keyframes pulse {
+    0% { transform: scale(1); }
+    50% { transform: scale(1.05); }
+    100% { transform: scale(1); }
+}
+
+.pulse {
+    animation: pulse 2s infinite;
+}
+
+/* Footer styling */
+.footer {
+    background: var(--app-surface);
+    padding: 20px;
+    border-radius: 15px;
+    border: 1px solid var(--app-border);
+    margin-top: 30px;
+    box-shadow: 0 -2px 8px var(--app-card-shadow);
+}
+
+/* Additional decorative elements */
+.field-lines {
+    border-left: 2px dashed #2e7d32;
+    height: 100%;
+    position: absolute;
+    left: 50%;
+    opacity: 0.3;
+}
+
+/* Headers and text */
+h1, h2, h3, h4, h5 {
+    color: var(--app-heading);
+}
+
+p {
+    color: var(--app-text);
+}
+
+/* Responsive design adjustments */
+@media (max-width: 768px) {
+    .header-container {
+        padding: 20px;
+    }
+    .stat-card {
+        padding: 15px;
+    }
+}
+
+/* Streamlit specific elements */
+.stSelectbox label {
+    color: var(--app-text) !important;
+}
+
+.stSlider label {
+    color: var(--app-text) !important;
+}
+
+.stNumberInput label {
+    color: var(--app-text) !important;
+}
+
+/* Stadium background */
+.main {
+    background: linear-gradient(
+        var(--app-overlay),
+        var(--app-overlay)
+    ),
+    url('https://images.unsplash.com/photo-1577223625816-7546f13df25d?ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D&auto=format&fit=crop&w=3540&q=80');
+    background-position: center;
+    background-repeat: no-repeat;
+    background-size: cover;
+    background-attachment: fixed;
+}
+
+/* Adjust container backgrounds for better visibility */
+.header-container {
+    background: var(--app-glass);
+    backdrop-filter: blur(8px);
+}
+
+.stat-card {
+    background: var(--app-glass);
+    backdrop-filter: blur(8px);
+}
+
+.pitch-card {
+    background: var(--app-glass);
+    backdrop-filter: blur(8px);
+}
+
+.footer {
+    background: var(--app-glass);
+    backdrop-filter: blur(8px);
+}
+
+/* Enhanced text contrast */
+p, .stSelectbox label, .stSlider label, .stNumberInput label {
+    color: var(--app-strong-text) !important;
+    font-weight: 500;
+}
+
+/* Stronger text shadow for better readability */
+h1, h2, h3, h4, h5 {
+    text-shadow: 2px 2px 4px var(--app-heading-shadow);
+}
+
+/* Enhanced container shadows */
+.header-container, .stat-card, .pitch-card, .footer {
+    box-shadow: 0 4px 15px var(--app-container-shadow);
+}
+
+/* Player profile text styling */
+.stSelectbox > div > div > div > div {
+    color: var(--app-accent-text) !important;
+}
+
+/* Input fields text */
+.stTextInput > div > div > input {
+    color: var(--app-accent-text) !important;
+}
+
+/* Dropdown menu items */
+.stSelectbox > div > div > div {
+    color: var(--app-accent-text) !important;
+    background-color: var(--app-surface) !important;
+}
+
+/* Form labels and text */
+.stMarkdown p, .stText p {
+    color: var(--app-accent-text) !important;
+    font-weight: 500;
+}
+
+/* Number input styling */
+.stNumberInput > div > div > input {
+    color: var(--app-accent-text) !important;
+    background-color: var(--app-input-background) !important;
+}
+
+/* Form field labels */
+.stSelectbox label, .stNumberInput label {
+    color: var(--app-accent-text) !important;
+    font-weight: 500 !important;
+}
+
+/* Container backgrounds */
+.element-container, .stTextInput > div, .stSelectbox > div {
+    background-color: transparent !important;
+}
+
+/* Add New Player button styling */
+.stButton > button {
+    color: var(--app-accent-text) !important;
+    background-color: var(--app-input-background) !important;
+    border: 1px solid var(--app-button-border) !important;
+}
+
+.stButton > button:hover {
+    color: #ffffff !important;
+    background-color: #2e7d32 !important;
+    border-color: #2e7d32 !important;
+}
+
+/* Form submit button styling */
+.stFormSubmitButton > button {
+    color: #ffffff !important;
+    background-color: #2e7d32 !important;
+    border-color: #2e7d32 !important;
+}
+
+.stFormSubmitButton > button:hover {
+    color: #ffffff !important;
+    background-color: #1b5e20 !important;
+    border-color: #1b5e20 !important;
+}
+
+/* Button text */
+button p {
+    color: inherit !important;
+}
+
+/* Tab Navigation */
+.tab-container {
+    display: flex;
+    justify-content: center;
+    gap: 20px;
+    margin: 20px 0;
+}
+
+.tab {
+    padding: 10px 20px;
+    border-radius: 20px;
+    cursor: pointer;
+    transition: all 0.3s ease;
+}
+
+.tab-active {
+    background: #2e7d32;
+    color: white;
+}
+
+.tab:hover {
+    transform: translateY(-2px);
+}
+
+/* Player Card Styling */
+.player-card {
+    background: rgba(255, 255, 255, 0.1);
+    border-radius: 15px;
+    padding: 20px;
+    margin: 10px 0;
+    backdrop-filter: blur(10px);
+    transition: all 0.3s ease;
+}
+
+.player-card:hover {
+    transform: translateY(-5px);
+    box-shadow: 0 10px 20px rgba(0,0,0,0.2);
+}
+
+/* Loading Animation */
+@keyframes pulse-green {
+    0% { box-shadow: 0 0 0 0 rgba(46, 125, 50, 0.7); }
+    70% { box-shadow: 0 0 0 10px rgba(46, 125, 50, 0); }
+    100% { box-shadow: 0 0 0 0 rgba(46, 125, 50, 0); }
+}
+
+.loading {
+    animation: pulse-green 1.5s infinite;
+}
+"""
+
+
+def compile_stylesheet():
+    """Both themes in one stylesheet
+
+    The light palette is the default; the dark one applies while an element
+    with the `theme-dark` class is on the page, so switching theme never
+    changes the stylesheet itself.
+    """
+    def variables(selector, palette):
+        lines = ''.join(f"    --app-{name}: {value};\n" for name, value in palette.items())
+        return f"{selector} {{\n{lines}}}\n"
+
+    return (variables(':root', PALETTES['light'])
+            + variables(':root:has(.theme-dark)', PALETTES['dark'])
+            + RULES)
+
+
+STYLESHEET = compile_stylesheet()
+
+
+@functools.lru_cache(maxsize=None)
+def stylesheet_html():
+    """Markup that inlines the stylesheet, built once per process
+
+    The markup is byte-identical on every rerun and for every user, so
+    Streamlit's message cache sends it as a short reference once a browser
+    has it. It is not served as a static file: Streamlit (up to at least
+    1.37) sends static files other than images as text/plain with nosniff,
+    which browsers refuse to apply as CSS.
+    """
+    return f"<style>\n{STYLESHEET}</style>"
+
+
+# Print the size of the compiled stylesheet
+if __name__ == '__main__':
+    print(f"{len(STYLESHEET.encode())} bytes")
@@ -1,94 +1,161 @@
-import joblib
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score
 from xgboost import XGBClassifier
-from imblearn.over_sampling import RandomOverSampler
-
-def train_and_save_model():
-    # Load dataset
-    df = pd.read_csv('balanced_data2.csv', encoding='ISO-8859-1')
-    df = df.drop(columns=["player_name"], errors="ignore")
-
-    # Enhanced injury risk scoring with workload management
-    df['injury_risk_score'] = (
-        df['n_injuries'] * 1.5 + 
-        df['n_severe_injuries'] * 2.5 +
-        (df['minutes_90s'] > 30).astype(int) * 1.0 +  # Match workload
-        (df['minutes'] > 3000).astype(int) * 1.0 +    # Season workload
-        (df['age'] > 30).astype(int) * 1.0 +          # Age factor
-        (df['games'] < 5).astype(int) * 0.5 +         # Match fitness
-        (df['shots'] > 40).astype(int) * 0.5          # Physical exertion
-    )
+from xgboost.callback import TrainingCallback
+from external_memory import StreamingDataset, evaluate_accuracy, train_external_memory
+from features import scale_features
+from ingest import load_training_data
+from registry import REGISTRY_PATH, ModelRegistry
+from resampling import Resampler
+from scoring import DATA_PATH
+
+# Enhanced XGBoost parameters, shared by the in-memory and out-of-core modes
+XGB_PARAMS = dict(
+    n_estimators=500,
+    learning_rate=0.01,
+    max_depth=4,
+    min_child_weight=2,
+    gamma=0.2,
+    subsample=0.9,
+    colsample_bytree=0.9,
+    scale_pos_weight=1.2,
+    random_state=42,
+)
+
+class FitProgress(TrainingCallback):
+    """Report boosting progress as a fraction between start and end"""
+
+    def __init__(self, progress, n_rounds, start=0.1, end=0.95):
+        super().__init__()
+        self.progress = progress
+        self.n_rounds = n_rounds
+        self.start = start
+        self.end = end
+
+    def after_iteration(self, model, epoch, evals_log):
+        if (epoch + 1) % 10 == 0 or epoch + 1 == self.n_rounds:
+            done = (epoch + 1) / self.n_rounds
+            self.progress(self.start + (self.end - self.start) * done,
+                          f"Boosting round {epoch + 1}/{self.n_rounds}")
+        return False
+
+def train_and_save_model(progress=None, registry_path=REGISTRY_PATH, data_path=DATA_PATH):
+    """Train the injury model and publish it as the registry's current version
 
-    # Add fitness indicators
-    df['match_fitness'] = df['minutes'] / df['games'].clip(lower=1)
-    df['workload_intensity'] = df['minutes_90s'] / df['games'].clip(lower=1)
+    `progress(fraction, message)` is called as training advances, e.g. to
+    drive a progress bar while this runs in a background process.
+    """
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
 
-    # Define X and y
-    X = df.drop(columns=["currently_injured"])
-    y = df["currently_injured"]
+    # Stream the dataset into compact float32 features (including the shared
+    # risk score and fitness indicators) and a uint8 target
+    report(0.0, "Loading training data")
+    X, y = load_training_data(data_path)
+
+    # Train-test split with better stratification, before any resampling so
+    # no duplicated row can end up on both sides
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
 
     # Calculate class distributions
-    n_majority = sum(y == 0)
-    n_minority = sum(y == 1)
+    n_majority = sum(y_train == 0)
+    n_minority = sum(y_train == 1)
 
     # Print class distribution for debugging
-    print(f"Original distribution - Majority: {n_majority}, Minority: {n_minority}")
+    print(f"Training distribution - Majority: {n_majority}, Minority: {n_minority}")
 
-    # Calculate target number for minority class (increase by 50%)
+    # Calculate target number for minority class
     target_minority = int(n_minority * 2)  # Double the minority class
-    
+
     # Configure sampling strategy
     sampling_strategy = {
         1: min(target_minority, n_majority)  # Don't exceed majority class size
     }
 
-    # Simple random oversampling with explicit numbers
-    ros = RandomOverSampler(
-        random_state=42,
-        sampling_strategy=sampling_strategy
-    )
-    X, y = ros.fit_resample(X, y)
+    # Random oversampling of the training rows, as sample weights instead of copies
+    resampler = Resampler('weights', sampling_strategy=sampling_strategy, random_state=42)
+    _, _, sample_weight = resampler.fit_resample(X_train, y_train.to_numpy())
 
     # Print new distribution for verification
-    print(f"After resampling - Class 0: {sum(y == 0)}, Class 1: {sum(y == 1)}")
+    print(f"After resampling - Class 0: {sample_weight[y_train == 0].sum():.0f}, "
+          f"Class 1: {sample_weight[y_train == 1].sum():.0f}")
 
-    # Train-test split with better stratification
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-
-    # Scale data
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    # Scale data in float64, as serving does; the weighted fit gives the
+    # statistics of the oversampled rows
+    report(0.1, "Scaling features")
+    scaler = StandardScaler().fit(X_train.astype(np.float64), sample_weight=sample_weight)
+    X_train_scaled = scale_features(X_train, scaler)
+    X_test_scaled = scale_features(X_test, scaler)
 
     # Enhanced XGBoost parameters
     xgb = XGBClassifier(
-        n_estimators=500,
-        learning_rate=0.01,
-        max_depth=4,
-        min_child_weight=2,
-        gamma=0.2,
-        subsample=0.9,
-        colsample_bytree=0.9,
-        scale_pos_weight=1.2,
-        random_state=42
+        **XGB_PARAMS,
+        callbacks=[FitProgress(progress, XGB_PARAMS['n_estimators'])] if progress is not None else None
     )
 
     # Train model
-    xgb.fit(X_train_scaled, y_train)
+    xgb.fit(X_train_scaled, y_train, sample_weight=sample_weight)
+
+    # Publish model, scaler and feature names as a new registry version;
+    # running app sessions pick it up on their next rerun
+    report(0.95, "Publishing model")
+    test_accuracy = accuracy_score(y_test, xgb.predict(X_test_scaled))
+    ModelRegistry(registry_path).publish(xgb, scaler, list(X.columns), metadata={
+        'trained_by': 'train_model.train_and_save_model',
+        'n_train': int(len(X_train)),
+        'n_test': int(len(X_test)),
+        'class_counts': {str(k): int(v) for k, v in y.value_counts().items()},
+        'test_accuracy': float(test_accuracy),
+    })
+    report(1.0, "Done")
 
-    # Save model, scaler and feature names
-    joblib.dump(xgb, 'model.pkl')
-    joblib.dump(scaler, 'scaler.pkl')
-    joblib.dump(list(X.columns), 'feature_names.pkl')
-    
     return xgb, scaler, list(X.columns)
 
-# Only train if this file is run directly
+def train_out_of_core(progress=None, registry_path=REGISTRY_PATH, data_path=DATA_PATH, cache_dir=None):
+    """Train like train_and_save_model without holding the dataset in memory
+
+    The CSV is streamed twice: once for the scaler statistics and class
+    counts, once into XGBoost's external-memory pages on disk. Oversampling
+    becomes a sample weight on the minority class. Memory use is bounded by
+    one chunk plus XGBoost's page cache, not by the size of the file.
+    """
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
+
+    report(0.0, "Computing scaling statistics")
+    dataset = StreamingDataset(data_path)
+    model = XGBClassifier(**XGB_PARAMS)
+    n_rounds = XGB_PARAMS['n_estimators']
+    booster, scaler, class_counts = train_external_memory(
+        dataset, model.get_xgb_params(), n_rounds,
+        callbacks=[FitProgress(progress, n_rounds)] if progress is not None else None,
+        cache_dir=cache_dir,
+    )
+    model.load_model(booster.save_raw('ubj'))
+
+    report(0.95, "Publishing model")
+    test_accuracy = evaluate_accuracy(booster, dataset, scaler)
+    ModelRegistry(registry_path).publish(model, scaler, dataset.feature_names, metadata={
+        'trained_by': 'train_model.train_out_of_core',
+        'n_train': int(class_counts.sum()),
+        'class_counts': {str(k): int(v) for k, v in enumerate(class_counts)},
+        'test_accuracy': float(test_accuracy),
+    })
+    report(1.0, "Done")
+
+    return model, scaler, dataset.feature_names
+
+# Only train if this file is run directly:
+# python train_model.py [--out-of-core] [players.csv]
 if __name__ == '__main__':
-    train_and_save_model()
+    import sys
+    args = [arg for arg in sys.argv[1:] if arg != '--out-of-core']
+    train = train_out_of_core if '--out-of-core' in sys.argv[1:] else train_and_save_model
+    train(data_path=args[0] if args else DATA_PATH)
@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+from registry import REGISTRY_PATH
+
+# Where the background process reports its progress
+STATUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.training_status.json')
+
+
+def write_status(path, **status):
+    """Atomically replace the status file, so readers never see partial JSON"""
+    status['updated_at'] = time.time()
+    fd, tmp_path = tempfile.mkstemp(prefix='.status-', dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+
+
+def read_status(path=STATUS_PATH):
+    """Latest status written by the training process, or None"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def run_training(status_path, registry_path):
+    """Entry point of the training process"""
+    # Imported here so the parent process does not pay for it
+    from train_model import train_and_save_model
+
+    started_at = time.time()
+
+    def progress(fraction, message):
+        write_status(status_path, state='running', progress=fraction, message=message,
+                     pid=os.getpid(), started_at=started_at)
+
+    try:
+        progress(0.0, "Starting")
+        train_and_save_model(progress=progress, registry_path=registry_path)
+        write_status(status_path, state='done', progress=1.0, message="Model ready",
+                     pid=os.getpid(), started_at=started_at)
+    except Exception:
+        write_status(status_path, state='failed', progress=0.0,
+                     message=traceback.format_exc(limit=3),
+                     pid=os.getpid(), started_at=started_at)
+        raise
+
+
+class TrainingJob:
+    """Runs train_and_save_model in a separate process
+
+    The model is published to the registry, which only moves CURRENT once
+    the new bundle is complete, so the server keeps serving the previous
+    model (or the rule-based fallback) until then.
+    """
+
+    def __init__(self, status_path=STATUS_PATH, registry_path=REGISTRY_PATH):
+        self.status_path = status_path
+        self.registry_path = registry_path
+        self.process = None
+
+    def start(self):
+        """Start training unless a run is already in progress"""
+        if self.is_running():
+            return False
+        write_status(self.status_path, state='running', progress=0.0, message="Queued")
+        # A fresh interpreter rather than a fork of a process that has
+        # Streamlit and XGBoost threads running
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker', self.status_path, self.registry_path],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return True
+
+    def ensure_started(self):
+        """Start training if it has not been started in this process yet"""
+        if self.process is None:
+            self.start()
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def status(self):
+        """Status dict with state, progress (0-1) and message"""
+        status = read_status(self.status_path) or {'state': 'idle', 'progress': 0.0, 'message': ''}
+        # The process died without reporting (e.g. killed)
+        if status['state'] == 'running' and self.process is not None and not self.is_running():
+            if self.process.returncode != 0:
+                status = {'state': 'failed', 'progress': 0.0,
+                          'message': f"Training process exited with code {self.process.returncode}"}
+        return status
+
+
+# Train in the background and print progress until done
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--worker']:
+        run_training(*sys.argv[2:4])
+        sys.exit(0)
+
+    job = TrainingJob()
+    job.start()
+    while job.is_running():
+        status = job.status()
+        print(f"\r{status['progress']:6.1%} {status['message']:<40}", end='', flush=True)
+        time.sleep(0.5)
+    print(f"\n{job.status()['state']}")
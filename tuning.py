@@ -0,0 +1,246 @@
+import hashlib
+import json
+import math
+import os
+import pickle
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+from xgboost import XGBClassifier
+
+# Get the directory of the current script
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+TRIALS_PATH = os.path.join(current_dir, '.tuning.sqlite')
+EARLY_STOPPING_ROUNDS = 30
+
+# Training data of the current pool worker, set once by _init_worker
+_worker_data = {}
+
+
+class TrialStore:
+    """SQLite log of finished trial evaluations
+
+    One row per (search, trial, rung). A search is identified by a hash of
+    its data and settings, so rerunning the same search skips every
+    evaluation that already finished.
+    """
+
+    def __init__(self, path=TRIALS_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS trials (
+                search_id TEXT NOT NULL,
+                trial INTEGER NOT NULL,
+                rung INTEGER NOT NULL,
+                params TEXT NOT NULL,
+                n_rounds INTEGER NOT NULL,
+                score REAL NOT NULL,
+                best_rounds INTEGER NOT NULL,
+                fold_scores TEXT NOT NULL,
+                elapsed_s REAL NOT NULL,
+                finished_at REAL NOT NULL,
+                boosters BLOB NOT NULL,
+                PRIMARY KEY (search_id, trial, rung)
+            )
+        """)
+        self.conn.commit()
+
+    def results(self, search_id):
+        """{(trial, rung): result} for everything already evaluated"""
+        rows = self.conn.execute(
+            "SELECT trial, rung, params, n_rounds, score, best_rounds, fold_scores, elapsed_s, boosters "
+            "FROM trials WHERE search_id = ?", (search_id,)
+        )
+        return {
+            (trial, rung): {
+                'trial': trial, 'rung': rung, 'params': json.loads(params), 'n_rounds': n_rounds,
+                'score': score, 'best_rounds': best_rounds,
+                'fold_scores': json.loads(fold_scores), 'elapsed_s': elapsed_s,
+                'boosters': pickle.loads(boosters),
+            }
+            for trial, rung, params, n_rounds, score, best_rounds, fold_scores, elapsed_s, boosters in rows
+        }
+
+    def record(self, search_id, result):
+        """Save one finished evaluation"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (search_id, result['trial'], result['rung'], json.dumps(result['params']),
+             result['n_rounds'], result['score'], result['best_rounds'],
+             json.dumps(result['fold_scores']), result['elapsed_s'], time.time(),
+             pickle.dumps(result['boosters']))
+        )
+        self.conn.commit()
+
+    def searches(self):
+        """(search_id, evaluations, best score) for every stored search"""
+        return self.conn.execute(
+            "SELECT search_id, COUNT(*), MAX(score) FROM trials GROUP BY search_id ORDER BY MAX(finished_at)"
+        ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def _plain(value):
+    """JSON-friendly copy of a sampled parameter value"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _init_worker(X, y, folds, n_threads, resampler):
+    _worker_data.update(X=X, y=y, folds=folds, n_threads=n_threads, resampler=resampler)
+
+
+def evaluate(trial, rung, params, n_rounds, previous=None):
+    """Cross-validate one configuration with at most n_rounds trees
+
+    Every fold stops early once validation logloss stops improving, and is
+    scored by F1 at its best iteration. Resampling, if any, only touches the
+    fold's training rows. `previous` holds the fold boosters
+    from the trial's last rung; boosting continues from them instead of
+    starting over, and folds that already stopped early are reused as is.
+    """
+    X, y, resampler = _worker_data['X'], _worker_data['y'], _worker_data['resampler']
+    start = time.perf_counter()
+    scores, rounds, boosters = [], [], []
+    for fold, (train_idx, val_idx) in enumerate(_worker_data['folds']):
+        prior = None
+        if previous is not None:
+            prior = XGBClassifier(n_jobs=_worker_data['n_threads'])
+            prior.load_model(bytearray(previous[fold]))
+        done_rounds = prior.get_booster().num_boosted_rounds() if prior is not None else 0
+        stopped = prior is not None and prior.best_iteration + 1 + EARLY_STOPPING_ROUNDS <= done_rounds
+
+        if stopped or done_rounds >= n_rounds:
+            model = prior
+        else:
+            model = XGBClassifier(
+                **{**params, 'n_estimators': n_rounds - done_rounds},
+                early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                eval_metric='logloss',
+                n_jobs=_worker_data['n_threads'],
+            )
+            X_train, y_train, sample_weight = X[train_idx], y[train_idx], None
+            if resampler is not None:
+                X_train, y_train, sample_weight = resampler.fit_resample(X_train, y_train)
+            model.fit(X_train, y_train, sample_weight=sample_weight, eval_set=[(X[val_idx], y[val_idx])],
+                      verbose=False, xgb_model=prior.get_booster() if prior is not None else None)
+        scores.append(float(f1_score(y[val_idx], model.predict(X[val_idx]))))
+        rounds.append(model.best_iteration + 1)
+        boosters.append(bytes(model.get_booster().save_raw('ubj')))
+    return {
+        'trial': trial, 'rung': rung, 'params': params, 'n_rounds': n_rounds,
+        'score': float(np.mean(scores)), 'best_rounds': int(np.median(rounds)),
+        'fold_scores': scores, 'elapsed_s': time.perf_counter() - start, 'boosters': boosters,
+    }
+
+
+def rung_budgets(max_rounds, min_rounds, eta):
+    """Boosting rounds allowed at each successive-halving rung, smallest first"""
+    n_rungs = int(math.floor(math.log(max(max_rounds / min_rounds, 1), eta))) + 1
+    return [int(math.ceil(max_rounds / eta ** (n_rungs - 1 - i))) for i in range(n_rungs)]
+
+
+def search_id(X, y, settings):
+    """Stable identifier of a search over this data with these settings"""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(json.dumps(settings, sort_keys=True, default=_plain).encode())
+    return digest.hexdigest()[:16]
+
+
+def search(X, y, space, base_params=None, n_trials=30, cv=5, eta=3, min_rounds=50,
+           n_workers=None, store_path=TRIALS_PATH, random_state=42, resampler=None, log=print):
+    """Random search over `space` with successive halving
+
+    All trials are cross-validated with a small round budget, the best 1/eta
+    move on to a budget eta times larger, and so on until the survivors run
+    with their full `n_estimators`. Evaluations run in a process pool and
+    are saved to the trial store as they finish, so calling this again
+    after an interruption only runs what is missing. `resampler`
+    (a resampling.Resampler) rebalances each fold's training rows.
+
+    Returns (best_params, ranking): best_params is ready for XGBClassifier,
+    with n_estimators set to the early-stopped round count; ranking lists the
+    final rung's results, best first.
+    """
+    base_params = dict(base_params or {})
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    candidates = [
+        {name: _plain(value) for name, value in params.items()}
+        for params in ParameterSampler(space, n_iter=n_trials, random_state=random_state)
+    ]
+    max_rounds = max(params.get('n_estimators', base_params.get('n_estimators', 100)) for params in candidates)
+    budgets = rung_budgets(max_rounds, min_rounds, eta)
+
+    settings = {'space': space, 'base_params': base_params, 'n_trials': n_trials, 'cv': cv,
+                'eta': eta, 'min_rounds': min_rounds, 'random_state': random_state,
+                'resampler': repr(resampler)}
+    sid = search_id(X, y, settings)
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state).split(X, y))
+
+    n_workers = n_workers or os.cpu_count() or 1
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    store = TrialStore(store_path)
+    done = store.results(sid)
+    if done:
+        log(f"Resuming search {sid}: {len(done)} evaluations already stored")
+
+    pool = None
+    if n_workers > 1:
+        pool = ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(X, y, folds, n_threads, resampler))
+    else:
+        _init_worker(X, y, folds, n_threads, resampler)
+
+    try:
+        survivors = list(range(len(candidates)))
+        for rung, budget in enumerate(budgets):
+            tasks = [
+                (trial, rung, {**base_params, **candidates[trial]},
+                 min(budget, candidates[trial].get('n_estimators', max_rounds)),
+                 previous[trial]['boosters'] if rung else None)
+                for trial in survivors
+            ]
+            results = [done[task[:2]] for task in tasks if task[:2] in done]
+            pending = [task for task in tasks if task[:2] not in done]
+
+            if pool is None:
+                finished = (evaluate(*task) for task in pending)
+            else:
+                finished = (future.result() for future in
+                            as_completed([pool.submit(evaluate, *task) for task in pending]))
+            for result in finished:
+                store.record(sid, result)
+                results.append(result)
+
+            results.sort(key=lambda result: (-result['score'], result['trial']))
+            log(f"Rung {rung}: {len(results)} trials x {budget} rounds max, "
+                f"best F1 {results[0]['score']:.4f} (trial {results[0]['trial']})")
+            previous = {result['trial']: result for result in results}
+            if rung < len(budgets) - 1:
+                survivors = [result['trial'] for result in results[:max(1, math.ceil(len(results) / eta))]]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        store.close()
+
+    best = results[0]
+    best_params = {**best['params'], 'n_estimators': best['best_rounds']}
+    return best_params, results
+
+
+# List stored searches and their best cross-validated F1
+if __name__ == '__main__':
+    store = TrialStore(sys.argv[1] if len(sys.argv) > 1 else TRIALS_PATH)
+    for sid, evaluations, best_score in store.searches():
+        print(f"{sid}  {evaluations:4d} evaluations  best F1 {best_score:.4f}")
+    store.close()